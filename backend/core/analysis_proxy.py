@@ -0,0 +1,193 @@
+"""
+Low-bitrate analysis proxies for Gemini summarization.
+
+The summary prompts ask for two short lines about the visuals and the audio,
+yet the summarizers sent the full-resolution, full-bitrate clip. Gemini only
+looks at about one frame per second and bills every sampled frame by media
+resolution, so pixels and frames beyond that are upload time and nothing else.
+
+analysis_proxy() makes, once per source, a small clip for the summarizers:
+
+    video: short side ANALYSIS_PROXY_SHORT_SIDE (never upscaled),
+           ANALYSIS_PROXY_FPS frames per second, H.264 at ANALYSIS_PROXY_CRF
+    audio: mono AAC, ANALYSIS_PROXY_AUDIO_RATE Hz, ANALYSIS_PROXY_AUDIO_BITRATE
+
+A 60s 1080p clip becomes a few hundred KB, small enough to go inline
+(core.gemini_media) with no staging upload. The summarizers also request
+ANALYSIS_MEDIA_RESOLUTION ("low" by default) for proxies, which is what cuts
+the per-frame input tokens.
+
+Proxies live in a local disk LRU (core.disk_lru, ANALYSIS_PROXY_CACHE_DIR)
+keyed by the source content fingerprint and the proxy settings, like the
+ingest mezzanines. Each caller gets its own pin of the proxy (release_pin()
+when done), so eviction cannot delete a proxy that is being uploaded.
+When the proxy cannot be made the caller sends the original. input_variant()
+names what was sent, for the summary store key.
+scripts/compare_analysis_proxy.py runs both versions on a sample set.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+
+from google.genai import types
+
+from core.compute_budget import budgeted, current_threads
+from core.ffmpeg_io import FFMPEG_BIN, FfmpegError, decode_args, probe_video
+from core.disk_lru import DiskLRU
+from core.render_cache import file_fingerprint
+from core.summary_store import ORIGINAL_INPUT
+
+# Bump when the proxy settings change what a proxy looks like
+PROXY_VERSION = "1"
+
+ANALYSIS_PROXY_ENABLED = os.getenv("ANALYSIS_PROXY_ENABLED", "true").lower() == "true"
+ANALYSIS_PROXY_SHORT_SIDE = int(os.getenv("ANALYSIS_PROXY_SHORT_SIDE", "360"))
+ANALYSIS_PROXY_FPS = float(os.getenv("ANALYSIS_PROXY_FPS", "1"))
+ANALYSIS_PROXY_CRF = os.getenv("ANALYSIS_PROXY_CRF", "30")
+ANALYSIS_PROXY_AUDIO_RATE = int(os.getenv("ANALYSIS_PROXY_AUDIO_RATE", "16000"))
+ANALYSIS_PROXY_AUDIO_BITRATE = os.getenv("ANALYSIS_PROXY_AUDIO_BITRATE", "32k")
+ANALYSIS_PROXY_CACHE_DIR = os.getenv("ANALYSIS_PROXY_CACHE_DIR", "/tmp/publefy_analysis_proxy")
+ANALYSIS_PROXY_CACHE_MAX_MB = int(os.getenv("ANALYSIS_PROXY_CACHE_MAX_MB", "1024"))
+ANALYSIS_PROXY_TIMEOUT_SECONDS = int(os.getenv("ANALYSIS_PROXY_TIMEOUT_SECONDS", "300"))
+
+# Gemini media resolution requested for proxies: low | medium | high | "" (model default)
+_MEDIA_RESOLUTIONS = {
+    "low": types.MediaResolution.MEDIA_RESOLUTION_LOW,
+    "medium": types.MediaResolution.MEDIA_RESOLUTION_MEDIUM,
+    "high": types.MediaResolution.MEDIA_RESOLUTION_HIGH,
+}
+ANALYSIS_MEDIA_RESOLUTION = _MEDIA_RESOLUTIONS.get(os.getenv("ANALYSIS_MEDIA_RESOLUTION", "low").strip().lower())
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "builds": 0, "errors": 0, "evictions": 0, "source_bytes": 0, "proxy_bytes": 0}
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _counters[name] += n
+
+
+def analysis_proxy_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    lookups = stats["hits"] + stats["builds"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["size_ratio"] = round(stats["proxy_bytes"] / stats["source_bytes"], 4) if stats["source_bytes"] else 0.0
+    stats["enabled"] = ANALYSIS_PROXY_ENABLED
+    stats["proxy_version"] = PROXY_VERSION
+    stats["variant"] = expected_variant()
+    stats["pid"] = os.getpid()
+    return stats
+
+
+def proxy_size(info: dict) -> tuple[int, int]:
+    """Display size with the short side scaled down (never up) to ANALYSIS_PROXY_SHORT_SIDE, even on both sides."""
+    width, height = info["width"], info["height"]
+    short_side = min(width, height)
+    factor = min(1.0, ANALYSIS_PROXY_SHORT_SIDE / short_side) if short_side else 1.0
+    return (
+        max(2, int(round(width * factor / 2)) * 2),
+        max(2, int(round(height * factor / 2)) * 2),
+    )
+
+
+def proxy_variant() -> str:
+    """Summary store name of a proxy input: proxy version, settings and requested media resolution."""
+    resolution = ANALYSIS_MEDIA_RESOLUTION.value.lower() if ANALYSIS_MEDIA_RESOLUTION else "default"
+    return (
+        f"proxy{PROXY_VERSION}-{ANALYSIS_PROXY_SHORT_SIDE}p-{ANALYSIS_PROXY_FPS:g}fps-crf{ANALYSIS_PROXY_CRF}"
+        f"-{ANALYSIS_PROXY_AUDIO_RATE}hz-{ANALYSIS_PROXY_AUDIO_BITRATE}-{resolution}"
+    )
+
+
+def input_variant(proxy: str | None) -> str:
+    """Variant of what a summarizer sent: the proxy when it got one, else the original."""
+    return proxy_variant() if proxy else ORIGINAL_INPUT
+
+
+def expected_variant() -> str:
+    """Variant a summarizer will send when the proxy can be made (what to look up first)."""
+    return proxy_variant() if ANALYSIS_PROXY_ENABLED else ORIGINAL_INPUT
+
+
+def _cache_key(source_fp: str) -> str:
+    raw = json.dumps([
+        source_fp, PROXY_VERSION, ANALYSIS_PROXY_SHORT_SIDE, ANALYSIS_PROXY_FPS, ANALYSIS_PROXY_CRF,
+        ANALYSIS_PROXY_AUDIO_RATE, ANALYSIS_PROXY_AUDIO_BITRATE,
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@budgeted("proxy")
+def transcode_proxy(src_path: str, out_path: str, info: dict):
+    """One ffmpeg pass: drop to ANALYSIS_PROXY_FPS, downscale, mono low-bitrate audio."""
+    width, height = proxy_size(info)
+    cmd = [FFMPEG_BIN, "-y", "-v", "error", "-nostdin"] + decode_args()
+    cmd += [
+        "-i", src_path, "-map", "0:v:0",
+        # fps first, so only the kept frames are scaled
+        "-vf", f"fps={ANALYSIS_PROXY_FPS:g},scale={width}:{height}:flags=bilinear,format=yuv420p",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", ANALYSIS_PROXY_CRF,
+        "-threads", str(current_threads() or 0),
+    ]
+    if info.get("has_audio"):
+        cmd += [
+            "-map", "0:a:0", "-c:a", "aac", "-ac", "1",
+            "-ar", str(ANALYSIS_PROXY_AUDIO_RATE), "-b:a", ANALYSIS_PROXY_AUDIO_BITRATE,
+        ]
+    cmd += ["-movflags", "+faststart", "-f", "mp4", out_path]
+    proc = subprocess.run(
+        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=ANALYSIS_PROXY_TIMEOUT_SECONDS
+    )
+    if proc.returncode != 0:
+        raise FfmpegError(f"ffmpeg analysis proxy failed: {proc.stderr.decode(errors='ignore').strip()}")
+
+
+class AnalysisProxyCache:
+    def __init__(self, directory: str = ANALYSIS_PROXY_CACHE_DIR, max_mb: int = ANALYSIS_PROXY_CACHE_MAX_MB):
+        self.lru = DiskLRU(directory, max_mb)
+
+    def get(self, path: str, *, source_fp: str | None = None, info: dict | None = None) -> str | None:
+        """
+        This caller's pin of the analysis proxy for the clip at `path`, made on
+        first use; give it back with core.disk_lru.release_pin().
+        `source_fp` identifies the content (default: the file's own fingerprint);
+        `info` is its probe_video() dict when the caller has it.
+        None when proxies are disabled or the proxy could not be made.
+        """
+        if not ANALYSIS_PROXY_ENABLED:
+            return None
+        source_fp = source_fp or file_fingerprint(path)
+        key = _cache_key(source_fp)
+
+        with self.lru.key_lock(key):
+            pin = self.lru.pin(key)
+            if pin is not None:
+                _count("hits")
+                return pin
+
+            try:
+                pin = self.lru.build(key, lambda part: transcode_proxy(path, part, info or probe_video(path)))
+            except Exception as e:
+                _count("errors")
+                print(f"[analysis_proxy] proxy failed, sending the original: {e}")
+                return None
+
+            source_bytes, proxy_bytes = os.path.getsize(path), os.path.getsize(pin)
+            _count("builds")
+            _count("source_bytes", source_bytes)
+            _count("proxy_bytes", proxy_bytes)
+            print(f"[analysis_proxy] {source_bytes / 1024:.0f} KB -> {proxy_bytes / 1024:.0f} KB")
+            _count("evictions", self.lru.evict())
+            return pin
+
+
+analysis_proxy_cache = AnalysisProxyCache()
+
+
+def analysis_proxy(path: str, *, source_fp: str | None = None, info: dict | None = None) -> str | None:
+    """Proxy clip to summarize instead of `path` (see AnalysisProxyCache.get)."""
+    return analysis_proxy_cache.get(path, source_fp=source_fp, info=info)
@@ -0,0 +1,201 @@
+"""
+Node-wide compute budget for render jobs.
+
+Every gunicorn worker runs several request threads, and every render can start
+an x264 encoder, ffmpeg decoders and OpenCV/BLAS pools that each size
+themselves to the whole machine. A few concurrent renders then oversubscribe
+the CPU and all of them slow down.
+
+The budget (COMPUTE_BUDGET_THREADS, default: all cores) is split into slots of
+COMPUTE_JOB_THREADS threads. A job holds one slot while it runs; its ffmpeg
+processes get `-threads <allotment>` (ffmpeg_io.x264_args / decode_args) and
+OpenCV is capped to the same allotment per process. When every slot is taken, new jobs
+queue until one frees up (COMPUTE_QUEUE_TIMEOUT, after which the job runs
+anyway rather than failing the request). A job that runs several encoders at
+once (fan-out, segment-parallel renders) widens its allotment with
+extra_slots(), taking only slots that are free at that moment.
+
+Slots are flock()ed files in COMPUTE_LOCK_DIR, so the budget is shared by all
+worker processes on the node and released by the kernel if a process dies.
+"""
+
+import fcntl
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+COMPUTE_BUDGET_ENABLED = os.getenv("COMPUTE_BUDGET_ENABLED", "true").lower() == "true"
+COMPUTE_BUDGET_THREADS = int(os.getenv("COMPUTE_BUDGET_THREADS", "0")) or (os.cpu_count() or 1)
+COMPUTE_JOB_THREADS = max(1, min(int(os.getenv("COMPUTE_JOB_THREADS", "2")), COMPUTE_BUDGET_THREADS))
+COMPUTE_QUEUE_TIMEOUT = float(os.getenv("COMPUTE_QUEUE_TIMEOUT", "600"))
+COMPUTE_LOCK_DIR = os.getenv("COMPUTE_LOCK_DIR", "/tmp/publefy_compute")
+
+COMPUTE_SLOTS = max(1, COMPUTE_BUDGET_THREADS // COMPUTE_JOB_THREADS)
+
+_POLL_SECONDS = 0.05
+
+_local = threading.local()
+_lock = threading.Lock()
+_counters = {
+    "jobs": 0, "queued": 0, "timeouts": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0, "running": 0,
+    "extra_slots": 0,
+}
+
+
+def _count(name: str, n=1):
+    with _lock:
+        _counters[name] += n
+
+
+def current_threads() -> int | None:
+    """Thread allotment of the job running on this thread, or None outside compute_slot()."""
+    return getattr(_local, "threads", None)
+
+
+def configure_process_threads():
+    """Cap OpenCV's pool (process-wide) to one job allotment; call once per worker process."""
+    if not COMPUTE_BUDGET_ENABLED:
+        return
+    try:
+        import cv2
+
+        cv2.setNumThreads(COMPUTE_JOB_THREADS)
+    except Exception as e:
+        print(f"[compute] could not cap OpenCV threads: {e}")
+
+
+def _try_slot():
+    """Open and lock a free slot file; returns the open file or None when all are taken."""
+    os.makedirs(COMPUTE_LOCK_DIR, exist_ok=True)
+    for i in range(COMPUTE_SLOTS):
+        f = open(os.path.join(COMPUTE_LOCK_DIR, f"slot_{i}.lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return f
+        except OSError:
+            f.close()
+    return None
+
+
+@contextmanager
+def compute_slot(name: str = "render"):
+    """
+    Hold one compute slot for the duration of the block and yield its thread
+    allotment (None when the budget is disabled). Nested use on the same thread
+    reuses the slot already held.
+    """
+    if not COMPUTE_BUDGET_ENABLED:
+        yield None
+        return
+    if getattr(_local, "depth", 0):
+        _local.depth += 1
+        try:
+            yield _local.threads
+        finally:
+            _local.depth -= 1
+        return
+
+    started = time.perf_counter()
+    slot = _try_slot()
+    if slot is None:
+        _count("queued")
+        print(f"[compute] {name}: all {COMPUTE_SLOTS} slots busy, queueing")
+        while slot is None and time.perf_counter() - started < COMPUTE_QUEUE_TIMEOUT:
+            time.sleep(_POLL_SECONDS)
+            slot = _try_slot()
+        if slot is None:
+            _count("timeouts")
+            print(f"[compute] {name}: no slot after {COMPUTE_QUEUE_TIMEOUT:.0f}s, running over budget")
+    waited = time.perf_counter() - started
+    with _lock:
+        _counters["jobs"] += 1
+        _counters["running"] += 1
+        _counters["wait_seconds"] += waited
+        _counters["max_wait_seconds"] = max(_counters["max_wait_seconds"], waited)
+
+    _local.depth, _local.threads = 1, COMPUTE_JOB_THREADS
+    try:
+        yield COMPUTE_JOB_THREADS
+    finally:
+        _local.depth, _local.threads = 0, None
+        _count("running", -1)
+        if slot is not None:
+            fcntl.flock(slot, fcntl.LOCK_UN)
+            slot.close()
+
+
+@contextmanager
+def extra_slots(wanted: int):
+    """
+    Widen the running job's allotment by up to `wanted` more slots, taking only
+    those free right now: a wide job never waits for more, so two of them
+    holding one slot each cannot block each other. Yields the widened thread
+    allotment (COMPUTE_JOB_THREADS per slot held, also seen by current_threads()),
+    or current_threads() unchanged outside compute_slot() / with the budget disabled.
+    """
+    if not COMPUTE_BUDGET_ENABLED or not getattr(_local, "depth", 0) or wanted <= 0:
+        yield current_threads()
+        return
+
+    held = []
+    while len(held) < wanted:
+        slot = _try_slot()
+        if slot is None:
+            break
+        held.append(slot)
+    _count("extra_slots", len(held))
+
+    previous = _local.threads
+    _local.threads = previous + COMPUTE_JOB_THREADS * len(held)
+    try:
+        yield _local.threads
+    finally:
+        _local.threads = previous
+        for slot in held:
+            fcntl.flock(slot, fcntl.LOCK_UN)
+            slot.close()
+
+
+def budgeted(name: str):
+    """Decorator: run the function inside compute_slot(name)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with compute_slot(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def busy_slots() -> int:
+    """Slots currently held anywhere on the node (probed without blocking)."""
+    busy = 0
+    for i in range(COMPUTE_SLOTS):
+        path = os.path.join(COMPUTE_LOCK_DIR, f"slot_{i}.lock")
+        if not os.path.exists(path):
+            continue
+        with open(path, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(f, fcntl.LOCK_UN)
+            except OSError:
+                busy += 1
+    return busy
+
+
+def compute_budget_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+    stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 3)
+    stats.update({
+        "enabled": COMPUTE_BUDGET_ENABLED,
+        "budget_threads": COMPUTE_BUDGET_THREADS,
+        "job_threads": COMPUTE_JOB_THREADS,
+        "slots": COMPUTE_SLOTS,
+        "busy_slots_node": busy_slots() if COMPUTE_BUDGET_ENABLED else 0,
+        "pid": os.getpid(),
+    })
+    return stats
@@ -0,0 +1,84 @@
+"""
+Persistent store of text-area detection results.
+
+Key = (source fingerprint, detector, DETECTOR_VERSION). The fingerprint is the
+same "md5:<base64>" form used by the render cache, so any render of a source
+that was detected before (new caption, different logo, re-generation) skips
+frame sampling and OCR.
+
+Two tiers (core.result_store):
+  - in-process LRU (DETECTION_STORE_LRU_SIZE entries)
+  - Mongo collection (DETECTION_STORE_COLLECTION), shared by every worker
+"""
+
+import os
+
+from core.result_store import ResultStore
+
+# Bump when a detector change would give different areas for the same source
+DETECTOR_VERSION = "2"
+
+DETECTION_STORE_ENABLED = os.getenv("DETECTION_STORE_ENABLED", "true").lower() == "true"
+DETECTION_STORE_COLLECTION = os.getenv("DETECTION_STORE_COLLECTION", "text_detections")
+DETECTION_STORE_LRU_SIZE = int(os.getenv("DETECTION_STORE_LRU_SIZE", "1024"))
+
+
+def _to_tuple(value):
+    return tuple(int(v) for v in value) if value is not None else None
+
+
+def _decode(doc: dict) -> dict:
+    return {
+        "text_area": _to_tuple(doc.get("text_area")),
+        "bg_color": _to_tuple(doc.get("bg_color")),
+        "frame_size": _to_tuple(doc.get("frame_size")),
+    }
+
+
+class DetectionStore:
+    def __init__(self, lru_size: int = DETECTION_STORE_LRU_SIZE):
+        self._store = ResultStore(
+            "detection_store", DETECTION_STORE_COLLECTION,
+            decode=_decode, enabled=DETECTION_STORE_ENABLED, lru_size=lru_size,
+        )
+
+    @staticmethod
+    def key(source_fp: str, detector: str) -> str | None:
+        """None for fingerprints that do not identify the content (the "path:" fallback)."""
+        if not source_fp or source_fp.startswith("path:"):
+            return None
+        return f"{detector}:{DETECTOR_VERSION}:{source_fp}"
+
+    def stats(self) -> dict:
+        stats = self._store.stats()
+        stats["detector_version"] = DETECTOR_VERSION
+        return stats
+
+    def get(self, source_fp: str, detector: str) -> dict | None:
+        """
+        Return {"text_area", "bg_color", "frame_size"} (tuples; text_area/bg_color
+        may be None when detection found nothing) or None on a miss.
+        """
+        return self._store.get(self.key(source_fp, detector))
+
+    def put(self, source_fp: str, detector: str, text_area, *, frame_size, bg_color=None):
+        entry = {
+            "text_area": _to_tuple(text_area),
+            "bg_color": _to_tuple(bg_color),
+            "frame_size": _to_tuple(frame_size),
+        }
+        self._store.put(self.key(source_fp, detector), entry, {
+            "source_fp": source_fp,
+            "detector": detector,
+            "detector_version": DETECTOR_VERSION,
+            "text_area": list(entry["text_area"]) if entry["text_area"] else None,
+            "bg_color": list(entry["bg_color"]) if entry["bg_color"] else None,
+            "frame_size": list(entry["frame_size"]),
+        })
+
+
+detection_store = DetectionStore()
+
+
+def detection_store_stats() -> dict:
+    return detection_store.stats()
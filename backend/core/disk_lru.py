@@ -0,0 +1,159 @@
+"""
+Local disk LRU of derived media files keyed by content, shared by
+core.ingest (mezzanines) and core.analysis_proxy (analysis proxies).
+
+An entry is the files <key><suffix> in the cache directory, one per suffix
+(e.g. the video and its probe info). The first suffix is the main file: it is
+written under a temporary ".<key>." name and moved into place when complete,
+so other workers never read a partial file. Recency is the newest mtime among
+an entry's files; evict() drops whole entries, least recently used first,
+until the directory fits in max_mb.
+
+Callers never read an entry by its cache name. Each gets its own hard link to
+the main file (under the cache's .pins directory), so eviction, by this or
+another worker, only removes the cache's name while the data stays readable
+until the caller calls release_pin(). Pins left behind by a crashed request
+are swept after PIN_MAX_AGE_SECONDS.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from uuid import uuid4
+
+# Pins older than this belong to a request that died without releasing them
+PIN_MAX_AGE_SECONDS = 6 * 3600
+
+
+def pin_file(path: str, directory: str) -> str | None:
+    """
+    Hard link to the cache entry `path` in `directory`/.pins for one request,
+    so eviction cannot delete the data under it. None when `path` is gone
+    (evicted meanwhile); `path` itself (unpinned) when hard links fail here.
+    """
+    pins = os.path.join(directory, ".pins")
+    pin = os.path.join(pins, f"{uuid4().hex}{os.path.splitext(path)[1]}")
+    try:
+        os.makedirs(pins, exist_ok=True)
+        os.link(path, pin)
+    except FileNotFoundError:
+        return None if not os.path.exists(path) else path
+    except OSError as e:
+        print(f"[disk_lru] could not pin {path}, using it unpinned: {e}")
+        return path
+    return pin
+
+
+def release_pin(path: str | None):
+    """Drop a pin returned by pin_file() (via ingest() or analysis_proxy()); any other path is left alone."""
+    if not path or os.path.basename(os.path.dirname(path)) != ".pins":
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def sweep_pins(directory: str):
+    """Remove pins older than PIN_MAX_AGE_SECONDS."""
+    pins = os.path.join(directory, ".pins")
+    cutoff = time.time() - PIN_MAX_AGE_SECONDS
+    try:
+        names = os.listdir(pins)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(pins, name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+class DiskLRU:
+    def __init__(self, directory: str, max_mb: int, *, suffixes: tuple = (".mp4",)):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+        self.suffixes = suffixes
+        self._lock = threading.Lock()
+        self._key_locks: dict = {}
+
+    def path(self, key: str, suffix: str | None = None) -> str:
+        """Cache name of the entry's file with `suffix` (default: the main file)."""
+        return os.path.join(self.directory, key + (suffix or self.suffixes[0]))
+
+    def key_lock(self, key: str) -> threading.Lock:
+        """Lock serializing lookups and builds of `key` within this process."""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def pin(self, key: str) -> str | None:
+        """This caller's pin of the entry's main file, marking the entry as used; None on a miss."""
+        pin = pin_file(self.path(key), self.directory)
+        if pin is not None:
+            for suffix in self.suffixes:
+                try:
+                    os.utime(self.path(key, suffix))
+                except OSError:
+                    pass
+        return pin
+
+    def build(self, key: str, make) -> str:
+        """
+        Run `make(part)` to write the main file at the temporary path `part`,
+        move it into place and return this caller's pin of it. `make` may write
+        the entry's other files itself. Exceptions from `make` propagate, with
+        the temporary file removed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = self.suffixes[0]
+        fd, part = tempfile.mkstemp(suffix=suffix, dir=self.directory, prefix=f".{key}.")
+        os.close(fd)
+        try:
+            make(part)
+            os.replace(part, self.path(key))
+            pin = pin_file(self.path(key), self.directory)
+            if pin is None:
+                raise OSError(f"{key}{suffix} evicted before it could be pinned")
+        except BaseException:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            raise
+        return pin
+
+    def evict(self) -> int:
+        """
+        Drop least recently used entries until the directory fits in max_bytes;
+        pinned data stays readable. Returns the number of entries dropped.
+        """
+        sweep_pins(self.directory)
+        entries = {}
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue  # build in progress, or the pins
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key = name.split(".", 1)[0]
+            size, mtime, paths = entries.get(key, (0, 0.0, []))
+            entries[key] = (size + st.st_size, max(mtime, st.st_mtime), paths + [path])
+
+        total = sum(size for size, _, _ in entries.values())
+        evicted = 0
+        for size, _, paths in sorted(entries.values(), key=lambda entry: entry[1]):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            evicted += 1
+        return evicted
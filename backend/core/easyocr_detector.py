@@ -0,0 +1,235 @@
+"""
+EasyOCR text-box detection, shared by the detectors in core/video_processor.py
+and routes/finalize_route.py.
+
+The model is loaded once per node by the OCR server process
+(services/ocr_server.py); gunicorn workers send it whole batches of frames
+over a local socket. When the server is disabled the model is loaded
+in-process instead (once, under a lock). When it is enabled but cannot be
+reached, detection never waits for it and never loads a model of its own:
+it asks the server to come up in the background and returns None, so that
+batch goes to Tesseract. A per-worker model would stay resident for the
+worker's lifetime, which is what the server exists to avoid.
+
+Connections are authenticated with a per-node secret: OCR_SERVER_AUTHKEY when
+set, otherwise random bytes generated once into <socket>.key (mode 0600),
+readable only by the user running the workers and the server.
+
+detect_text_boxes() returns None when EasyOCR is not installed or the server
+is not answering, so callers fall back to Tesseract.
+"""
+
+import importlib.util
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import cv2
+import numpy as np
+
+OCR_SERVER_ENABLED = os.getenv("OCR_SERVER_ENABLED", "true").lower() == "true"
+OCR_SERVER_SOCKET = os.getenv("OCR_SERVER_SOCKET", "/tmp/publefy_ocr.sock")
+# Shared secret for the socket; unset = per-node random key in <socket>.key
+OCR_SERVER_AUTHKEY = os.getenv("OCR_SERVER_AUTHKEY", "")
+# Seconds to wait for a freshly started server to load the model
+OCR_SERVER_START_TIMEOUT = float(os.getenv("OCR_SERVER_START_TIMEOUT", "120"))
+# After a failed start, use Tesseract for this long before trying again
+_SERVER_RETRY_SECONDS = 300
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_EASYOCR_READER = None
+_EASYOCR_AVAILABLE = None
+_reader_lock = threading.Lock()
+_spawn_lock = threading.Lock()
+_server_retry_at = 0.0
+_spawned_at = float("-inf")
+_authkey = None
+
+
+def ocr_authkey() -> bytes:
+    """The socket secret: OCR_SERVER_AUTHKEY, or the node key file (created 0600 on first use)."""
+    global _authkey
+    if _authkey is not None:
+        return _authkey
+    if OCR_SERVER_AUTHKEY:
+        _authkey = OCR_SERVER_AUTHKEY.encode("utf-8")
+        return _authkey
+
+    key_path = OCR_SERVER_SOCKET + ".key"
+    if not os.path.exists(key_path):
+        # write a private temp file, then link it into place: the first process wins,
+        # nobody ever reads a half-written key
+        tmp_path = f"{key_path}.{os.getpid()}.{threading.get_ident()}"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.write(fd, secrets.token_hex(32).encode("ascii"))
+        finally:
+            os.close(fd)
+        try:
+            os.link(tmp_path, key_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(key_path, "rb") as f:
+        _authkey = f.read().strip()
+    return _authkey
+
+
+def easyocr_installed() -> bool:
+    return importlib.util.find_spec("easyocr") is not None
+
+
+def _get_easyocr_reader():
+    """Load the EasyOCR reader once per process. Returns None if not available."""
+    global _EASYOCR_READER, _EASYOCR_AVAILABLE
+    with _reader_lock:
+        if _EASYOCR_AVAILABLE is None:
+            try:
+                import easyocr
+                _EASYOCR_READER = easyocr.Reader(['en'], gpu=False, verbose=False)
+                _EASYOCR_AVAILABLE = True
+            except ImportError:
+                _EASYOCR_AVAILABLE = False
+                print("[INFO] EasyOCR not available, falling back to pytesseract")
+    return _EASYOCR_READER if _EASYOCR_AVAILABLE else None
+
+
+def detect_batch(reader, frames_rgb: list) -> list:
+    """
+    Run the EasyOCR detector over `frames_rgb`; frames of the same size share
+    one forward pass. Returns, per frame, a list of (x0, y0, x1, y1) boxes.
+    """
+    results = [None] * len(frames_rgb)
+    by_shape = {}
+    for i, frame in enumerate(frames_rgb):
+        by_shape.setdefault(frame.shape, []).append(i)
+
+    for indices in by_shape.values():
+        if len(indices) == 1:
+            batch = frames_rgb[indices[0]]
+            horizontal, free = reader.detect(batch)
+        else:
+            batch = np.stack([frames_rgb[i] for i in indices])
+            horizontal, free = reader.detect(batch, reformat=False)
+        for k, i in enumerate(indices):
+            boxes = [(int(x0), int(y0), int(x1), int(y1)) for x0, x1, y0, y1 in horizontal[k]]
+            for poly in free[k]:
+                xs = [p[0] for p in poly]
+                ys = [p[1] for p in poly]
+                boxes.append((int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))))
+            results[i] = boxes
+    return results
+
+
+def _request(message: dict, timeout: float = 60.0) -> dict:
+    with Client(OCR_SERVER_SOCKET, family="AF_UNIX", authkey=ocr_authkey()) as conn:
+        conn.send(message)
+        if not conn.poll(timeout):
+            raise TimeoutError("OCR server did not answer in time")
+        return conn.recv()
+
+
+def _server_alive() -> bool:
+    try:
+        return _request({"op": "ping"}, timeout=5).get("ok", False)
+    except (OSError, EOFError, TimeoutError, AuthenticationError):
+        return False
+
+
+def start_ocr_server(wait: bool = True) -> bool:
+    """
+    Make sure the node's OCR server is running (starting it if needed).
+    Safe to call from every worker: the server takes an exclusive file lock,
+    so extra copies exit straight away, and this process spawns at most one
+    per OCR_SERVER_START_TIMEOUT. With wait=False it returns at once (False
+    unless the server already answers); with wait=True it waits up to
+    OCR_SERVER_START_TIMEOUT for the server. Returns True when it answers.
+    """
+    global _server_retry_at, _spawned_at
+    if not OCR_SERVER_ENABLED or not easyocr_installed():
+        return False
+    if _server_alive():
+        return True
+
+    with _spawn_lock:
+        now = time.monotonic()
+        if now < _server_retry_at:
+            return False
+        if now - _spawned_at >= OCR_SERVER_START_TIMEOUT:
+            ocr_authkey()  # create the node key before the server reads it
+            subprocess.Popen(
+                [sys.executable, "-m", "services.ocr_server"],
+                cwd=_BACKEND_DIR,
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            _spawned_at = now
+        deadline = _spawned_at + OCR_SERVER_START_TIMEOUT
+    if not wait:
+        return False
+
+    # poll outside the lock, so other threads can still check on the server
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        if _server_alive():
+            return True
+    with _spawn_lock:
+        _server_retry_at = time.monotonic() + _SERVER_RETRY_SECONDS
+    print("[ocr_server] did not come up, using Tesseract")
+    return False
+
+
+def warm_ocr_server():
+    """Start the OCR server in the background so the model is loaded before the first request."""
+    if OCR_SERVER_ENABLED and easyocr_installed():
+        threading.Thread(target=start_ocr_server, name="ocr-server-warmup", daemon=True).start()
+
+
+def ocr_server_stats() -> dict:
+    try:
+        return _request({"op": "stats"}, timeout=5)
+    except (OSError, EOFError, TimeoutError, AuthenticationError) as e:
+        return {"ok": False, "enabled": OCR_SERVER_ENABLED, "error": str(e)}
+
+
+def detect_text_boxes(frames: list) -> list | None:
+    """
+    EasyOCR text boxes for BGR `frames`, one list of (x0, y0, x1, y1) per frame.
+    Returns None when EasyOCR is not installed or the OCR server cannot
+    serve the batch.
+    """
+    if not easyocr_installed():
+        return None
+    frames_rgb = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+
+    if OCR_SERVER_ENABLED:
+        try:
+            reply = _request({"op": "detect", "frames": frames_rgb}, timeout=300)
+            if reply.get("ok"):
+                print(f"[EasyOCR] server batch of {len(frames_rgb)} frames in {reply['seconds'] * 1000:.0f}ms")
+                return reply["boxes"]
+            print(f"[EasyOCR] server error: {reply.get('error')}, using Tesseract")
+        except (OSError, EOFError, TimeoutError, AuthenticationError) as e:
+            # no waiting on a server start here: bring it up for later requests, Tesseract now
+            print(f"[EasyOCR] server unreachable ({e}), using Tesseract")
+            start_ocr_server(wait=False)
+        return None
+
+    reader = _get_easyocr_reader()
+    if reader is None:
+        return None
+    started = time.perf_counter()
+    try:
+        boxes = detect_batch(reader, frames_rgb)
+    except Exception as e:
+        print(f"[EasyOCR] Detection error: {e}")
+        return None
+    print(f"[EasyOCR] batch of {len(frames_rgb)} frames in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return boxes
@@ -0,0 +1,86 @@
+"""
+Edge-density text fallback used by detect_text_area when OCR finds little.
+
+Rows below `start_fraction` of the frame are ranked by Canny edge density
+(mean edge value across the row); among the top decile, the lowest row that
+is denser than `min_density` is taken as the bottom of the caption text.
+The Canny maps of all frames are reduced to row densities in one NumPy sum
+and the top decile is picked with argpartition instead of sorting every row.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+# Extra downscale applied to the (already sampled) frames before Canny; 1 = off
+EDGE_DENSITY_DOWNSCALE = float(os.getenv("EDGE_DENSITY_DOWNSCALE", "1"))
+# How many sampled frames feed the edge fallback (the historical detector used the first one)
+EDGE_DENSITY_FRAMES = int(os.getenv("EDGE_DENSITY_FRAMES", "1"))
+
+
+def _top_decile_bottom(density: np.ndarray, min_density: float) -> int | None:
+    """
+    Largest row index among the top max(1, n // 10) densest rows that is above
+    `min_density`. Ties at the cut-off keep the lowest indices first, exactly
+    like a stable descending sort would.
+    """
+    n = density.shape[0]
+    k = max(1, n // 10)
+    if density.max() <= min_density:
+        return None
+
+    part = np.argpartition(-density, k - 1)
+    cutoff = density[part[k - 1]]
+    chosen = density > cutoff
+    missing = k - int(chosen.sum())
+    if missing > 0:
+        chosen[np.flatnonzero(density == cutoff)[:missing]] = True
+
+    rows = np.flatnonzero(chosen & (density > min_density))
+    return int(rows[-1]) if rows.size else None
+
+
+def edge_text_bottom(
+    frames: list,
+    start_fraction: float = 0.4,
+    min_density: float = 10,
+    downscale: float = EDGE_DENSITY_DOWNSCALE,
+) -> float:
+    """
+    Bottom edge (in the frames' own pixels) of dense edge rows across `frames`,
+    or 0 when no frame has a row above `min_density`. Stops early once a frame
+    reaches the last row, since no later frame can go lower.
+    """
+    if not frames:
+        return 0
+    height, width = frames[0].shape[:2]
+    factor = downscale if downscale and 0 < downscale < 1 else 1.0
+
+    grays = []
+    for frame in frames:
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if factor != 1.0:
+            gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        grays.append(gray)
+
+    edge_height, edge_width = grays[0].shape
+    start = int(edge_height * start_fraction)
+    if start >= edge_height:
+        return 0
+
+    edges = np.stack([cv2.Canny(g, 50, 150)[start:] for g in grays])
+    # Row density = mean edge value of the row (same as sum / width)
+    densities = edges.sum(axis=2, dtype=np.int64) / edge_width
+
+    bottom = None
+    last_row = edges.shape[1] - 1
+    for density in densities:
+        row = _top_decile_bottom(density, min_density)
+        if row is not None and (bottom is None or row > bottom):
+            bottom = row
+            if bottom == last_row:
+                break
+    if bottom is None:
+        return 0
+    return (start + bottom) / factor
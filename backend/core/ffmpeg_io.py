@@ -0,0 +1,388 @@
+"""
+Thin ffmpeg/ffprobe pipe helpers used by the render engine.
+
+Frames travel as raw bgr24 buffers so the OpenCV overlay code can work on
+them directly, without moviepy in between and without an intermediate file.
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+from fractions import Fraction
+
+import numpy as np
+
+from core.compute_budget import current_threads
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+
+X264_PRESET = os.getenv("RENDER_X264_PRESET", "veryfast")
+X264_CRF = os.getenv("RENDER_X264_CRF", "20")
+
+# Container every render is muxed into (FrameWriter, concat_segments): name
+# rendered files and blobs with RENDER_EXT and upload them as RENDER_MIME
+RENDER_EXT = ".mp4"
+RENDER_MIME = "video/mp4"
+
+# Audio codecs that can be stream-copied into an mp4 container as-is
+MP4_AUDIO_COPY_CODECS = {"aac", "mp3", "alac"}
+
+EVEN_PAD_FILTER = "pad=ceil(iw/2)*2:ceil(ih/2)*2"
+
+
+class FfmpegError(RuntimeError):
+    pass
+
+
+def audio_args(audio_codec: str | None) -> list:
+    """Output args for the source audio: stream copy when mp4 takes it, else AAC."""
+    if audio_codec in MP4_AUDIO_COPY_CODECS:
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", "128k"]
+
+
+def decode_args(threads: int | None = None) -> list:
+    """Input args capping ffmpeg's decoder threads (default: the running job's compute allotment)."""
+    threads = threads or current_threads()
+    return ["-threads", str(threads)] if threads else []
+
+
+def x264_args(threads: int | None = None) -> list:
+    """
+    Output args shared by every libx264 encode (keeps segments concat-compatible).
+    Threads default to the running job's compute allotment (0 = x264 auto outside one).
+    """
+    return [
+        "-c:v", "libx264", "-preset", X264_PRESET, "-crf", X264_CRF,
+        "-threads", str(int(threads or current_threads() or 0)),
+        "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart",
+    ]
+
+
+def _parse_rate(value) -> float:
+    try:
+        rate = float(Fraction(str(value)))
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+    return rate if rate > 0 else 0.0
+
+
+def _stream_rotation(stream: dict) -> int:
+    for side in stream.get("side_data_list") or []:
+        if "rotation" in side:
+            try:
+                return int(float(side["rotation"])) % 360
+            except (TypeError, ValueError):
+                pass
+    try:
+        return int(float((stream.get("tags") or {}).get("rotate", 0))) % 360
+    except (TypeError, ValueError):
+        return 0
+
+
+def probe_video(path: str, timeout: float = 60) -> dict:
+    """
+    Read container/stream headers with ffprobe.
+    Width/height are reported in display orientation (after rotation), which is
+    what ffmpeg hands us when decoding with autorotate on.
+    """
+    cmd = [
+        FFPROBE_BIN, "-v", "error",
+        "-print_format", "json",
+        "-show_format", "-show_streams",
+        path,
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    if proc.returncode != 0:
+        raise FfmpegError(f"ffprobe failed: {proc.stderr.decode(errors='ignore').strip()}")
+
+    data = json.loads(proc.stdout or b"{}")
+    streams = data.get("streams") or []
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if video is None:
+        raise FfmpegError("No video stream found")
+
+    rotation = _stream_rotation(video)
+    width, height = int(video.get("width") or 0), int(video.get("height") or 0)
+    if rotation in (90, 270):
+        width, height = height, width
+
+    avg_rate, base_rate = _parse_rate(video.get("avg_frame_rate")), _parse_rate(video.get("r_frame_rate"))
+    fps = avg_rate or base_rate or 30.0
+    # variable frame rate: frame n is not at n / fps, so frame counts cannot stand in for timestamps
+    vfr = bool(avg_rate and base_rate and abs(avg_rate - base_rate) > base_rate * 0.001)
+
+    duration = 0.0
+    for src in (video.get("duration"), (data.get("format") or {}).get("duration")):
+        try:
+            duration = float(src)
+            break
+        except (TypeError, ValueError):
+            continue
+
+    try:
+        start_time = float((data.get("format") or {}).get("start_time") or 0.0)
+    except (TypeError, ValueError):
+        start_time = 0.0
+
+    try:
+        nb_frames = int(video.get("nb_frames") or 0)
+    except ValueError:
+        nb_frames = 0
+    if not nb_frames and duration:
+        nb_frames = int(round(duration * fps))
+
+    return {
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "vfr": vfr,
+        "duration": duration,
+        "start_time": start_time,
+        "nb_frames": nb_frames,
+        "rotation": rotation,
+        "video_codec": video.get("codec_name"),
+        "pix_fmt": video.get("pix_fmt"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "has_audio": audio is not None,
+    }
+
+
+def keyframe_times(path: str, start_time: float = 0.0) -> list[float]:
+    """
+    Return keyframe timestamps (seconds, relative to the file start) of the first
+    video stream. Reads packet flags only, nothing is decoded.
+    """
+    cmd = [
+        FFPROBE_BIN, "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        path,
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=120)
+    if proc.returncode != 0:
+        raise FfmpegError(f"ffprobe failed: {proc.stderr.decode(errors='ignore').strip()}")
+
+    times = []
+    for line in proc.stdout.decode(errors="ignore").splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" not in flags:
+            continue
+        try:
+            times.append(max(0.0, float(pts) - start_time))
+        except ValueError:
+            continue
+    return sorted(set(times))
+
+
+class FrameReader:
+    """
+    Decode a video once through an ffmpeg pipe and yield bgr24 frames as
+    writable (height, width, 3) uint8 arrays.
+
+    A decode that fails (non-zero exit, or a partial frame at the end of the
+    pipe) raises FfmpegError at end of stream instead of looking like a clean,
+    shorter video; close() raises the same for a failure not yet reported,
+    unless the decoder was stopped by close() itself.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        width: int,
+        height: int,
+        *,
+        start: float | None = None,
+        frames: int | None = None,
+        threads: int | None = None,
+    ):
+        self.width = int(width)
+        self.height = int(height)
+        self.frame_bytes = self.width * self.height * 3
+        self.eof = False
+        self._killed = False
+        self._checked = False
+        self._stderr = tempfile.TemporaryFile()
+        cmd = [FFMPEG_BIN, "-v", "error", "-nostdin"]
+        if start:
+            # input seek; ffmpeg still decodes accurately up to `start`
+            cmd += ["-ss", f"{start:.6f}"]
+        cmd += decode_args(threads) + ["-i", path, "-map", "0:v:0"]
+        if frames:
+            cmd += ["-frames:v", str(int(frames))]
+        cmd += ["-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        self._proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=self._stderr, bufsize=self.frame_bytes
+        )
+
+    def _stderr_tail(self, limit: int = 2000) -> str:
+        try:
+            self._stderr.seek(0, os.SEEK_END)
+            self._stderr.seek(max(0, self._stderr.tell() - limit))
+            return self._stderr.read().decode(errors="ignore").strip()
+        except (OSError, ValueError):
+            return ""
+
+    def _check_exit(self, partial: bool = False):
+        """Raise FfmpegError when the decoder failed on its own (not killed by close())."""
+        if self._checked:
+            return
+        self._checked = True
+        code = self._proc.wait()
+        if self._killed:
+            return
+        if code != 0:
+            raise FfmpegError(f"ffmpeg decode failed ({code}): {self._stderr_tail()}")
+        if partial:
+            raise FfmpegError(f"ffmpeg decode ended inside a frame: {self._stderr_tail()}")
+
+    def read_into(self, out: np.ndarray) -> bool:
+        """
+        Fill the preallocated (height, width, 3) uint8 array `out`. False at a
+        clean end of stream; raises FfmpegError when the decode failed.
+        """
+        if self.eof:
+            return False
+        view = memoryview(out.reshape(-1))
+        got = 0
+        while got < self.frame_bytes:
+            n = self._proc.stdout.readinto(view[got:])
+            if not n:
+                self.eof = True
+                self._check_exit(partial=got > 0)
+                return False
+            got += n
+        return True
+
+    def read(self):
+        """Return the next frame in a new array, or None at end of stream."""
+        frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        return frame if self.read_into(frame) else None
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._killed = True
+            self._proc.kill()
+        try:
+            self._check_exit()
+        finally:
+            if self._proc.stdout:
+                self._proc.stdout.close()
+            self._stderr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            self.close()
+        except FfmpegError:
+            if exc_type is None:
+                raise
+
+
+class FrameWriter:
+    """
+    Pipe bgr24 frames into a single libx264 encode. When `audio_source` is
+    given its first audio track is muxed in the same pass (stream-copied when
+    the codec fits mp4, otherwise transcoded to AAC).
+    """
+
+    def __init__(
+        self,
+        out_path: str,
+        width: int,
+        height: int,
+        fps: float,
+        *,
+        audio_source: str | None = None,
+        audio_codec: str | None = None,
+        threads: int | None = None,
+        tune: str | None = None,
+    ):
+        self.width = int(width)
+        self.height = int(height)
+        self._stderr = tempfile.TemporaryFile()
+
+        cmd = [
+            FFMPEG_BIN, "-y", "-v", "error", "-nostdin",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{self.width}x{self.height}",
+            "-r", f"{fps:.6f}",
+            "-i", "pipe:0",
+        ]
+        if audio_source:
+            cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?"]
+            cmd += audio_args(audio_codec) + ["-shortest"]
+        # libx264 + yuv420p needs even dimensions
+        cmd += ["-vf", EVEN_PAD_FILTER] + x264_args(threads)
+        if tune:
+            cmd += ["-tune", tune]
+        cmd += ["-f", "mp4", out_path]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def write(self, frame):
+        try:
+            self._proc.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            self.close()
+            raise FfmpegError("ffmpeg encoder exited early")
+
+    def close(self):
+        if self._proc.stdin and not self._proc.stdin.closed:
+            try:
+                self._proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        code = self._proc.wait()
+        self._stderr.seek(0)
+        err = self._stderr.read().decode(errors="ignore").strip()
+        self._stderr.close()
+        if code != 0:
+            raise FfmpegError(f"ffmpeg encode failed ({code}): {err}")
+
+    def abort(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+        self._stderr.close()
+
+
+def concat_segments(segment_paths: list, out_path: str, *, audio_source: str | None = None, audio_codec: str | None = None):
+    """
+    Join already-encoded segments with the concat demuxer (no video re-encode)
+    and mux the source audio in the same step.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as lst:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            lst.write(f"file '{escaped}'\n")
+        list_path = lst.name
+
+    cmd = [
+        FFMPEG_BIN, "-y", "-v", "error", "-nostdin",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+    ]
+    if audio_source:
+        cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?"]
+        cmd += audio_args(audio_codec) + ["-shortest"]
+    cmd += ["-c:v", "copy", "-movflags", "+faststart", "-f", "mp4", out_path]
+
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    finally:
+        os.remove(list_path)
+    if proc.returncode != 0:
+        raise FfmpegError(f"ffmpeg concat failed: {proc.stderr.decode(errors='ignore').strip()}")
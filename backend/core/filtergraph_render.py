@@ -0,0 +1,140 @@
+"""
+ffmpeg filter-graph caption renderer.
+
+The precomposed OverlayLayer (drawn with the regular OpenCV layout code) is
+translated into one filter graph: flat-colour caption box rows become drawbox
+filters and everything else (caption text, logo, watermark) is written to a
+single BGRA PNG that is overlaid on every frame. Decode, composite and encode
+all stay inside one ffmpeg process; no frame goes through Python.
+"""
+
+import os
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from core.ffmpeg_io import (
+    EVEN_PAD_FILTER,
+    FFMPEG_BIN,
+    FfmpegError,
+    audio_args,
+    decode_args,
+    probe_video,
+    x264_args,
+)
+from core.thumbnails import encode_thumbnails, thumbnail_frame_index
+
+_FILTERS_AVAILABLE = None
+
+
+def filtergraph_available() -> bool:
+    """True when the ffmpeg build has the drawbox and overlay filters (checked once)."""
+    global _FILTERS_AVAILABLE
+    if _FILTERS_AVAILABLE is None:
+        try:
+            out = subprocess.run(
+                [FFMPEG_BIN, "-hide_banner", "-filters"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30,
+            ).stdout.decode(errors="ignore")
+            names = {line.split()[1] for line in out.splitlines() if len(line.split()) > 2}
+            _FILTERS_AVAILABLE = {"drawbox", "overlay"} <= names
+        except Exception:
+            _FILTERS_AVAILABLE = False
+    return _FILTERS_AVAILABLE
+
+
+def build_filter_graph(layer, png_path: str) -> tuple[str, bool]:
+    """
+    Return (filter_complex, uses_png) for `layer`. When uses_png is True the
+    overlay image has been written to `png_path` and must be input #1.
+    """
+    # Box rows become drawbox fills. Edges are snapped to even rows so no
+    # yuv420 chroma pair is shared with frame content; leftovers go in the PNG.
+    boxes = []
+    for y0, y1, color in layer.solid_bands():
+        y0, y1 = y0 + (y0 & 1), y1 - (y1 & 1)
+        if y1 > y0:
+            boxes.append((y0, y1, color))
+    chain = [
+        f"drawbox=x=0:y={y0}:w={layer.width}:h={y1 - y0}:color=0x{r:02x}{g:02x}{b:02x}@1:t=fill"
+        for y0, y1, (b, g, r) in boxes
+    ]
+    base = "[0:v]" + (",".join(chain) or "null") + "[base]"
+
+    image = layer.to_bgra(skip_rows=[(y0, y1) for y0, y1, _ in boxes])
+    if image is None:
+        return f"{base};[base]{EVEN_PAD_FILTER}[v]", False
+
+    x0, y0, bgra = image
+    if not cv2.imwrite(png_path, bgra):
+        raise FfmpegError(f"Could not write overlay image {png_path}")
+    return f"{base};[base][1:v]overlay=x={x0}:y={y0}:format=auto,{EVEN_PAD_FILTER}[v]", True
+
+
+def render_video_filtergraph(
+    src_path: str,
+    out_path: str,
+    layer,
+    *,
+    info: dict | None = None,
+    thumbnail_at: float | None = None,
+) -> dict:
+    """
+    Render `src_path` into `out_path` with `layer` composited by ffmpeg itself.
+    With `thumbnail_at` (seconds) the graph also splits off the composited frame
+    at that time and sends it, raw, to stdout of the same ffmpeg process.
+    Returns stats: frames (from the probe), seconds, fps, thumbnails, plus the probe info used.
+    """
+    info = info or probe_video(src_path)
+    started = time.perf_counter()
+    thumbnails = {}
+
+    fd, png_path = tempfile.mkstemp(suffix=".png")
+    os.close(fd)
+    try:
+        graph, uses_png = build_filter_graph(layer, png_path)
+        video = "[v]"
+        if thumbnail_at is not None:
+            index = thumbnail_frame_index(info, thumbnail_at)
+            graph += f";[v]split=2[vout][thumb_in];[thumb_in]select='eq(n,{index})'[thumb]"
+            video = "[vout]"
+        cmd = [FFMPEG_BIN, "-y", "-v", "error", "-nostdin"] + decode_args() + ["-i", src_path]
+        if uses_png:
+            cmd += ["-i", png_path]
+        cmd += ["-filter_complex", graph, "-map", video]
+        if info.get("has_audio"):
+            cmd += ["-map", "0:a:0"] + audio_args(info.get("audio_codec"))
+        cmd += x264_args() + ["-f", "mp4", out_path]
+        if thumbnail_at is not None:
+            cmd += ["-map", "[thumb]", "-frames:v", "1", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+
+        proc = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE if thumbnail_at is not None else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        if proc.returncode != 0:
+            raise FfmpegError(f"ffmpeg filter-graph render failed: {proc.stderr.decode(errors='ignore').strip()}")
+    finally:
+        os.remove(png_path)
+
+    if thumbnail_at is not None:
+        # the graph pads to even dimensions before [v]
+        width, height = layer.width + (layer.width & 1), layer.height + (layer.height & 1)
+        if len(proc.stdout) == width * height * 3:
+            thumbnails = encode_thumbnails(np.frombuffer(proc.stdout, np.uint8).reshape(height, width, 3))
+
+    elapsed = time.perf_counter() - started
+    frames = info.get("nb_frames") or 0
+    stats = {
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "thumbnails": thumbnails,
+        "info": info,
+    }
+    print(f"[render] filter graph: ~{frames} frames in {elapsed:.2f}s ({stats['fps']:.1f} fps)")
+    return stats
@@ -0,0 +1,86 @@
+"""
+Fixed-size ring of preallocated frame buffers between a decode thread and the
+consumer (overlay + encode). The producer blocks when every slot is in use,
+so memory stays at `slots` frames no matter how long the video is.
+
+A decode failure (FfmpegError from the reader, including one found at end of
+stream) is raised by the iterator in place of the end of the video.
+"""
+
+import os
+import queue
+import threading
+
+import numpy as np
+
+RING_SLOTS = int(os.getenv("RENDER_RING_SLOTS", "4"))
+
+_EOF = object()
+
+
+class FrameRing:
+    def __init__(self, reader, slots: int | None = None):
+        self._reader = reader
+        self._slots = max(2, int(slots or RING_SLOTS))
+        self._buffers = [
+            np.empty((reader.height, reader.width, 3), dtype=np.uint8) for _ in range(self._slots)
+        ]
+        self._free = queue.Queue()
+        for i in range(self._slots):
+            self._free.put(i)
+        self._ready = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="frame-ring-decode", daemon=True)
+        self._thread.start()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._buffers)
+
+    def _produce(self):
+        try:
+            while not self._stop.is_set():
+                idx = self._free.get()  # backpressure: wait for the consumer to release a slot
+                if idx is None or self._stop.is_set():
+                    break
+                if not self._reader.read_into(self._buffers[idx]):
+                    break
+                self._ready.put(idx)
+        except Exception as e:
+            self._ready.put(e)
+            return
+        self._ready.put(_EOF)
+
+    def __iter__(self):
+        """
+        Yield decoded frames. A yielded buffer is recycled as soon as the loop
+        body finishes, so consumers must not keep references to it.
+        """
+        while True:
+            item = self._ready.get()
+            if item is _EOF:
+                return
+            if isinstance(item, Exception):
+                raise item
+            try:
+                yield self._buffers[item]
+            finally:
+                self._free.put(item)
+
+    def close(self):
+        self._stop.set()
+        self._free.put(None)  # wake the producer if it is waiting for a slot
+        try:
+            self._reader.close()  # unblocks a pending pipe read
+        finally:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            self.close()
+        except Exception:
+            if exc_type is None:
+                raise
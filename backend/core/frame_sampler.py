@@ -0,0 +1,263 @@
+"""
+Timestamp frame sampler for text-area detection.
+
+Instead of decoding (and converting to RGB in Python) every frame of the
+opening seconds, ffmpeg seeks to the requested timestamps, decodes only what
+it has to and scales/converts just the selected frames to small BGR arrays.
+
+Dense timestamps (the usual "10 frames from the first 2 seconds") are read
+in one decode of that window with a `select` filter; sparse ones get one
+accurate seek each, run in parallel.
+
+scene_sample_times() picks those timestamps from the content instead: one
+cheap low-res grayscale pass over the clip finds the moments where the top
+of the frame changes, so captions that appear later are seen and identical
+frames are not OCR'd twice. is_static() uses the same thumbnails to spot
+still-image clips for the static render fast path.
+"""
+
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.ffmpeg_io import FFMPEG_BIN, FfmpegError, probe_video
+
+# Longest side of sampled frames; detection results are scaled back to the source
+DETECT_SAMPLE_MAX_SIDE = int(os.getenv("DETECT_SAMPLE_MAX_SIDE", "1280"))
+# Timestamps spanning at most this many seconds are read in a single decode pass
+SAMPLE_WINDOW_SECONDS = float(os.getenv("SAMPLE_WINDOW_SECONDS", "4"))
+
+# Scene-aware sampling for detection (see scene_sample_times)
+SCENE_DETECTION_ENABLED = os.getenv("SCENE_DETECTION_ENABLED", "true").lower() == "true"
+SCENE_SAMPLE_FPS = float(os.getenv("SCENE_SAMPLE_FPS", "4"))
+SCENE_SCAN_SECONDS = float(os.getenv("SCENE_SCAN_SECONDS", "60"))
+# Fraction of top-region thumbnail pixels whose grey level moved by more than _SCENE_PIXEL_DELTA
+SCENE_CHANGE_FRACTION = float(os.getenv("SCENE_CHANGE_FRACTION", "0.005"))
+SCENE_TOP_FRACTION = float(os.getenv("SCENE_TOP_FRACTION", "0.5"))
+SCENE_MAX_FRAMES = int(os.getenv("SCENE_MAX_FRAMES", "8"))
+
+_SEEK_WORKERS = 4
+_SCENE_THUMB_WIDTH = 64
+_SCENE_PIXEL_DELTA = 20
+
+
+def sample_size(info: dict, max_side: int | None = DETECT_SAMPLE_MAX_SIDE) -> tuple[int, int, float]:
+    """(width, height, scale) of sampled frames; scale = sampled / source."""
+    width, height = info["width"], info["height"]
+    scale = 1.0
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale))), scale
+
+
+def scale_area(area, factor: float) -> tuple:
+    """Scale an (x, y, w, h) rectangle by `factor`."""
+    return tuple(int(round(v * factor)) for v in area)
+
+
+def leading_sample_times(info: dict, count: int = 10, seconds: float = 2.0) -> list[float]:
+    """
+    `count` timestamps evenly spread over the first `seconds`, on the same
+    frame grid the old iter_frames() sampling used (every Nth frame).
+    """
+    fps = info.get("fps") or 30.0
+    step = max(1, int(fps * seconds) // count)
+    duration = info.get("duration") or 0.0
+    times = [k * step / fps for k in range(count)]
+    if duration:
+        times = [t for t in times if t < duration] or [0.0]
+    return times
+
+
+def _read_frames(cmd: list, width: int, height: int, limit: int) -> list[np.ndarray]:
+    frame_bytes = width * height * 3
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=120)
+    if proc.returncode != 0:
+        raise FfmpegError(f"ffmpeg sampling failed: {proc.stderr.decode(errors='ignore').strip()}")
+    data = proc.stdout
+    count = min(limit, len(data) // frame_bytes)
+    return [
+        np.frombuffer(data, np.uint8, frame_bytes, i * frame_bytes).reshape(height, width, 3).copy()
+        for i in range(count)
+    ]
+
+
+def _sample_window(path: str, times: list, info: dict, width: int, height: int) -> list[np.ndarray]:
+    fps = info.get("fps") or 30.0
+    start = times[0]
+    indices = sorted({int(round((t - start) * fps)) for t in times})
+    select = "+".join(f"eq(n,{i})" for i in indices)
+
+    cmd = [FFMPEG_BIN, "-v", "error", "-nostdin"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.6f}"]
+    cmd += [
+        "-i", path,
+        "-map", "0:v:0",
+        "-vf", f"select='{select}',scale={width}:{height}:flags=area",
+        "-fps_mode", "passthrough",
+        "-frames:v", str(len(indices)),
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+    ]
+    return _read_frames(cmd, width, height, len(indices))
+
+
+def _sample_one(path: str, t: float, width: int, height: int) -> np.ndarray | None:
+    cmd = [
+        FFMPEG_BIN, "-v", "error", "-nostdin",
+        "-ss", f"{t:.6f}", "-i", path,
+        "-map", "0:v:0",
+        "-vf", f"scale={width}:{height}:flags=area",
+        "-frames:v", "1",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+    ]
+    frames = _read_frames(cmd, width, height, 1)
+    return frames[0] if frames else None
+
+
+def sample_frames(
+    path: str,
+    times: list,
+    *,
+    info: dict | None = None,
+    max_side: int | None = DETECT_SAMPLE_MAX_SIDE,
+) -> tuple[list[np.ndarray], float]:
+    """
+    Decode the frames at `times` (seconds) as BGR arrays whose longest side is
+    at most `max_side`. Returns (frames, scale) with scale = sampled / source size;
+    frames past the end of the video are dropped.
+    """
+    info = info or probe_video(path)
+    width, height, scale = sample_size(info, max_side)
+    times = sorted(max(0.0, float(t)) for t in times)
+    if not times:
+        return [], scale
+
+    if times[-1] - times[0] <= SAMPLE_WINDOW_SECONDS:
+        frames = _sample_window(path, times, info, width, height)
+    else:
+        with ThreadPoolExecutor(max_workers=min(_SEEK_WORKERS, len(times))) as pool:
+            frames = [f for f in pool.map(lambda t: _sample_one(path, t, width, height), times) if f is not None]
+    return frames, scale
+
+
+def _thumbnail_cmd(path: str, info: dict, fps: float, max_seconds: float) -> tuple[list, int, int]:
+    """ffmpeg command writing grayscale scene thumbnails at `fps` to stdout, plus their (width, height)."""
+    width = _SCENE_THUMB_WIDTH
+    height = max(2, int(round(width * info["height"] / info["width"] / 2)) * 2)
+    # Change detection on 64px thumbnails does not need B-frames or deblocking;
+    # skipping them makes this pass roughly 3x cheaper than a full decode.
+    cmd = [FFMPEG_BIN, "-v", "error", "-nostdin", "-skip_frame", "bidir", "-skip_loop_filter", "all"]
+    if max_seconds:
+        cmd += ["-t", f"{max_seconds:.3f}"]
+    cmd += [
+        "-i", path,
+        "-map", "0:v:0",
+        "-vf", f"fps={fps},scale={width}:{height}:flags=area",
+        "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1",
+    ]
+    return cmd, width, height
+
+
+def _top_thumbnails(path: str, info: dict, fps: float, max_seconds: float, top_fraction: float) -> np.ndarray:
+    """Grayscale thumbnails of the top `top_fraction` of the clip at `fps`, shape (n, h, w)."""
+    cmd, width, height = _thumbnail_cmd(path, info, fps, max_seconds)
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=300)
+    if proc.returncode != 0:
+        raise FfmpegError(f"ffmpeg scene scan failed: {proc.stderr.decode(errors='ignore').strip()}")
+    count = len(proc.stdout) // (width * height)
+    frames = np.frombuffer(proc.stdout, np.uint8, count * width * height).reshape(count, height, width)
+    return frames[:, :max(1, int(round(height * top_fraction)))].astype(np.int16)
+
+
+def _changed_fraction(a: np.ndarray, b: np.ndarray) -> float:
+    return float((np.abs(a - b) > _SCENE_PIXEL_DELTA).mean())
+
+
+def scene_sample_times(
+    path: str,
+    *,
+    info: dict | None = None,
+    fps: float = SCENE_SAMPLE_FPS,
+    max_seconds: float = SCENE_SCAN_SECONDS,
+    change_fraction: float = SCENE_CHANGE_FRACTION,
+    top_fraction: float = SCENE_TOP_FRACTION,
+    max_frames: int = SCENE_MAX_FRAMES,
+) -> list[float]:
+    """
+    Timestamps worth OCR-ing: the first frame plus every point where the top
+    of the frame has changed (more than `change_fraction` of its pixels differ
+    from the last picked frame) and then settled for one sample, so a
+    fading-in caption is read once it is fully visible. A top region that
+    never settles is still picked every 2 seconds. At most `max_frames`
+    timestamps, spread evenly when there are more changes than that.
+    """
+    info = info or probe_video(path)
+    thumbs = _top_thumbnails(path, info, fps, max_seconds, top_fraction)
+    if len(thumbs) == 0:
+        return [0.0]
+
+    picked = [0]
+    reference = thumbs[0]
+    max_gap = max(1, int(round(2 * fps)))
+    for k in range(1, len(thumbs)):
+        if _changed_fraction(thumbs[k], reference) <= change_fraction:
+            continue
+        settled = k + 1 >= len(thumbs) or _changed_fraction(thumbs[k + 1], thumbs[k]) <= change_fraction / 2
+        if settled or k - picked[-1] >= max_gap:
+            picked.append(k)
+            reference = thumbs[k]
+
+    if len(picked) > max_frames:
+        keep = np.linspace(0, len(picked) - 1, max_frames).round().astype(int)
+        picked = [picked[i] for i in sorted(set(keep.tolist()))]
+    return [k / fps for k in picked]
+
+
+def is_static(path: str, info: dict | None = None, *, fps: float = 2.0, change_fraction: float = 0.001) -> bool:
+    """
+    True when no thumbnail sampled at `fps` over the whole clip differs from
+    the first one in more than `change_fraction` of its pixels (a still image,
+    or one with only compression noise). Stops decoding at the first change,
+    so moving clips cost a fraction of a second.
+    """
+    info = info or probe_video(path)
+    cmd, width, height = _thumbnail_cmd(path, info, fps, 0)
+    size = width * height
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=size)
+    first, count, static = None, 0, True
+    try:
+        while True:
+            buf = proc.stdout.read(size)
+            if len(buf) < size:
+                break
+            thumb = np.frombuffer(buf, np.uint8).reshape(height, width).astype(np.int16)
+            count += 1
+            if first is None:
+                first = thumb
+            elif _changed_fraction(thumb, first) > change_fraction:
+                static = False
+                break
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+    if static and (count < 2 or proc.returncode != 0):
+        # nothing to compare, or the scan died: not proven static
+        return False
+    return static
+
+
+def detection_sample_times(path: str, info: dict) -> list[float]:
+    """Timestamps for text-area detection: scene-aware when enabled, else the leading 2 seconds."""
+    if SCENE_DETECTION_ENABLED:
+        try:
+            times = scene_sample_times(path, info=info)
+            print(f"[sampler] scene scan picked {len(times)} frames at {[round(t, 2) for t in times]}")
+            return times
+        except FfmpegError as e:
+            print(f"[sampler] scene scan failed, using leading frames: {e}")
+    return leading_sample_times(info)
@@ -0,0 +1,116 @@
+"""
+Process-wide registry of pre-authenticated Gemini (Vertex AI) clients.
+
+Building a genai.Client per call repeats ADC discovery, an OAuth token fetch
+and a fresh TLS connection before the model sees a single byte. Here every
+worker process discovers credentials once, keeps one client per
+(project, location) (each holds its own keep-alive httpx connection pool,
+safe to share between request threads) and refreshes the shared token on a
+timer (GEMINI_TOKEN_REFRESH_SECONDS, well inside the 1h token lifetime), so
+no request ever waits for a token fetch.
+
+As before, the ADC project wins over the `project` a caller passes; the
+argument is the fallback when ADC does not name one.
+"""
+
+import os
+import threading
+import time
+
+GEMINI_PROJECT = os.getenv("GEMINI_PROJECT", "publefy-484406")
+# Refresh the OAuth token this often (tokens live 3600s)
+GEMINI_TOKEN_REFRESH_SECONDS = int(os.getenv("GEMINI_TOKEN_REFRESH_SECONDS", "2700"))
+# Locations whose clients are built at startup (comma separated)
+GEMINI_WARM_LOCATIONS = [
+    loc.strip() for loc in os.getenv("GEMINI_WARM_LOCATIONS", "us-central1").split(",") if loc.strip()
+]
+
+_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+_lock = threading.Lock()
+_clients = {}
+_adc = {"credentials": None, "project": None, "refresher": None}
+_counters = {"clients_built": 0, "lookups": 0, "token_refreshes": 0, "refresh_errors": 0}
+
+
+def _refresh_token():
+    from google.auth.transport.requests import Request
+
+    credentials = _adc["credentials"]
+    try:
+        credentials.refresh(Request())
+        with _lock:
+            _counters["token_refreshes"] += 1
+    except Exception as e:
+        with _lock:
+            _counters["refresh_errors"] += 1
+        print(f"[gemini] token refresh failed: {e}")
+
+
+def _refresh_loop():
+    while True:
+        time.sleep(GEMINI_TOKEN_REFRESH_SECONDS)
+        _refresh_token()
+
+
+def _credentials():
+    """(credentials, ADC project) discovered once per process, token fetched and kept fresh."""
+    with _lock:
+        if _adc["credentials"] is not None:
+            return _adc["credentials"], _adc["project"]
+
+        from google.auth import default as google_auth_default
+
+        credentials, project = google_auth_default(scopes=_SCOPES)
+        _adc["credentials"], _adc["project"] = credentials, project
+
+    _refresh_token()
+    with _lock:
+        if _adc["refresher"] is None:
+            _adc["refresher"] = threading.Thread(target=_refresh_loop, name="gemini-token-refresh", daemon=True)
+            _adc["refresher"].start()
+    return credentials, project
+
+
+def get_client(project: str | None = None, location: str = "us-central1"):
+    """Shared genai.Client for (ADC project or `project`, `location`)."""
+    from google import genai
+
+    credentials, detected_project = _credentials()
+    key = (detected_project or project or GEMINI_PROJECT, location)
+    with _lock:
+        _counters["lookups"] += 1
+        client = _clients.get(key)
+        if client is None:
+            client = genai.Client(
+                vertexai=True,
+                project=key[0],
+                location=location,
+                credentials=credentials,
+            )
+            _clients[key] = client
+            _counters["clients_built"] += 1
+        return client
+
+
+def warm_gemini_clients():
+    """Discover credentials and build the GEMINI_WARM_LOCATIONS clients in the background."""
+    def _warm():
+        try:
+            for location in GEMINI_WARM_LOCATIONS:
+                get_client(GEMINI_PROJECT, location)
+            print(f"[gemini] clients ready: {sorted(_clients)}")
+        except Exception as e:
+            print(f"[gemini] warm-up failed (clients are built on first use): {e}")
+
+    threading.Thread(target=_warm, name="gemini-warmup", daemon=True).start()
+
+
+def gemini_client_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+        stats["clients"] = [f"{project}/{location}" for project, location in _clients]
+        credentials = _adc["credentials"]
+    stats["token_expiry"] = credentials.expiry.isoformat() if credentials is not None and credentials.expiry else None
+    stats["pid"] = os.getpid()
+    return stats
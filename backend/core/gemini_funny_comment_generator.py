@@ -1,8 +1,8 @@
-from google import genai
 from google.genai import types
-from google.auth import default as google_auth_default
 import re
 
+from core.gemini_clients import get_client
+
 
 def generate_meme_captions(
     video_summary: str = "",
@@ -28,15 +28,7 @@ def generate_meme_captions(
     Returns:
         List of caption strings
     """
-    credentials, project_id = google_auth_default(
-        scopes=["https://www.googleapis.com/auth/cloud-platform"]
-    )
-    client = genai.Client(
-        vertexai=True,
-        project=project_id or "publefy",
-        location="us-central1",
-        credentials=credentials,
-    )
+    client = get_client("publefy", "us-central1")
 
     # Build summary text
     if video_summary and audio_summary:
@@ -0,0 +1,107 @@
+"""
+Video parts for Gemini requests without holding the clip in memory.
+
+The summarizers used to read the whole file and send it inline
+(types.Part.from_bytes): a second in-memory copy of up to 100 MB per request,
+re-uploaded to Vertex even when the clip already sits in our bucket.
+
+video_part() picks, in order:
+  - the clip's own gs:// URI when the caller knows it (bank videos)
+  - inline bytes for small clips (<= GEMINI_INLINE_MAX_MB), cheaper than a round trip
+  - a streamed upload of the local file to GEMINI_STAGING_PREFIX in the video
+    bucket, referenced by URI and deleted when the request is done
+Inline bytes remain the fallback when no bucket is configured or staging fails.
+"""
+
+import mimetypes
+import os
+import threading
+from contextlib import contextmanager
+from uuid import uuid4
+
+from google.genai import types
+
+# Clips up to this size are sent inline; larger ones go by gs:// URI
+GEMINI_INLINE_MAX_MB = float(os.getenv("GEMINI_INLINE_MAX_MB", "8"))
+GEMINI_STAGING_PREFIX = os.getenv("GEMINI_STAGING_PREFIX", "gemini_staging/")
+
+_lock = threading.Lock()
+_counters = {"uri": 0, "inline": 0, "inline_bytes": 0, "staged": 0, "staged_bytes": 0, "staging_errors": 0}
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _counters[name] += n
+
+
+def gemini_media_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    stats["inline_max_mb"] = GEMINI_INLINE_MAX_MB
+    stats["pid"] = os.getpid()
+    return stats
+
+
+def gcs_uri(blob_name: str) -> str | None:
+    """gs:// URI of `blob_name` in the video bucket, None when no bucket is configured."""
+    bucket_name = os.getenv("VIDEO_BUCKET_NAME")
+    return f"gs://{bucket_name}/{blob_name}" if bucket_name and blob_name else None
+
+
+def _bucket():
+    bucket_name = os.getenv("VIDEO_BUCKET_NAME")
+    user_project = os.getenv("USER_PROJECT")
+    if not bucket_name or not user_project:
+        return None, None
+    from core.data.gcloud_repo import GCloudRepository
+
+    client = GCloudRepository(bucket_name, user_project).get_client()
+    return client, client.bucket(bucket_name)
+
+
+def _inline_part(path: str, mime_type: str) -> types.Part:
+    with open(path, "rb") as f:
+        data = f.read()
+    _count("inline")
+    _count("inline_bytes", len(data))
+    return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+
+@contextmanager
+def video_part(path: str, *, uri: str | None = None, mime_type: str | None = None):
+    """
+    Yield a types.Part for the clip at `path` (see module docstring for the
+    choice). `uri` is the clip's gs:// URI when it is already in GCS.
+    """
+    mime_type = mime_type or mimetypes.guess_type(path)[0] or "video/mp4"
+    if uri:
+        _count("uri")
+        yield types.Part.from_uri(file_uri=uri, mime_type=mime_type)
+        return
+
+    size = os.path.getsize(path)
+    client, bucket = _bucket() if size > GEMINI_INLINE_MAX_MB * 1024 * 1024 else (None, None)
+    if bucket is None:
+        yield _inline_part(path, mime_type)
+        return
+
+    _, ext = os.path.splitext(path)
+    blob = bucket.blob(f"{GEMINI_STAGING_PREFIX}{uuid4().hex}{ext or '.mp4'}")
+    try:
+        # streamed from disk in chunks, the clip is never read into memory
+        blob.upload_from_filename(path, content_type=mime_type, client=client)
+    except Exception as e:
+        _count("staging_errors")
+        print(f"[gemini] staging upload failed, sending inline: {e}")
+        yield _inline_part(path, mime_type)
+        return
+
+    _count("staged")
+    _count("staged_bytes", size)
+    try:
+        yield types.Part.from_uri(file_uri=f"gs://{bucket.name}/{blob.name}", mime_type=mime_type)
+    finally:
+        try:
+            blob.delete(client=client)
+        except Exception as e:
+            print(f"[gemini] could not delete staged {blob.name}: {e}")
@@ -1,39 +1,49 @@
-from google import genai
+import os
 from google.genai import types
-from google.auth import default as google_auth_default
-import mimetypes
 
+from core.analysis_proxy import ANALYSIS_MEDIA_RESOLUTION, analysis_proxy, expected_variant, input_variant
+from core.disk_lru import release_pin
+from core.gemini_clients import get_client
+from core.gemini_media import video_part
+from core.render_cache import file_fingerprint
+from core.summary_store import cached_summary
 
-def summarize_video(video_path: str) -> str:
-    credentials, project_id = google_auth_default(
-        scopes=["https://www.googleapis.com/auth/cloud-platform"]
-    )
+SUMMARY_PROMPT = "describe the content of this video and include the audio as well"
+SUMMARY_MODEL = "gemini-2.0-flash-001"
+
+
+def summarize_video(video_path: str, source_fp: str | None = None) -> str:
+    """
+    Free-form description of the clip at `video_path`, served from the summary
+    store when `source_fp` (default: the file's own fingerprint) was summarized before.
+    """
+    source_fp = source_fp or file_fingerprint(video_path)
+
+    def summarize():
+        proxy = analysis_proxy(video_path, source_fp=source_fp)
+        try:
+            return {"text": _summarize_video_gemini(video_path, proxy)}, input_variant(proxy)
+        finally:
+            release_pin(proxy)
+
+    summary = cached_summary(source_fp, SUMMARY_PROMPT, SUMMARY_MODEL, summarize, variant=expected_variant())
+    return summary.get("text", "")
+
+
+def _summarize_video_gemini(video_path: str, proxy: str | None = None) -> str:
     gemini_project = os.getenv("GEMINI_PROJECT", "publefy-484406")
     gemini_location = os.getenv("GEMINI_LOCATION_VIDEO", "us-central1")
-    gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-001")
 
-    client = genai.Client(
-        vertexai=True,
-        project=project_id or gemini_project,
-        location=gemini_location,
-        credentials=credentials,
-    )
+    client = get_client(gemini_project, gemini_location)
 
-    mime_type = mimetypes.guess_type(video_path)[0]
-    with open(video_path, "rb") as f:
-        video_data = f.read()
-
-    video_part = types.Part.from_bytes(data=video_data, mime_type=mime_type)
-    prompt = types.Part.from_text(
-        text="describe the content of this video and include the audio as well"
-    )
+    prompt = types.Part.from_text(text=SUMMARY_PROMPT)
 
-    contents = [types.Content(role="user", parts=[video_part, prompt])]
     config = types.GenerateContentConfig(
         temperature=1,
         top_p=0.95,
         max_output_tokens=8192,
         response_modalities=["TEXT"],
+        media_resolution=ANALYSIS_MEDIA_RESOLUTION if proxy else None,
         safety_settings=[
             types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
             types.SafetySetting(
@@ -47,8 +57,10 @@ def summarize_video(video_path: str) -> str:
     )
 
     summary = ""
-    for chunk in client.models.generate_content_stream(
-        model="gemini-2.0-flash-001", contents=contents, config=config
-    ):
-        summary += chunk.text
+    with video_part(proxy or video_path) as part:
+        contents = [types.Content(role="user", parts=[part, prompt])]
+        for chunk in client.models.generate_content_stream(
+            model=SUMMARY_MODEL, contents=contents, config=config
+        ):
+            summary += chunk.text
     return summary
@@ -0,0 +1,258 @@
+"""
+Ingest: pre-flight validation and one canonical mezzanine per uploaded source.
+
+preflight() reads only the container/stream headers (ffprobe, milliseconds)
+and rejects uploads that are not readable video or exceed the UPLOAD_* limits
+before any frame is decoded. Its probe result is handed to normalize(), so the
+headers are read once.
+
+Uploads arrive in any codec, size, frame rate and rotation. The upload is
+probed once and, unless it already is canonical, transcoded once to:
+
+    H.264 yuv420p, display orientation (rotation applied), at most
+    INGEST_MAX_SHORT_SIDE x INGEST_MAX_LONG_SIDE, at most INGEST_MAX_FPS,
+    audio stream-copied when mp4 takes it (AAC otherwise), faststart mp4
+
+Every later stage (frame sampling, OCR, render, Gemini upload) reads the
+mezzanine instead of the original. Mezzanines live in a local disk LRU
+(core.disk_lru, INGEST_CACHE_DIR) keyed by the source content fingerprint,
+next to the probe info of the mezzanine, so a re-upload of the same file costs
+neither a transcode nor a probe. Each request gets its own pin of the
+mezzanine and gives it back with release_pin(). The original file is never
+modified; callers keep archiving it as before.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+
+from core.compute_budget import budgeted, current_threads
+from core.disk_lru import DiskLRU
+from core.ffmpeg_io import (
+    FFMPEG_BIN,
+    MP4_AUDIO_COPY_CODECS,
+    X264_PRESET,
+    FfmpegError,
+    audio_args,
+    decode_args,
+    probe_video,
+)
+from core.render_cache import file_fingerprint
+
+# Bump when the mezzanine settings change what a normalized file looks like
+INGEST_VERSION = "1"
+
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "true").lower() == "true"
+INGEST_MAX_LONG_SIDE = int(os.getenv("INGEST_MAX_LONG_SIDE", "1920"))
+INGEST_MAX_SHORT_SIDE = int(os.getenv("INGEST_MAX_SHORT_SIDE", "1080"))
+INGEST_MAX_FPS = float(os.getenv("INGEST_MAX_FPS", "30"))
+# Mezzanine quality: every render re-encodes from it, so keep it near-transparent
+INGEST_X264_CRF = os.getenv("INGEST_X264_CRF", "18")
+INGEST_CACHE_DIR = os.getenv("INGEST_CACHE_DIR", "/tmp/publefy_ingest_cache")
+INGEST_CACHE_MAX_MB = int(os.getenv("INGEST_CACHE_MAX_MB", "4096"))
+INGEST_TIMEOUT_SECONDS = int(os.getenv("INGEST_TIMEOUT_SECONDS", "900"))
+
+# Pre-flight limits for uploads
+# Also the app's MAX_CONTENT_LENGTH (main.py)
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "100"))
+UPLOAD_MIN_DURATION_SECONDS = float(os.getenv("UPLOAD_MIN_DURATION_SECONDS", "0.5"))
+UPLOAD_MAX_DURATION_SECONDS = float(os.getenv("UPLOAD_MAX_DURATION_SECONDS", "600"))
+UPLOAD_MAX_LONG_SIDE = int(os.getenv("UPLOAD_MAX_LONG_SIDE", "4096"))
+PREFLIGHT_PROBE_TIMEOUT = float(os.getenv("PREFLIGHT_PROBE_TIMEOUT", "15"))
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "transcodes": 0, "passthrough": 0, "errors": 0, "evictions": 0, "rejected": 0}
+
+
+class UploadRejected(Exception):
+    """The upload failed pre-flight; `status_code` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _counters[name] += n
+
+
+def ingest_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    lookups = stats["hits"] + stats["transcodes"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["enabled"] = INGEST_ENABLED
+    stats["ingest_version"] = INGEST_VERSION
+    stats["pid"] = os.getpid()
+    return stats
+
+
+def check_upload_size(num_bytes: int | None):
+    """Reject by size alone, e.g. from the request Content-Length before the upload is written."""
+    if num_bytes and num_bytes > UPLOAD_MAX_MB * 1024 * 1024:
+        _count("rejected")
+        raise UploadRejected(f"File is too large ({num_bytes / (1024 * 1024):.0f} MB, limit {UPLOAD_MAX_MB} MB)", 413)
+
+
+def preflight(path: str) -> dict:
+    """
+    Validate the upload at `path` from its headers only and return its
+    probe_video() info (duration, streams, display resolution, rotation, codecs).
+    Raises UploadRejected when it is not a readable video or breaks a limit.
+    """
+    check_upload_size(os.path.getsize(path))
+    try:
+        info = probe_video(path, timeout=PREFLIGHT_PROBE_TIMEOUT)
+    except (FfmpegError, subprocess.TimeoutExpired, ValueError) as e:
+        _count("rejected")
+        raise UploadRejected(f"Not a readable video file: {e}")
+
+    problem, status = None, 400
+    if not info["width"] or not info["height"] or not info.get("video_codec"):
+        problem = "Video stream has no decodable picture"
+    elif info["duration"] and info["duration"] < UPLOAD_MIN_DURATION_SECONDS:
+        problem = f"Video is too short ({info['duration']:.2f}s, minimum {UPLOAD_MIN_DURATION_SECONDS:g}s)"
+    elif info["duration"] > UPLOAD_MAX_DURATION_SECONDS:
+        problem, status = f"Video is too long ({info['duration']:.0f}s, limit {UPLOAD_MAX_DURATION_SECONDS:g}s)", 413
+    elif max(info["width"], info["height"]) > UPLOAD_MAX_LONG_SIDE:
+        problem, status = (
+            f"Video resolution {info['width']}x{info['height']} exceeds {UPLOAD_MAX_LONG_SIDE}px", 413
+        )
+    if problem:
+        _count("rejected")
+        raise UploadRejected(problem, status)
+    return info
+
+
+def target_size(info: dict) -> tuple[int, int]:
+    """Display size scaled down (never up) to fit the mezzanine bounds, even on both sides."""
+    width, height = info["width"], info["height"]
+    long_side, short_side = max(width, height), min(width, height)
+    factor = min(1.0, INGEST_MAX_LONG_SIDE / long_side, INGEST_MAX_SHORT_SIDE / short_side) if short_side else 1.0
+    return (
+        max(2, int(round(width * factor / 2)) * 2),
+        max(2, int(round(height * factor / 2)) * 2),
+    )
+
+
+def is_canonical(info: dict) -> bool:
+    """True when `info` (probe_video) already describes a valid mezzanine."""
+    return (
+        info.get("video_codec") == "h264"
+        and info.get("pix_fmt") == "yuv420p"
+        and not info.get("rotation")
+        and target_size(info) == (info["width"], info["height"])
+        and info.get("fps", 0) <= INGEST_MAX_FPS + 0.01
+        and (not info.get("has_audio") or info.get("audio_codec") in MP4_AUDIO_COPY_CODECS)
+    )
+
+
+def _cache_key(source_fp: str) -> str:
+    raw = json.dumps([source_fp, INGEST_VERSION, INGEST_MAX_LONG_SIDE, INGEST_MAX_SHORT_SIDE, INGEST_MAX_FPS, INGEST_X264_CRF])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@budgeted("ingest")
+def transcode_mezzanine(src_path: str, out_path: str, info: dict):
+    """One ffmpeg pass: autorotate, downscale, cap fps, H.264 yuv420p + mp4-friendly audio."""
+    width, height = target_size(info)
+    filters = []
+    if (width, height) != (info["width"], info["height"]):
+        filters.append(f"scale={width}:{height}:flags=bicubic")
+    if info.get("fps", 0) > INGEST_MAX_FPS + 0.01:
+        filters.append(f"fps={INGEST_MAX_FPS:g}")
+    filters.append("format=yuv420p")
+
+    cmd = [FFMPEG_BIN, "-y", "-v", "error", "-nostdin"] + decode_args()
+    cmd += ["-i", src_path, "-map", "0:v:0", "-vf", ",".join(filters)]
+    if info.get("has_audio"):
+        cmd += ["-map", "0:a:0"] + audio_args(info.get("audio_codec"))
+    cmd += [
+        "-c:v", "libx264", "-preset", X264_PRESET, "-crf", INGEST_X264_CRF,
+        "-threads", str(current_threads() or 0),
+        "-movflags", "+faststart", "-f", "mp4", out_path,
+    ]
+    proc = subprocess.run(
+        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=INGEST_TIMEOUT_SECONDS
+    )
+    if proc.returncode != 0:
+        raise FfmpegError(f"ffmpeg ingest transcode failed: {proc.stderr.decode(errors='ignore').strip()}")
+
+
+class IngestCache:
+    def __init__(self, directory: str = INGEST_CACHE_DIR, max_mb: int = INGEST_CACHE_MAX_MB):
+        # entry: the mezzanine and its probe info
+        self.lru = DiskLRU(directory, max_mb, suffixes=(".mp4", ".json"))
+
+    def _load(self, key: str) -> dict | None:
+        try:
+            with open(self.lru.path(key, ".json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def normalize(self, path: str, *, source_fp: str | None = None, info: dict | None = None) -> dict:
+        """
+        Return {"path", "info", "source_fp", "normalized"} for the upload at `path`.
+        `info` is the upload's own probe (e.g. from preflight()); probed here when omitted.
+
+        `path` in the result is this request's pin of the mezzanine, to be given
+        back with release_pin() (or `path` itself when the upload is already
+        canonical, ingest is disabled, or the transcode failed);
+        `info` is its probe_video() dict; `source_fp` is the fingerprint of the
+        original upload, which stays the identity used by the other caches.
+        Raises FfmpegError only when the upload cannot be probed at all.
+        """
+        source_fp = source_fp or file_fingerprint(path)
+        passthrough = {"path": path, "info": info, "source_fp": source_fp, "normalized": False}
+        if not INGEST_ENABLED:
+            passthrough["info"] = info or probe_video(path)
+            return passthrough
+
+        key = _cache_key(source_fp)
+        with self.lru.key_lock(key):
+            cached = self._load(key)
+            pin = self.lru.pin(key) if cached is not None else None
+            if pin is not None:
+                _count("hits")
+                return {"path": pin, "info": cached, "source_fp": source_fp, "normalized": True}
+
+            source_info = info or probe_video(path)
+            if is_canonical(source_info):
+                _count("passthrough")
+                passthrough["info"] = source_info
+                return passthrough
+
+            def make(part):
+                nonlocal info
+                transcode_mezzanine(path, part, source_info)
+                info = probe_video(part)
+                with open(self.lru.path(key, ".json"), "w") as f:
+                    json.dump(info, f)
+
+            try:
+                pin = self.lru.build(key, make)
+            except Exception as e:
+                _count("errors")
+                print(f"[ingest] normalization failed, using the original upload: {e}")
+                passthrough["info"] = source_info
+                return passthrough
+
+            _count("transcodes")
+            print(
+                f"[ingest] {source_info.get('video_codec')} {source_info['width']}x{source_info['height']}"
+                f"@{source_info['fps']:.2f} -> h264 {info['width']}x{info['height']}@{info['fps']:.2f}"
+            )
+            _count("evictions", self.lru.evict())
+            return {"path": pin, "info": info, "source_fp": source_fp, "normalized": True}
+
+
+ingest_cache = IngestCache()
+
+
+def ingest(path: str, *, source_fp: str | None = None, info: dict | None = None) -> dict:
+    """Normalize an upload through the shared mezzanine cache (see IngestCache.normalize)."""
+    return ingest_cache.normalize(path, source_fp=source_fp, info=info)
@@ -0,0 +1,135 @@
+"""
+OCR engine used by the text-area detectors.
+
+image_to_data() returns the same dict shape as
+pytesseract.image_to_data(..., output_type=Output.DICT) (text/conf/left/top/
+width/height lists, one entry per word), so callers keep their parsing code.
+
+Backends:
+  - tesserocr: libtesseract in-process. One initialised engine per thread,
+    created on first use and reused for every later request on that thread,
+    so there is no process spawn, temp image or TSV parsing per frame.
+  - pytesseract: one tesseract subprocess per call. Used when tesserocr is
+    not installed, cannot find its language data, or OCR_ENGINE=pytesseract.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto").lower()  # auto | tesserocr | pytesseract
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+# Where distro packages put the traineddata files (tesserocr wheels bundle no language data)
+_TESSDATA_DIRS = (
+    "/usr/share/tesseract-ocr/5/tessdata",
+    "/usr/share/tesseract-ocr/4.00/tessdata",
+    "/usr/share/tessdata",
+    "/usr/local/share/tessdata",
+    "/opt/homebrew/share/tessdata",
+)
+
+_local = threading.local()
+_tesserocr_ok = None
+_tesserocr_lock = threading.Lock()
+
+
+def _tessdata_path() -> str | None:
+    candidates = [os.getenv("TESSDATA_PREFIX")] + list(_TESSDATA_DIRS)
+    for path in candidates:
+        if path and os.path.exists(os.path.join(path, f"{OCR_LANG}.traineddata")):
+            return path.rstrip("/") + "/"
+    return None
+
+
+def _tesserocr_api():
+    """Per-thread PyTessBaseAPI, or None when the tesserocr backend is unavailable."""
+    global _tesserocr_ok
+    if OCR_ENGINE == "pytesseract" or _tesserocr_ok is False:
+        return None
+
+    api = getattr(_local, "api", None)
+    if api is not None:
+        return api
+
+    try:
+        from tesserocr import PyTessBaseAPI
+
+        path = _tessdata_path()
+        api = PyTessBaseAPI(path=path, lang=OCR_LANG) if path else PyTessBaseAPI(lang=OCR_LANG)
+    except Exception as e:
+        with _tesserocr_lock:
+            if _tesserocr_ok is None:
+                print(f"[INFO] tesserocr not available ({e}), falling back to pytesseract")
+            _tesserocr_ok = False
+        return None
+
+    _tesserocr_ok = True
+    _local.api = api
+    return api
+
+
+def engine_name() -> str:
+    return "tesserocr" if _tesserocr_api() is not None else "pytesseract"
+
+
+def _empty() -> dict:
+    return {"text": [], "conf": [], "left": [], "top": [], "width": [], "height": []}
+
+
+def _tesserocr_data(api, gray: np.ndarray) -> dict:
+    from tesserocr import RIL, iterate_level
+
+    gray = np.ascontiguousarray(gray)
+    height, width = gray.shape[:2]
+    api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+    api.Recognize()
+
+    data = _empty()
+    it = api.GetIterator()
+    if it is None:
+        return data
+    for word in iterate_level(it, RIL.WORD):
+        box = word.BoundingBox(RIL.WORD)
+        if box is None:
+            continue
+        x1, y1, x2, y2 = box
+        data["text"].append(word.GetUTF8Text(RIL.WORD) or "")
+        data["conf"].append(word.Confidence(RIL.WORD))
+        data["left"].append(x1)
+        data["top"].append(y1)
+        data["width"].append(x2 - x1)
+        data["height"].append(y2 - y1)
+    return data
+
+
+def _pytesseract_data(gray: np.ndarray) -> dict:
+    import pytesseract
+
+    if os.getenv("TESSERACT_CMD"):
+        pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD")
+    d = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+    return {key: list(d.get(key, [])) for key in _empty()}
+
+
+def image_to_data(gray: np.ndarray, roi=None) -> dict:
+    """
+    Word boxes for a grayscale uint8 image, pytesseract DICT style.
+    `roi` = (x, y, w, h) restricts OCR to that rectangle; boxes are still
+    returned in full-image coordinates.
+    """
+    x0 = y0 = 0
+    if roi is not None:
+        x0, y0, w, h = (int(v) for v in roi)
+        gray = gray[y0:y0 + h, x0:x0 + w]
+    if gray.size == 0:
+        return _empty()
+
+    api = _tesserocr_api()
+    data = _tesserocr_data(api, gray) if api is not None else _pytesseract_data(gray)
+
+    if x0 or y0:
+        data["left"] = [v + x0 for v in data["left"]]
+        data["top"] = [v + y0 for v in data["top"]]
+    return data
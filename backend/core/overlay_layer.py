@@ -0,0 +1,223 @@
+"""
+Precomposed overlay layer.
+
+The caption box, caption text and watermarks are identical on every frame of
+a reel, so we draw them once and turn the result into a premultiplied layer:
+
+    out = premul + frame * inv_alpha / 255
+
+The layer is recovered by running the regular OpenCV draw code on an all-black
+and an all-white canvas (difference matting), so layout stays exactly what
+overlay_text_on_frame / add_*_watermark produce. Only the rows the overlay
+touches are stored, and fully opaque rows (the caption box) are a plain copy.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_UNTOUCHED, _OPAQUE, _PARTIAL = 0, 1, 2
+
+# Byte alignment of each array inside a shared-memory block
+_SHM_ALIGN = 64
+
+
+class OverlayLayer:
+    def __init__(self, width: int, height: int, premul: np.ndarray, inv_alpha: np.ndarray):
+        self.width = int(width)
+        self.height = int(height)
+        self.bands = []  # (kind, y0, y1, x0, x1, premul, inv_alpha)
+
+        touched = (inv_alpha != 255).any(axis=2)
+        opaque_rows = (inv_alpha == 0).all(axis=(1, 2))
+        row_kind = np.where(opaque_rows, _OPAQUE, np.where(touched.any(axis=1), _PARTIAL, _UNTOUCHED))
+
+        # Group contiguous rows of the same kind into bands
+        edges = np.flatnonzero(np.diff(row_kind)) + 1
+        starts = np.concatenate(([0], edges))
+        ends = np.concatenate((edges, [self.height]))
+        for y0, y1 in zip(starts.tolist(), ends.tolist()):
+            kind = int(row_kind[y0])
+            if kind == _UNTOUCHED:
+                continue
+            if kind == _OPAQUE:
+                self.bands.append((kind, y0, y1, 0, self.width, premul[y0:y1].copy(), None))
+                continue
+            cols = np.flatnonzero(touched[y0:y1].any(axis=0))
+            x0, x1 = int(cols[0]), int(cols[-1]) + 1
+            self.bands.append((
+                kind, y0, y1, x0, x1,
+                premul[y0:y1, x0:x1].astype(np.uint16),
+                inv_alpha[y0:y1, x0:x1].astype(np.uint16),
+            ))
+
+    @classmethod
+    def from_draw_fn(cls, width: int, height: int, draw_fn):
+        """Build the layer from a `draw_fn(bgr) -> bgr` that paints the overlay."""
+        on_black = draw_fn(np.zeros((height, width, 3), dtype=np.uint8))
+        on_white = draw_fn(np.full((height, width, 3), 255, dtype=np.uint8))
+        inv_alpha = np.clip(
+            on_white.astype(np.int16) - on_black.astype(np.int16), 0, 255
+        ).astype(np.uint8)
+        return cls(width, height, on_black, inv_alpha)
+
+    @property
+    def rows(self) -> int:
+        """Number of frame rows the layer touches."""
+        return sum(y1 - y0 for _, y0, y1, *_ in self.bands)
+
+    def solid_bands(self) -> list:
+        """Runs of opaque rows that are one flat colour: [(y0, y1, (b, g, r))]."""
+        solid = []
+        for kind, y0, _, _, _, premul, _ in self.bands:
+            if kind != _OPAQUE:
+                continue
+            flat = (premul == premul[:, :1]).all(axis=(1, 2))
+            for r in np.flatnonzero(flat).tolist():
+                color = tuple(int(v) for v in premul[r, 0])
+                if solid and solid[-1][1] == y0 + r and solid[-1][2] == color:
+                    solid[-1] = (solid[-1][0], y0 + r + 1, color)
+                else:
+                    solid.append((y0 + r, y0 + r + 1, color))
+        return solid
+
+    def to_bgra(self, skip_rows=()):
+        """
+        Unpremultiplied BGRA image of the layer, cropped to the area it touches.
+        Row ranges in `skip_rows` ([(y0, y1)]) are left transparent, e.g. rows
+        that are drawn some other way. Returns (x0, y0, bgra), or None when
+        there is nothing to draw.
+        """
+        bgra = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+        for kind, y0, y1, x0, x1, premul, inv in self.bands:
+            dst = bgra[y0:y1, x0:x1]
+            if kind == _OPAQUE:
+                dst[..., :3] = premul
+                dst[..., 3] = 255
+                continue
+            alpha = 255 - inv.mean(axis=2)
+            color = premul * 255.0 / np.maximum(alpha, 1)[..., None]
+            dst[..., :3] = np.clip(np.rint(color), 0, 255)
+            dst[..., 3] = np.rint(alpha)
+        for y0, y1 in skip_rows:
+            bgra[y0:y1] = 0
+
+        visible = bgra[..., 3] > 0
+        rows, cols = np.flatnonzero(visible.any(axis=1)), np.flatnonzero(visible.any(axis=0))
+        if not rows.size:
+            return None
+        x0, y0 = int(cols[0]), int(rows[0])
+        return x0, y0, bgra[y0:int(rows[-1]) + 1, x0:int(cols[-1]) + 1].copy()
+
+    def to_shared(self):
+        """
+        Copy the bands into one SharedMemory block so render processes can map
+        the layer without pickling it. Returns (shm, spec); the caller owns `shm`
+        and must close + unlink it once the workers are done.
+        """
+        arrays = [a for band in self.bands for a in band[5:] if a is not None]
+        size = sum(-(-a.nbytes // _SHM_ALIGN) * _SHM_ALIGN for a in arrays)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+        offset = 0
+
+        def _put(a):
+            nonlocal offset
+            if a is None:
+                return None
+            np.ndarray(a.shape, a.dtype, buffer=shm.buf, offset=offset)[...] = a
+            ref = (offset, a.shape, a.dtype.str)
+            offset += -(-a.nbytes // _SHM_ALIGN) * _SHM_ALIGN
+            return ref
+
+        bands = [(kind, y0, y1, x0, x1, _put(premul), _put(inv)) for kind, y0, y1, x0, x1, premul, inv in self.bands]
+        return shm, {"name": shm.name, "width": self.width, "height": self.height, "bands": bands}
+
+    @classmethod
+    def attach_shared(cls, spec: dict):
+        """
+        Map a layer published with `to_shared`. Returns (layer, shm); drop the
+        layer before calling shm.close().
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=spec["name"], track=False)
+        except TypeError:  # Python < 3.13
+            shm = shared_memory.SharedMemory(name=spec["name"])
+
+        def _get(ref):
+            if ref is None:
+                return None
+            offset, shape, dtype = ref
+            return np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=offset)
+
+        layer = cls.__new__(cls)
+        layer.width = spec["width"]
+        layer.height = spec["height"]
+        layer.bands = [(kind, y0, y1, x0, x1, _get(p), _get(i)) for kind, y0, y1, x0, x1, p, i in spec["bands"]]
+        return layer, shm
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Composite the layer onto `frame` in place and return it."""
+        for kind, y0, y1, x0, x1, premul, inv in self.bands:
+            if kind == _OPAQUE:
+                frame[y0:y1] = premul
+                continue
+            region = frame[y0:y1, x0:x1]
+            acc = region * inv
+            acc += 128
+            # exact round(acc / 255) without a division
+            acc += acc >> 8
+            acc >>= 8
+            acc += premul
+            region[...] = acc
+        return frame
+
+
+_LAYER_CACHE: "OrderedDict[tuple, OverlayLayer]" = OrderedDict()
+_LAYER_CACHE_LOCK = threading.Lock()
+_LAYER_CACHE_SIZE = int(os.getenv("OVERLAY_CACHE_SIZE", "32"))
+
+
+def logo_fingerprint(logo) -> str | None:
+    if logo is None:
+        return None
+    return f"{logo.shape}:{hashlib.sha1(np.ascontiguousarray(logo).data).hexdigest()}"
+
+
+def get_overlay_layer(
+    width: int,
+    height: int,
+    draw_fn,
+    *,
+    caption: str,
+    text_area,
+    text_color=(255, 255, 255),
+    logo=None,
+    watermark: bool = True,
+) -> OverlayLayer:
+    """
+    Return the cached layer for (caption, frame size, text area, colour, logo, watermark flag),
+    building it with `draw_fn` on a miss.
+    """
+    key = (
+        caption, int(width), int(height),
+        tuple(int(v) for v in text_area), tuple(int(v) for v in text_color),
+        logo_fingerprint(logo), bool(watermark),
+    )
+    with _LAYER_CACHE_LOCK:
+        layer = _LAYER_CACHE.get(key)
+        if layer is not None:
+            _LAYER_CACHE.move_to_end(key)
+            return layer
+
+    layer = OverlayLayer.from_draw_fn(int(width), int(height), draw_fn)
+
+    with _LAYER_CACHE_LOCK:
+        _LAYER_CACHE[key] = layer
+        while len(_LAYER_CACHE) > _LAYER_CACHE_SIZE:
+            _LAYER_CACHE.popitem(last=False)
+    return layer
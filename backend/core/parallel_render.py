@@ -0,0 +1,191 @@
+"""
+Segment-parallel caption renderer.
+
+The source is split at keyframes into roughly equal time segments. Each
+segment is decoded, overlaid and encoded by its own worker process, so a
+render uses every core instead of one Python thread. The precomposed overlay
+layer is published once in shared memory and mapped by every worker. The
+encoded segments are joined with the concat demuxer (video stream-copied) and
+the source audio is muxed in the same step.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core.compute_budget import COMPUTE_JOB_THREADS, extra_slots
+from core.ffmpeg_io import (
+    FfmpegError,
+    FrameReader,
+    FrameWriter,
+    concat_segments,
+    keyframe_times,
+    probe_video,
+)
+from core.overlay_layer import OverlayLayer
+from core.thumbnails import encode_thumbnails, thumbnail_frame_index
+
+# Worker processes per render; 1 keeps the single-pass renderer
+PARALLEL_WORKERS = int(os.getenv("RENDER_PARALLEL_WORKERS", "1"))
+# Shortest segment worth its own process (decode warm-up + encoder start-up)
+MIN_SEGMENT_SECONDS = float(os.getenv("RENDER_MIN_SEGMENT_SECONDS", "2"))
+# Clips shorter than this always use the single-pass renderer
+PARALLEL_MIN_SECONDS = float(os.getenv("RENDER_PARALLEL_MIN_SECONDS", "8"))
+
+
+def plan_segments(keyframes: list, info: dict, workers: int, min_seconds: float = MIN_SEGMENT_SECONDS) -> list:
+    """
+    Pick cut points among `keyframes` for about `workers` segments.
+    Returns [(start_seconds, frame_count)], frame_count is None for the last segment
+    (read to the end of the stream). Variable frame rate sources get a single
+    segment: counting frames at the average rate would drift from the cut times.
+    """
+    duration, fps = info["duration"], info["fps"]
+    if workers <= 1 or not duration or not fps or info.get("vfr"):
+        return [(0.0, None)]
+
+    target = max(min_seconds, duration / workers)
+    cuts = [0.0]
+    for t in keyframes:
+        if t - cuts[-1] >= target and duration - t >= min_seconds / 2:
+            cuts.append(t)
+        if len(cuts) == workers:
+            break
+
+    starts = [int(round(c * fps)) for c in cuts]
+    segments = []
+    for i, (cut, first) in enumerate(zip(cuts, starts)):
+        count = starts[i + 1] - first if i + 1 < len(starts) else None
+        segments.append((cut, count))
+    return segments
+
+
+def _render_segment(job: dict) -> tuple[int, dict]:
+    """
+    Worker: decode one segment, composite the shared layer, encode to `job['out']`.
+    Returns (frames, thumbnails); thumbnails is filled by the segment holding
+    `job['thumb_index']` (relative to the segment start).
+    """
+    layer, shm = OverlayLayer.attach_shared(job["layer"])
+    frames = 0
+    thumbnails = {}
+    try:
+        writer = FrameWriter(
+            job["out"], job["width"], job["height"], job["fps"],
+            threads=job["threads"],
+        )
+        try:
+            with FrameReader(
+                job["src"], job["width"], job["height"],
+                start=job["start"], frames=job["frames"], threads=job["threads"],
+            ) as reader:
+                for frame in reader:
+                    out = layer.apply(frame)
+                    if frames == job["thumb_index"]:
+                        thumbnails = encode_thumbnails(out)
+                    writer.write(out)
+                    frames += 1
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+    finally:
+        del layer
+        shm.close()
+    if job["frames"] and frames != job["frames"]:
+        raise FfmpegError(f"segment at {job['start']:.3f}s: decoded {frames}/{job['frames']} frames")
+    return frames, thumbnails
+
+
+def render_video_parallel(
+    src_path: str,
+    out_path: str,
+    layer: OverlayLayer,
+    *,
+    info: dict | None = None,
+    workers: int | None = None,
+    thumbnail_at: float | None = None,
+) -> dict:
+    """
+    Render `src_path` into `out_path` with `layer` composited on every frame,
+    spreading keyframe-aligned segments over `workers` processes. With
+    `thumbnail_at` (seconds) the worker whose segment holds that frame encodes it.
+    Returns stats: frames, seconds, fps, workers, segments, thumbnails, plus the probe info used.
+    """
+    info = info or probe_video(src_path)
+    workers = max(1, int(workers or PARALLEL_WORKERS))
+    started = time.perf_counter()
+
+    keyframes = keyframe_times(src_path, info.get("start_time") or 0.0)
+    segments = plan_segments(keyframes, info, workers)
+    # one compute slot per segment: the render's own plus whatever is free now
+    with extra_slots(len(segments) - 1) as allotment:
+        if allotment:
+            slots = max(1, allotment // COMPUTE_JOB_THREADS)
+            if slots < len(segments):
+                segments = plan_segments(keyframes, info, slots)
+        # the allotment is shared by the segments' decoders and encoders
+        threads = max(1, (allotment or os.cpu_count() or 1) // len(segments))
+        # first frame of each segment, as plan_segments counted them
+        firsts = [int(round(start * info["fps"])) for start, _ in segments]
+        thumb_index = thumbnail_frame_index(info, thumbnail_at) if thumbnail_at is not None else None
+
+        work_dir = tempfile.mkdtemp(prefix="render_segments_")
+        shm, spec = layer.to_shared()
+        try:
+            jobs = [
+                {
+                    "src": src_path,
+                    "out": os.path.join(work_dir, f"seg_{i:03d}.mp4"),
+                    "start": start,
+                    "frames": count,
+                    "width": info["width"],
+                    "height": info["height"],
+                    "fps": info["fps"],
+                    "threads": threads,
+                    "layer": spec,
+                    "thumb_index": (
+                        thumb_index - firsts[i]
+                        if thumb_index is not None and thumb_index >= firsts[i]
+                        and (i + 1 == len(firsts) or thumb_index < firsts[i + 1])
+                        else None
+                    ),
+                }
+                for i, (start, count) in enumerate(segments)
+            ]
+            # spawn: workers must not inherit the gunicorn worker's threads/locks
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=len(jobs), mp_context=ctx) as pool:
+                results = list(pool.map(_render_segment, jobs))
+
+            concat_segments(
+                [job["out"] for job in jobs],
+                out_path,
+                audio_source=src_path if info.get("has_audio") else None,
+                audio_codec=info.get("audio_codec"),
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - started
+    frames = sum(count for count, _ in results)
+    thumbnails = next((thumbs for _, thumbs in results if thumbs), {})
+    stats = {
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "workers": workers,
+        "segments": len(segments),
+        "thumbnails": thumbnails,
+        "info": info,
+    }
+    print(
+        f"[render] parallel x{len(segments)}: {frames} frames in {elapsed:.2f}s "
+        f"({stats['fps']:.1f} fps)"
+    )
+    return stats
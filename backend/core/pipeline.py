@@ -0,0 +1,89 @@
+"""
+Ordered multi-stage pipeline for per-item batch work.
+
+A batch request (e.g. bank meme generation) runs every item through the same
+chain of steps: download, Gemini calls, render, uploads. Running the items one
+after another makes the batch as slow as the sum of its items; running the
+steps as stages lets item 2 download while item 1 renders, so the batch takes
+about as long as its slowest item once the pipeline is full.
+
+Each stage has its own worker threads (network-bound stages can have many, the
+render stage as many as the render pool) and a bounded input queue
+(PIPELINE_QUEUE_SIZE), so a fast stage cannot run far ahead of a slow one and
+pile up temp files. A failing item is recorded and dropped from the later
+stages; the other items continue. Results come back in input order.
+"""
+
+import os
+import queue
+import threading
+import time
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+
+_STOP = object()
+
+
+def run_pipeline(items: list, stages: list, *, queue_size: int = PIPELINE_QUEUE_SIZE, name: str = "pipeline") -> list:
+    """
+    Run every item through `stages` = [(stage_name, fn, workers)], where
+    fn(value) returns the value handed to the next stage.
+
+    Returns one dict per input item, in input order:
+    {"ok": bool, "value": last stage result or None, "error": exception or None,
+     "stage": name of the failing stage or None}.
+    """
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    remaining = [max(1, workers) for _, _, workers in stages]
+    remaining_lock = threading.Lock()
+    started = time.perf_counter()
+
+    def worker(i: int):
+        stage_name, fn, _ = stages[i]
+        last = i == len(stages) - 1
+        while True:
+            job = queues[i].get()
+            if job is _STOP:
+                break
+            index, value = job
+            try:
+                value = fn(value)
+            except Exception as e:
+                print(f"[{name}] item {index} failed in {stage_name}: {e}")
+                results[index] = {"ok": False, "value": None, "error": e, "stage": stage_name}
+                continue
+            if last:
+                results[index] = {"ok": True, "value": value, "error": None, "stage": None}
+            else:
+                queues[i + 1].put((index, value))
+
+        # the last worker of a stage to finish closes the next stage
+        with remaining_lock:
+            remaining[i] -= 1
+            closing = remaining[i] == 0
+        if closing and not last:
+            for _ in range(remaining[i + 1]):
+                queues[i + 1].put(_STOP)
+
+    threads = [
+        threading.Thread(target=worker, args=(i,), name=f"{name}-{stage_name}-{w}", daemon=True)
+        for i, (stage_name, _, workers) in enumerate(stages)
+        for w in range(max(1, workers))
+    ]
+    for t in threads:
+        t.start()
+
+    for index, value in enumerate(items):
+        queues[0].put((index, value))
+    for _ in range(remaining[0]):
+        queues[0].put(_STOP)
+    for t in threads:
+        t.join()
+
+    ok = sum(1 for r in results if r and r["ok"])
+    print(f"[{name}] {ok}/{len(items)} items in {time.perf_counter() - started:.2f}s")
+    return results
@@ -0,0 +1,241 @@
+"""
+Content-addressed cache of finished renders.
+
+Key = (source fingerprint, caption, logo hash, watermark flag, renderer version).
+The source fingerprint uses the same "md5:<base64>" form as GCS md5_hash, so a
+bank blob and the same file uploaded to finalize share cache entries.
+
+Two tiers:
+  - local disk (RENDER_CACHE_DIR), LRU-evicted by access time down to RENDER_CACHE_MAX_MB
+  - GCS (render_cache/<key>.mp4 + .jpg in VIDEO_BUCKET_NAME), filled with
+    server-side copies of blobs we already uploaded, so a hit costs no CPU
+    and no re-upload.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from core.ffmpeg_io import RENDER_MIME
+from core.overlay_layer import logo_fingerprint
+
+# Bump when detection, layout or encode settings change what a render looks like
+RENDERER_VERSION = "4"
+
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "true").lower() == "true"
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "/tmp/publefy_render_cache")
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "2048"))
+RENDER_CACHE_GCS_PREFIX = os.getenv("RENDER_CACHE_GCS_PREFIX", "render_cache/")
+
+_lock = threading.Lock()
+_counters = {"hits_local": 0, "hits_gcs": 0, "misses": 0, "puts": 0, "evictions": 0, "errors": 0}
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _counters[name] += n
+
+
+def render_cache_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    lookups = stats["hits_local"] + stats["hits_gcs"] + stats["misses"]
+    stats["hit_rate"] = round((stats["hits_local"] + stats["hits_gcs"]) / lookups, 3) if lookups else 0.0
+    stats["enabled"] = RENDER_CACHE_ENABLED
+    stats["pid"] = os.getpid()
+    return stats
+
+
+def file_fingerprint(path: str) -> str:
+    """md5 of the file contents, formatted like _blob_fingerprint() (md5:<base64 digest>)."""
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return f"md5:{base64.b64encode(h.digest()).decode('ascii')}"
+
+
+def render_cache_key(source_fp: str, caption: str, *, logo=None, watermark: bool = True, variant: str = "") -> str | None:
+    """
+    `variant` separates flows that lay the same inputs out differently (finalize vs bank).
+    Returns None for fingerprints that do not identify the content (the "path:" fallback).
+    """
+    if not source_fp or source_fp.startswith("path:"):
+        return None
+    raw = json.dumps(
+        [source_fp, caption, logo_fingerprint(logo), bool(watermark), RENDERER_VERSION, variant],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _gcs_bucket():
+    bucket_name = os.getenv("VIDEO_BUCKET_NAME")
+    user_project = os.getenv("USER_PROJECT")
+    if not bucket_name or not user_project:
+        return None, None
+    from core.data.gcloud_repo import GCloudRepository
+
+    client = GCloudRepository(bucket_name, user_project).get_client()
+    return client, client.bucket(bucket_name)
+
+
+class RenderCache:
+    def __init__(self, directory: str = RENDER_CACHE_DIR, max_mb: int = RENDER_CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+
+    def _paths(self, key: str) -> dict:
+        base = os.path.join(self.directory, key)
+        return {"video": base + ".mp4", "thumb": base + ".jpg", "meta": base + ".json"}
+
+    def _blobs(self, key: str) -> dict:
+        return {"video": f"{RENDER_CACHE_GCS_PREFIX}{key}.mp4", "thumb": f"{RENDER_CACHE_GCS_PREFIX}{key}.jpg"}
+
+    def get(self, key: str) -> dict | None:
+        """
+        Return {"text_area", "local_video", "local_thumb", "blob", "thumb_blob"} or None.
+        Any of the path/blob fields may be None depending on which tier hit.
+        """
+        if not RENDER_CACHE_ENABLED or not key:
+            return None
+
+        paths = self._paths(key)
+        try:
+            with open(paths["meta"]) as f:
+                meta = json.load(f)
+            if os.path.exists(paths["video"]):
+                for p in paths.values():
+                    if os.path.exists(p):
+                        os.utime(p)  # LRU: mark as recently used
+                _count("hits_local")
+                return {
+                    "text_area": tuple(meta["text_area"]),
+                    "local_video": paths["video"],
+                    "local_thumb": paths["thumb"] if os.path.exists(paths["thumb"]) else None,
+                    "blob": meta.get("blob"),
+                    "thumb_blob": meta.get("thumb_blob"),
+                }
+        except (OSError, ValueError, KeyError):
+            pass
+
+        try:
+            client, bucket = _gcs_bucket()
+            if bucket is not None:
+                blobs = self._blobs(key)
+                vblob = bucket.get_blob(blobs["video"], client=client)
+                if vblob is not None and (vblob.metadata or {}).get("text_area"):
+                    thumb_ok = bucket.blob(blobs["thumb"]).exists(client)
+                    _count("hits_gcs")
+                    return {
+                        "text_area": tuple(json.loads(vblob.metadata["text_area"])),
+                        "local_video": None,
+                        "local_thumb": None,
+                        "blob": blobs["video"],
+                        "thumb_blob": blobs["thumb"] if thumb_ok else None,
+                    }
+        except Exception as e:
+            _count("errors")
+            print(f"[render_cache] GCS lookup failed: {e}")
+
+        _count("misses")
+        return None
+
+    def put(self, key: str, text_area, *, video_path: str, thumb_path: str | None = None,
+            blob: str | None = None, thumb_blob: str | None = None):
+        """
+        Store a finished render. `blob` / `thumb_blob` are the already-uploaded
+        outputs; they are copied server-side into the GCS tier.
+        """
+        if not RENDER_CACHE_ENABLED or not key:
+            return
+        text_area = [int(v) for v in text_area]
+        cache_blob = cache_thumb_blob = None
+
+        try:
+            client, bucket = _gcs_bucket()
+            if bucket is not None and blob:
+                blobs = self._blobs(key)
+                if thumb_blob:
+                    bucket.copy_blob(bucket.blob(thumb_blob), bucket, blobs["thumb"], client=client)
+                    cache_thumb_blob = blobs["thumb"]
+                copied = bucket.copy_blob(bucket.blob(blob), bucket, blobs["video"], client=client)
+                # metadata last: its presence marks the GCS entry complete
+                copied.metadata = {"text_area": json.dumps(text_area), "renderer_version": RENDERER_VERSION}
+                copied.patch(client=client)
+                cache_blob = blobs["video"]
+        except Exception as e:
+            _count("errors")
+            print(f"[render_cache] GCS put failed: {e}")
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            paths = self._paths(key)
+            shutil.copyfile(video_path, paths["video"] + ".part")
+            os.replace(paths["video"] + ".part", paths["video"])
+            if thumb_path:
+                shutil.copyfile(thumb_path, paths["thumb"])
+            with open(paths["meta"], "w") as f:
+                json.dump({"text_area": text_area, "blob": cache_blob, "thumb_blob": cache_thumb_blob}, f)
+            _count("puts")
+            self._evict()
+        except OSError as e:
+            _count("errors")
+            print(f"[render_cache] local put failed: {e}")
+
+    def materialize(self, entry: dict, dst_blob: str, dst_thumb: str | None = None) -> bool:
+        """
+        Place a cached render at `dst_blob` (and its thumbnail at `dst_thumb`):
+        server-side copy when the GCS tier has it, upload from the local tier otherwise.
+        Renders are MP4, so `dst_blob` should end in RENDER_EXT.
+        Returns True when a thumbnail was written too.
+        """
+        client, bucket = _gcs_bucket()
+        if bucket is None:
+            raise RuntimeError("VIDEO_BUCKET_NAME / USER_PROJECT not configured")
+
+        if entry.get("blob"):
+            bucket.copy_blob(bucket.blob(entry["blob"]), bucket, dst_blob, client=client)
+        else:
+            bucket.blob(dst_blob).upload_from_filename(entry["local_video"], content_type=RENDER_MIME, client=client)
+
+        if not dst_thumb:
+            return False
+        if entry.get("thumb_blob"):
+            bucket.copy_blob(bucket.blob(entry["thumb_blob"]), bucket, dst_thumb, client=client)
+            return True
+        if entry.get("local_thumb"):
+            bucket.blob(dst_thumb).upload_from_filename(entry["local_thumb"], content_type="image/jpeg", client=client)
+            return True
+        return False
+
+    def _evict(self):
+        """Drop least recently used entries until the directory fits in max_bytes."""
+        entries = {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key = name.split(".", 1)[0]
+            size, atime = entries.get(key, (0, 0.0))
+            entries[key] = (size + st.st_size, max(atime, st.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda kv: kv[1][1]):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key).values():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            _count("evictions")
+
+
+render_cache = RenderCache()
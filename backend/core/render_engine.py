@@ -0,0 +1,301 @@
+"""
+Single-pass caption renderer.
+
+The source is decoded once through an ffmpeg pipe, every frame goes through a
+Python overlay callback, and the result is piped straight into one libx264
+encode that also carries the source audio. No intermediate mp4v file and no
+second moviepy encode.
+
+Decoding runs on its own thread and hands frames over through a fixed-size
+FrameRing, so memory stays bounded by the ring size rather than the video length.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.compute_budget import COMPUTE_JOB_THREADS, budgeted, extra_slots
+from core.ffmpeg_io import FrameReader, FrameWriter, probe_video
+from core.frame_ring import FrameRing
+from core.thumbnails import encode_thumbnails, thumbnail_frame_index
+
+# Upper bound on threads one fan-out render may use (overlay workers + x264 threads)
+FANOUT_WORKERS = int(os.getenv("RENDER_FANOUT_WORKERS", str(os.cpu_count() or 2)))
+
+# Backend for static overlays: auto | filtergraph | pipe (see render_layer)
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "auto").lower()
+
+# Worker processes of the shared render pool (render_layer_pooled); 0 renders in the calling thread
+RENDER_POOL_WORKERS = int(os.getenv("RENDER_POOL_WORKERS", "2"))
+
+# Sample RSS every N frames for the peak-memory report
+_RSS_SAMPLE_EVERY = 30
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+def _stats(frames: int, started: float, peak_rss: float, info: dict, ring: FrameRing) -> dict:
+    elapsed = time.perf_counter() - started
+    return {
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss, 1),
+        "ring_mb": round(ring.nbytes / (1024 * 1024), 1),
+        "info": info,
+    }
+
+
+@budgeted("render")
+def render_video(
+    src_path: str,
+    out_path: str,
+    frame_fn,
+    *,
+    info: dict | None = None,
+    thumbnail_at: float | None = None,
+) -> dict:
+    """
+    Render `src_path` into `out_path`, applying `frame_fn(bgr) -> bgr` to every frame.
+    `frame_fn` may modify the frame in place but must not keep a reference to it.
+    With `thumbnail_at` (seconds) the rendered frame at that time is encoded as
+    it passes (see core.thumbnails).
+    Returns stats: frames, seconds, fps, peak_rss_mb, ring_mb, thumbnails, plus the probe info used.
+    """
+    info = info or probe_video(src_path)
+    width, height = info["width"], info["height"]
+    thumb_index = thumbnail_frame_index(info, thumbnail_at) if thumbnail_at is not None else None
+    thumbnails = {}
+
+    started = time.perf_counter()
+    peak_rss = _rss_mb()
+    writer = FrameWriter(
+        out_path,
+        width,
+        height,
+        info["fps"],
+        audio_source=src_path if info.get("has_audio") else None,
+        audio_codec=info.get("audio_codec"),
+    )
+    frames = 0
+    try:
+        with FrameRing(FrameReader(src_path, width, height)) as ring:
+            for frame in ring:
+                out = frame_fn(frame)
+                if frames == thumb_index:
+                    thumbnails = encode_thumbnails(out)
+                writer.write(out)
+                frames += 1
+                if frames % _RSS_SAMPLE_EVERY == 0:
+                    peak_rss = max(peak_rss, _rss_mb())
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    stats = _stats(frames, started, max(peak_rss, _rss_mb()), info, ring)
+    stats["thumbnails"] = thumbnails
+    print(
+        f"[render] {frames} frames in {stats['seconds']:.2f}s ({stats['fps']:.1f} fps), "
+        f"peak RSS {stats['peak_rss_mb']} MB (ring {stats['ring_mb']} MB)"
+    )
+    return stats
+
+
+@budgeted("render")
+def render_fanout(src_path: str, targets: list, *, info: dict | None = None, max_workers: int | None = None) -> list[dict]:
+    """
+    Decode `src_path` once and feed every frame to one encoder per target.
+
+    `targets` is a list of (out_path, frame_fn). Each frame_fn gets its own copy
+    of the frame. Returns one result dict per target, in the same order:
+    {"path", "ok", "error", "frames"}. A failing target does not stop the others.
+
+    The encoders share the job's compute allotment, widened with free slots
+    (one x264 thread per target): at most one encoder per allotted thread runs
+    at a time, and targets beyond that are rendered in further passes.
+    """
+    info = info or probe_video(src_path)
+    count = len(targets)
+    if not count:
+        return []
+
+    with extra_slots(-(-count // COMPUTE_JOB_THREADS) - 1) as allotment:
+        budget = max(1, min(max_workers or allotment or FANOUT_WORKERS, os.cpu_count() or 1))
+        results = []
+        for first in range(0, count, budget):
+            results += _fanout_pass(src_path, targets[first:first + budget], info, budget)
+    return results
+
+
+def _fanout_pass(src_path: str, targets: list, info: dict, budget: int) -> list[dict]:
+    """One decode feeding len(targets) <= budget encoders that split `budget` threads."""
+    width, height = info["width"], info["height"]
+    count = len(targets)
+    started = time.perf_counter()
+    peak_rss = _rss_mb()
+
+    results = [{"path": path, "ok": False, "error": None, "frames": 0} for path, _ in targets]
+    writers = []
+    for path, _ in targets:
+        writers.append(FrameWriter(
+            path,
+            width,
+            height,
+            info["fps"],
+            audio_source=src_path if info.get("has_audio") else None,
+            audio_codec=info.get("audio_codec"),
+            # split the budget between the concurrent encoders
+            threads=max(1, budget // count),
+        ))
+
+    def _emit(i, frame):
+        if results[i]["error"] is not None:
+            return
+        try:
+            writers[i].write(targets[i][1](frame.copy()))
+            results[i]["frames"] += 1
+        except Exception as e:
+            results[i]["error"] = str(e)
+            writers[i].abort()
+
+    frames = 0
+    try:
+        # one decoder thread: decoding costs a fraction of a single x264 encode
+        with ThreadPoolExecutor(max_workers=count) as pool, \
+                FrameRing(FrameReader(src_path, width, height, threads=1)) as ring:
+            for frame in ring:
+                list(pool.map(_emit, range(count), [frame] * count))
+                frames += 1
+                if frames % _RSS_SAMPLE_EVERY == 0:
+                    peak_rss = max(peak_rss, _rss_mb())
+                if all(r["error"] is not None for r in results):
+                    break
+    except BaseException:
+        for i, writer in enumerate(writers):
+            if results[i]["error"] is None:
+                writer.abort()
+        raise
+
+    for i, writer in enumerate(writers):
+        if results[i]["error"] is not None:
+            continue
+        try:
+            writer.close()
+            results[i]["ok"] = True
+        except Exception as e:
+            results[i]["error"] = str(e)
+
+    stats = _stats(frames, started, max(peak_rss, _rss_mb()), info, ring)
+    print(
+        f"[render] fan-out x{count}: {frames} frames in {stats['seconds']:.2f}s, "
+        f"peak RSS {stats['peak_rss_mb']} MB"
+    )
+    return results
+
+
+@budgeted("render")
+def render_layer(
+    src_path: str,
+    out_path: str,
+    layer,
+    *,
+    info: dict | None = None,
+    thumbnail_at: float | None = None,
+) -> dict:
+    """
+    Render `src_path` with a precomposed OverlayLayer, picking the backend:
+
+    - static fast path (STATIC_FAST_PATH_ENABLED): still-image clips get the
+      layer composited once and a looped still segment (core.static_render).
+    - filter graph (RENDER_BACKEND=auto|filtergraph): ffmpeg composites the
+      layer itself, no frames pass through Python. Used whenever the ffmpeg
+      build supports it; on failure `auto` falls back to the pipe renderers.
+    - pipe (RENDER_BACKEND=pipe, or fallback): segment-parallel when
+      RENDER_PARALLEL_WORKERS > 1 and the clip is long enough and constant frame
+      rate, otherwise single pass.
+
+    Every backend captures the output frame at `thumbnail_at` (seconds) while it
+    renders and returns it in stats["thumbnails"] ({"jpeg": bytes, ...}, empty
+    when nothing was captured).
+    """
+    from core.filtergraph_render import filtergraph_available, render_video_filtergraph
+    from core.parallel_render import PARALLEL_MIN_SECONDS, PARALLEL_WORKERS, render_video_parallel
+    from core.static_render import render_video_static, static_fast_path_applies
+
+    info = info or probe_video(src_path)
+    if static_fast_path_applies(src_path, info):
+        try:
+            return render_video_static(src_path, out_path, layer, info=info, thumbnail_at=thumbnail_at)
+        except Exception as e:
+            print(f"[render] static fast path failed, using the regular renderers: {e}")
+
+    if RENDER_BACKEND == "filtergraph" or (RENDER_BACKEND == "auto" and filtergraph_available()):
+        try:
+            return render_video_filtergraph(src_path, out_path, layer, info=info, thumbnail_at=thumbnail_at)
+        except Exception as e:
+            if RENDER_BACKEND == "filtergraph":
+                raise
+            print(f"[render] filter-graph render failed, falling back to pipe renderer: {e}")
+
+    if PARALLEL_WORKERS > 1 and info.get("duration", 0) >= PARALLEL_MIN_SECONDS and not info.get("vfr"):
+        try:
+            return render_video_parallel(src_path, out_path, layer, info=info, thumbnail_at=thumbnail_at)
+        except Exception as e:
+            print(f"[render] parallel render failed, falling back to single pass: {e}")
+    return render_video(src_path, out_path, layer.apply, info=info, thumbnail_at=thumbnail_at)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _render_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from core.compute_budget import configure_process_threads
+
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=configure_process_threads,
+            )
+        return _pool
+
+
+def render_layer_pooled(
+    src_path: str,
+    out_path: str,
+    layer,
+    *,
+    info: dict | None = None,
+    thumbnail_at: float | None = None,
+) -> dict:
+    """
+    render_layer() in the worker's render process pool (RENDER_POOL_WORKERS),
+    so concurrent renders from one request do not share this process's GIL.
+    The layer and the returned stats are pickled across; the compute budget
+    is taken inside the pool process.
+    """
+    global _pool
+    if RENDER_POOL_WORKERS <= 0:
+        return render_layer(src_path, out_path, layer, info=info, thumbnail_at=thumbnail_at)
+    pool = _render_pool()
+    try:
+        return pool.submit(render_layer, src_path, out_path, layer, info=info, thumbnail_at=thumbnail_at).result()
+    except BrokenProcessPool:
+        # a pool process died (e.g. OOM); start a fresh pool for the next render
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
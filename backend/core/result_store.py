@@ -0,0 +1,101 @@
+"""
+Two-tier store of derived results keyed by content fingerprint.
+
+Shared by core.detection_store and core.summary_store:
+  - in-process LRU (`lru_size` entries)
+  - Mongo collection (`collection`), shared by every worker
+
+Callers build the keys; a None key (content that cannot be identified) is a
+miss and is never stored. Mongo errors count as misses, so a database hiccup
+costs a recomputation, never a failed request.
+"""
+
+import datetime
+import os
+import threading
+from collections import OrderedDict
+
+
+class ResultStore:
+    def __init__(self, name: str, collection: str, *, decode, enabled: bool = True, lru_size: int = 1024):
+        """
+        `name` prefixes log lines; `decode(doc)` turns a Mongo document into the
+        stored value, or None when the document is not usable (counted as a miss).
+        """
+        self.name = name
+        self.collection = collection
+        self.decode = decode
+        self.enabled = enabled
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits_memory": 0, "hits_mongo": 0, "misses": 0, "puts": 0, "errors": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] += n
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits_memory"] + stats["hits_mongo"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits_memory"] + stats["hits_mongo"]) / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["pid"] = os.getpid()
+        return stats
+
+    def _collection(self):
+        from database import db
+
+        return db[self.collection]
+
+    def _remember(self, key: str, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, key: str | None):
+        """The stored value for `key`, or None on a miss."""
+        if not self.enabled or key is None:
+            return None
+
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+        if value is not None:
+            self._count("hits_memory")
+            return value
+
+        try:
+            doc = self._collection().find_one({"_id": key})
+        except Exception as e:
+            self._count("errors")
+            print(f"[{self.name}] lookup failed: {e}")
+            doc = None
+        value = self.decode(doc) if doc else None
+        if value is None:
+            self._count("misses")
+            return None
+
+        self._remember(key, value)
+        self._count("hits_mongo")
+        return value
+
+    def put(self, key: str | None, value, fields: dict):
+        """Remember `value` under `key`; `fields` is the Mongo document it decodes from."""
+        if not self.enabled or key is None:
+            return
+        self._remember(key, value)
+        try:
+            self._collection().update_one(
+                {"_id": key},
+                {"$set": {**fields, "updated_at": datetime.datetime.utcnow()}},
+                upsert=True,
+            )
+            self._count("puts")
+        except Exception as e:
+            self._count("errors")
+            print(f"[{self.name}] put failed: {e}")
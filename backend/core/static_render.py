@@ -0,0 +1,122 @@
+"""
+Static-content fast path for still-image reels.
+
+Many bank memes are one picture with audio. Decoding and re-encoding every
+frame of those buys nothing, so render_layer() first checks (frame_sampler.
+is_static) whether the clip is still, and if so:
+
+  1. decodes one frame, composites the layer on it once
+  2. encodes STATIC_SEGMENT_SECONDS of that frame at the source frame rate
+     (one IDR frame plus skip frames, -tune stillimage)
+  3. loops that segment with stream copy up to the clip duration and muxes
+     the source audio in the same step
+
+The output keeps the source frame rate and size, so it is interchangeable
+with a regular render; only the first step touches pixels.
+"""
+
+import os
+import subprocess
+import tempfile
+import time
+
+from core.ffmpeg_io import (
+    FFMPEG_BIN,
+    FfmpegError,
+    FrameReader,
+    FrameWriter,
+    audio_args,
+    probe_video,
+)
+from core.frame_sampler import is_static
+from core.thumbnails import encode_thumbnails
+
+STATIC_FAST_PATH_ENABLED = os.getenv("STATIC_FAST_PATH_ENABLED", "true").lower() == "true"
+# Scan rate and tolerance of the still-image check (fraction of 64px thumbnail pixels)
+STATIC_SAMPLE_FPS = float(os.getenv("STATIC_SAMPLE_FPS", "2"))
+STATIC_CHANGE_FRACTION = float(os.getenv("STATIC_CHANGE_FRACTION", "0.001"))
+# Length of the encoded still segment that is looped to the full duration
+STATIC_SEGMENT_SECONDS = float(os.getenv("STATIC_SEGMENT_SECONDS", "1"))
+# Clips shorter than this are not worth the extra scan
+STATIC_MIN_SECONDS = float(os.getenv("STATIC_MIN_SECONDS", "3"))
+
+
+def static_fast_path_applies(src_path: str, info: dict) -> bool:
+    """True when the fast path is on and `src_path` is a still clip long enough to benefit."""
+    if not STATIC_FAST_PATH_ENABLED or (info.get("duration") or 0) < STATIC_MIN_SECONDS:
+        return False
+    started = time.perf_counter()
+    try:
+        static = is_static(src_path, info, fps=STATIC_SAMPLE_FPS, change_fraction=STATIC_CHANGE_FRACTION)
+    except Exception as e:
+        print(f"[render] static check failed: {e}")
+        return False
+    print(f"[render] static check: {static} ({time.perf_counter() - started:.2f}s)")
+    return static
+
+
+def render_video_static(
+    src_path: str,
+    out_path: str,
+    layer,
+    *,
+    info: dict | None = None,
+    thumbnail_at: float | None = None,
+) -> dict:
+    """
+    Render a still clip: composite `layer` on its first frame once, encode a
+    short segment of it and loop that (stream copy) with the source audio.
+    Returns stats: frames, seconds, fps, thumbnails, static, plus the probe info used.
+    """
+    info = info or probe_video(src_path)
+    width, height, fps = info["width"], info["height"], info["fps"]
+    started = time.perf_counter()
+
+    with FrameReader(src_path, width, height, frames=1) as reader:
+        frame = reader.read()
+    if frame is None:
+        raise FfmpegError("static render: could not decode the first frame")
+    frame = layer.apply(frame)
+    thumbnails = encode_thumbnails(frame) if thumbnail_at is not None else {}
+
+    segment_frames = max(1, int(round(fps * STATIC_SEGMENT_SECONDS)))
+    total_frames = info.get("nb_frames") or max(1, int(round((info.get("duration") or 0) * fps)))
+
+    fd, segment_path = tempfile.mkstemp(suffix=".mp4")
+    os.close(fd)
+    try:
+        writer = FrameWriter(segment_path, width, height, fps, tune="stillimage")
+        try:
+            for _ in range(segment_frames):
+                writer.write(frame)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+        cmd = [FFMPEG_BIN, "-y", "-v", "error", "-nostdin", "-stream_loop", "-1", "-i", segment_path]
+        if info.get("has_audio"):
+            cmd += ["-i", src_path, "-map", "0:v:0", "-map", "1:a:0"] + audio_args(info.get("audio_codec"))
+        else:
+            cmd += ["-map", "0:v:0"]
+        cmd += ["-c:v", "copy", "-frames:v", str(total_frames)]
+        if info.get("duration"):
+            cmd += ["-t", f"{info['duration']:.6f}"]
+        cmd += ["-movflags", "+faststart", "-f", "mp4", out_path]
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            raise FfmpegError(f"ffmpeg still loop/mux failed: {proc.stderr.decode(errors='ignore').strip()}")
+    finally:
+        os.remove(segment_path)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "frames": total_frames,
+        "seconds": elapsed,
+        "fps": total_frames / elapsed if elapsed else 0.0,
+        "thumbnails": thumbnails,
+        "static": True,
+        "info": info,
+    }
+    print(f"[render] static fast path: {total_frames} frames in {elapsed:.2f}s ({stats['fps']:.1f} fps)")
+    return stats
@@ -0,0 +1,103 @@
+"""
+Persistent store of Gemini video summaries.
+
+Key = (source fingerprint, prompt version, model, input variant). The
+fingerprint is the same "md5:<base64>" form used by the render cache and
+detection store; the prompt version is a hash of the prompt text (plus
+SUMMARY_VERSION), so editing a prompt starts a fresh set of entries instead of
+serving summaries written for the old one. The input variant names what Gemini
+was sent: ORIGINAL_INPUT, or an analysis proxy with its settings and media
+resolution (core.analysis_proxy.input_variant), so changing the proxy
+settings does not serve summaries of a different input.
+
+Two tiers (core.result_store), like core.detection_store:
+  - in-process LRU (SUMMARY_STORE_LRU_SIZE entries)
+  - Mongo collection (SUMMARY_STORE_COLLECTION), shared by every worker
+"""
+
+import hashlib
+import os
+
+from core.result_store import ResultStore
+
+# Bump when the way summaries are parsed/post-processed changes
+SUMMARY_VERSION = "2"
+
+SUMMARY_STORE_ENABLED = os.getenv("SUMMARY_STORE_ENABLED", "true").lower() == "true"
+SUMMARY_STORE_COLLECTION = os.getenv("SUMMARY_STORE_COLLECTION", "video_summaries")
+SUMMARY_STORE_LRU_SIZE = int(os.getenv("SUMMARY_STORE_LRU_SIZE", "1024"))
+
+# Input variant of a summary made from the clip itself
+ORIGINAL_INPUT = "original"
+
+
+def prompt_version(prompt: str) -> str:
+    """Short stable id of a prompt text."""
+    return hashlib.sha1(f"{SUMMARY_VERSION}\n{prompt}".encode("utf-8")).hexdigest()[:12]
+
+
+def _decode(doc: dict) -> dict | None:
+    summary = doc.get("summary")
+    return summary if isinstance(summary, dict) else None
+
+
+class SummaryStore:
+    def __init__(self, lru_size: int = SUMMARY_STORE_LRU_SIZE):
+        self._store = ResultStore(
+            "summary_store", SUMMARY_STORE_COLLECTION,
+            decode=_decode, enabled=SUMMARY_STORE_ENABLED, lru_size=lru_size,
+        )
+
+    @staticmethod
+    def key(source_fp: str, prompt: str, model: str, variant: str) -> str | None:
+        """None for fingerprints that do not identify the content (the "path:" fallback)."""
+        if not source_fp or source_fp.startswith("path:"):
+            return None
+        return f"{model}:{prompt_version(prompt)}:{variant}:{source_fp}"
+
+    def stats(self) -> dict:
+        stats = self._store.stats()
+        stats["summary_version"] = SUMMARY_VERSION
+        return stats
+
+    def get(self, source_fp: str, prompt: str, model: str, variant: str) -> dict | None:
+        """Return the stored summary dict (e.g. {"video", "audio"}) or None on a miss."""
+        summary = self._store.get(self.key(source_fp, prompt, model, variant))
+        return dict(summary) if summary is not None else None
+
+    def put(self, source_fp: str, prompt: str, model: str, variant: str, summary: dict):
+        self._store.put(self.key(source_fp, prompt, model, variant), dict(summary), {
+            "source_fp": source_fp,
+            "model": model,
+            "prompt_version": prompt_version(prompt),
+            "variant": variant,
+            "summary": dict(summary),
+        })
+
+
+summary_store = SummaryStore()
+
+
+def summary_store_stats() -> dict:
+    return summary_store.stats()
+
+
+def cached_summary(source_fp: str, prompt: str, model: str, summarize, *, variant: str = ORIGINAL_INPUT) -> dict:
+    """
+    Stored summary for (source_fp, prompt, model, variant), or the result of
+    `summarize()` stored for next time.
+
+    `variant` is the input the caller means to send; summarize() returns
+    (dict of strings, variant actually sent), which differs when a proxy could
+    not be made and the original went instead. A stored summary of the
+    original also answers a proxy lookup. Empty results are not stored, so a
+    Gemini hiccup is retried on the next call.
+    """
+    for candidate in dict.fromkeys((variant, ORIGINAL_INPUT)):
+        summary = summary_store.get(source_fp, prompt, model, candidate)
+        if summary is not None:
+            return summary
+    summary, sent = summarize()
+    if any((v or "").strip() for v in summary.values()):
+        summary_store.put(source_fp, prompt, model, sent, summary)
+    return summary
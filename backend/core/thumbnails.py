@@ -0,0 +1,45 @@
+"""
+In-memory thumbnails captured by the renderers.
+
+The render backends grab one output frame at the requested timestamp while
+they stream, and encode it here, so no caller has to open and decode the
+finished mp4 again just for a poster image.
+"""
+
+import os
+
+import cv2
+
+THUMB_JPEG_QUALITY = int(os.getenv("RENDER_THUMB_JPEG_QUALITY", "85"))
+# Also encode a WebP next to the JPEG (returned under "webp")
+THUMB_WEBP_ENABLED = os.getenv("RENDER_THUMB_WEBP_ENABLED", "false").lower() == "true"
+THUMB_WEBP_QUALITY = int(os.getenv("RENDER_THUMB_WEBP_QUALITY", "80"))
+
+
+def thumbnail_frame_index(info: dict, at_seconds: float) -> int:
+    """
+    Index of the frame shown at `at_seconds`, clamped like the old moviepy
+    helpers (never past duration - 0.05s) and to the probed frame count.
+    """
+    fps = info.get("fps") or 0.0
+    duration = info.get("duration") or 0.0
+    t = max(0.0, at_seconds)
+    if duration:
+        t = min(t, max(0.0, duration - 0.05))
+    index = int(round(t * fps)) if fps else 0
+    if info.get("nb_frames"):
+        index = min(index, int(info["nb_frames"]) - 1)
+    return max(0, index)
+
+
+def encode_thumbnails(bgr) -> dict:
+    """{"jpeg": bytes[, "webp": bytes]} for one bgr24 frame; formats that fail to encode are left out."""
+    thumbs = {}
+    ok, buf = cv2.imencode(".jpg", bgr, [int(cv2.IMWRITE_JPEG_QUALITY), THUMB_JPEG_QUALITY])
+    if ok:
+        thumbs["jpeg"] = buf.tobytes()
+    if THUMB_WEBP_ENABLED:
+        ok, buf = cv2.imencode(".webp", bgr, [int(cv2.IMWRITE_WEBP_QUALITY), THUMB_WEBP_QUALITY])
+        if ok:
+            thumbs["webp"] = buf.tobytes()
+    return thumbs
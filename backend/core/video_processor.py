@@ -1,65 +1,46 @@
 import cv2
 import numpy as np
-import pytesseract
-from moviepy import VideoFileClip, ImageSequenceClip, TextClip, CompositeVideoClip
+from moviepy import VideoFileClip, TextClip, CompositeVideoClip
 import os, subprocess
 
+from core.detection_store import detection_store
+from core.easyocr_detector import detect_text_boxes
+from core.edge_density import EDGE_DENSITY_FRAMES, edge_text_bottom
+from core.ffmpeg_io import probe_video
+from core.frame_sampler import detection_sample_times, sample_frames, scale_area
+from core.ocr_engine import image_to_data
+from core.overlay_layer import get_overlay_layer
+from core.render_cache import file_fingerprint
+from core.render_engine import render_fanout, render_layer, render_video
+
 from dotenv import load_dotenv
 
 load_dotenv()
-pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD")
-
-# Initialize EasyOCR detector (lazy load, optional)
-_EASYOCR_READER = None
-_EASYOCR_AVAILABLE = None
-
-def _get_easyocr_reader():
-    """Lazy load EasyOCR reader instance for detection. Returns None if not available."""
-    global _EASYOCR_READER, _EASYOCR_AVAILABLE
-    if _EASYOCR_AVAILABLE is None:
-        try:
-            import easyocr
-            _EASYOCR_READER = easyocr.Reader(['en'], gpu=False, verbose=False)
-            _EASYOCR_AVAILABLE = True
-        except ImportError:
-            _EASYOCR_AVAILABLE = False
-            print("[INFO] EasyOCR not available, falling back to pytesseract")
-    return _EASYOCR_READER if _EASYOCR_AVAILABLE else None
-
-
-def detect_text_area(frames, num_frames=10, debug_output_path=None):
+
+def detect_text_area(frames, num_frames=10, debug_output_path=None, source_size=None):
     """
     Text detector with EasyOCR (if available) or pytesseract fallback.
+    Pass `source_size` = (width, height) when the frames were downscaled
+    (see core.frame_sampler); the result is always in source pixels.
     Returns (x, y, w, h) for mask area.
     """
     if not frames:
         return None
 
-    frame_height, frame_width = frames[0].shape[:2]
+    sample_height, sample_width = frames[0].shape[:2]
+    frame_width, frame_height = source_size or (sample_width, sample_height)
+    scale = sample_height / frame_height
 
-    # Try EasyOCR first if available
-    reader = _get_easyocr_reader()
-    if reader is not None:
-        # Use EasyOCR detection
-        num_frames_to_sample = min(12, len(frames))
-        sample_indices = list(range(min(num_frames_to_sample, len(frames))))
+    # Try EasyOCR first if available (one batched call to the node's OCR server)
+    easyocr_boxes = detect_text_boxes(frames[:12])
+    if easyocr_boxes is not None:
         y_max = 0
         boxes_detected = False
 
-        for frame_idx in sample_indices:
-            frame = frames[frame_idx]
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            try:
-                results = reader.detect(frame_rgb)
-                if results and results[0]:
-                    boxes_detected = True
-                    for box in results[0]:
-                        y_coords = [point[1] for point in box]
-                        bottom_y = max(y_coords)
-                        y_max = max(y_max, bottom_y)
-            except Exception as e:
-                print(f"[EasyOCR] Detection error on frame {frame_idx}: {e}")
-                continue
+        for boxes in easyocr_boxes:
+            for x0, y0, x1, y1 in boxes:
+                boxes_detected = True
+                y_max = max(y_max, y1 / scale)
 
         if boxes_detected:
             padding = 120
@@ -76,34 +57,20 @@ def detect_text_area(frames, num_frames=10, debug_output_path=None):
 
         for idx in sample_indices:
             gray = cv2.cvtColor(frames[int(idx)], cv2.COLOR_BGR2GRAY)
-            d = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+            d = image_to_data(gray)
             for j in range(len(d["text"])):
                 try:
                     if int(float(d["conf"][j])) > 10 and d["text"][j].strip():
                         x, y, w, h = d["left"][j], d["top"][j], d["width"][j], d["height"][j]
-                        y_max_ocr = max(y_max_ocr, y + h)
+                        y_max_ocr = max(y_max_ocr, (y + h) / scale)
                         ocr_detected_count += 1
                 except ValueError:
                     continue
 
         # Edge detection fallback
-        y_max_edges = 0
-        bottom_half_start = int(frame_height * 0.4)
-        gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        row_density = []
-        for y in range(bottom_half_start, frame_height):
-            density = np.sum(edges[y, :]) / frame_width
-            row_density.append((y, density))
-        if row_density:
-            row_density.sort(key=lambda x: x[1], reverse=True)
-            top_rows = row_density[:max(1, len(row_density) // 10)]
-            if top_rows and top_rows[0][1] > 10:
-                for y, density in top_rows:
-                    if density > 10:
-                        y_max_edges = max(y_max_edges, y)
-
-        y_max_detected = max(y_max_ocr, y_max_edges)
+        y_max_edges = edge_text_bottom(frames[:EDGE_DENSITY_FRAMES]) / scale
+
+        y_max_detected = int(max(y_max_ocr, y_max_edges))
         expand_bottom = 100
         weak_detection_threshold = 5
         minimum_safe_coverage = int(frame_height * 0.80)
@@ -122,12 +89,13 @@ def detect_text_area(frames, num_frames=10, debug_output_path=None):
     if debug_output_path and len(frames) > 0:
         debug_frame = frames[0].copy()
         # Draw bright green line at mask_end
-        cv2.line(debug_frame, (0, mask_end), (frame_width, mask_end), (0, 255, 0), 3)
+        line_y = int(mask_end * scale)
+        cv2.line(debug_frame, (0, line_y), (sample_width, line_y), (0, 255, 0), 3)
         # Draw text showing coverage
         coverage_pct = (mask_end / frame_height) * 100
         status = "Detected" if boxes_detected else "Fallback"
         cv2.putText(debug_frame, f"{status}: {mask_end}px ({coverage_pct:.1f}%)",
-                    (10, mask_end - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                    (10, line_y - 10), cv2.FONT_HERSHEY_SIMPLEX,
                     1.0, (0, 255, 0), 2, cv2.LINE_AA)
         cv2.imwrite(debug_output_path, debug_frame)
         print(f"[DEBUG] Saved debug frame to: {debug_output_path}")
@@ -337,91 +305,79 @@ def overlay_text_on_frame(
     return overlay
 
 
-def process_video(input_path, output_path):
-    # FIX 1: VideoFileClip handles rotation metadata automatically
-    # Frames are already normalized to final render orientation
-    clip = VideoFileClip(input_path)
-    fps = clip.fps
-
-    # FIX 2: Extract up to 10 frames from first 2 seconds (not just first frame)
-    # This catches captions that fade in after the video starts
-    frames = []
-    max_frames_for_detection = 10
-    frames_in_2_seconds = int(fps * 2)  # ~48-60 frames for typical videos
-    sample_every = max(1, frames_in_2_seconds // max_frames_for_detection)
+def process_video(input_path, output_path, info=None, source_fp=None):
+    # Frames where the top of the picture changes (found by a cheap low-res scan
+    # of the clip) catch captions that fade in or appear later; ffmpeg returns
+    # them as downscaled BGR frames already in display orientation.
+    # `info` / `source_fp` may come from core.ingest (probe of the mezzanine,
+    # fingerprint of the original upload).
+    info = info or probe_video(input_path)
+    frame_size = (info["width"], info["height"])
+
+    # Source seen before: reuse its detection (including "no text") and skip OCR
+    source_fp = source_fp or file_fingerprint(input_path)
+    stored = detection_store.get(source_fp, "process")
+    if stored and stored["frame_size"] == frame_size:
+        text_area, bg_color = stored["text_area"], stored["bg_color"]
+    else:
+        frames, scale = sample_frames(input_path, detection_sample_times(input_path, info), info=info)
 
-    for i, f in enumerate(clip.iter_frames()):
-        if len(frames) >= max_frames_for_detection:
-            break
-        if i % sample_every == 0:  # Sample evenly
-            # FIX 1: Frames from VideoFileClip are already in final orientation
-            frames.append(cv2.cvtColor(f, cv2.COLOR_RGB2BGR))
+        # FIX 5: Generate debug frame
+        import tempfile
+        debug_path = os.path.join(tempfile.gettempdir(), "text_detection_debug.png")
+        text_area = detect_text_area(frames, debug_output_path=debug_path, source_size=frame_size)
 
-    # FIX 5: Generate debug frame
-    import tempfile
-    debug_path = os.path.join(tempfile.gettempdir(), "text_detection_debug.png")
-    text_area = detect_text_area(frames, debug_output_path=debug_path)
+        bg_color = None
+        if text_area:
+            # colour sampled on the downscaled frame, so scale the area down to match
+            bg_color = get_background_color(frames[0], *scale_area(text_area, scale))
+        del frames
+        detection_store.put(source_fp, "process", text_area, frame_size=frame_size, bg_color=bg_color)
 
     if not text_area:
-        clip.reader.close()
-        clip.close()
         return None, None
 
-    bg_color = get_background_color(frames[0], *text_area)
-    del frames
+    # Stream decode -> mask -> encode one frame at a time. Only the decode ring
+    # is held in memory, so peak RSS does not grow with the video length.
+    x, y, w, h = text_area
 
-    processed = []
-    for f in clip.iter_frames():
-        frame = cv2.cvtColor(f, cv2.COLOR_RGB2BGR)
-        frame = remove_text_from_frame(frame, text_area, bg_color)
-        processed.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    def _mask(frame):
+        return cv2.rectangle(frame, (x, y), (x + w, y + h), bg_color, -1)
 
-    out = ImageSequenceClip(processed, fps=fps)
-    if clip.audio:
-        out = out.with_audio(clip.audio)
-    out.write_videofile(output_path, codec="libx264", audio_codec="aac")
-
-    clip.reader.close()
-    clip.close()
-    out.close()
+    render_video(input_path, output_path, _mask, info=info)
 
     return text_area, bg_color
 
 
-def add_text_to_video(
-    input_path, output_path, text_area, text, text_color=(255, 255, 255)
-):
-    from tempfile import NamedTemporaryFile
-
-    clip = VideoFileClip(input_path)
-    fps = clip.fps
-    height, width = clip.h, clip.w
+def _caption_layer(info, text, text_area, text_color):
+    def _draw(canvas):
+        return overlay_text_on_frame(canvas, text, text_area, color=text_color)
 
-    temp_output = NamedTemporaryFile(delete=False, suffix=".mp4").name
-
-    writer = cv2.VideoWriter(
-        temp_output,
-        cv2.VideoWriter_fourcc(*"mp4v"),
-        fps,
-        (width, height),
+    return get_overlay_layer(
+        info["width"], info["height"], _draw,
+        caption=text, text_area=text_area, text_color=text_color, watermark=False,
     )
 
-    for frame in clip.iter_frames():
-        bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        overlayed = overlay_text_on_frame(bgr, text, text_area, color=text_color)
-        writer.write(overlayed)
 
-    writer.release()
-    clip.reader.close()
-    clip.close()
+def add_text_to_video(
+    input_path, output_path, text_area, text, text_color=(255, 255, 255)
+):
+    # Single pass: decode once, overlay, encode with the source audio
+    info = probe_video(input_path)
+    layer = _caption_layer(info, text, text_area, text_color)
+    render_layer(input_path, output_path, layer, info=info)
 
-    # Use moviepy to attach audio (no re-rendering of frames)
-    silent = VideoFileClip(temp_output)
-    original = VideoFileClip(input_path)
-    final = silent.with_audio(original.audio)
-    final.write_videofile(output_path, codec="libx264", audio_codec="aac")
 
-    silent.close()
-    original.close()
-    final.close()
-    os.remove(temp_output)
+def add_texts_to_video(input_path, outputs, text_area, text_color=(255, 255, 255), max_workers=None):
+    """
+    Render several captions over the same video with a single decode.
+    `outputs` is a list of (output_path, text); outputs are MP4 whatever the
+    extension, so name them .mp4. Returns per-output results in order
+    (see render_fanout).
+    """
+    info = probe_video(input_path)
+    targets = [
+        (output_path, _caption_layer(info, text, text_area, text_color).apply)
+        for output_path, text in outputs
+    ]
+    return render_fanout(input_path, targets, info=info, max_workers=max_workers)
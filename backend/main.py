@@ -19,6 +19,10 @@ from routes.analyze_route import analyze_blueprint
 from routes.finalize_route import finalize_blueprint
 from routes.instagram_route import instagram_bp
 from routes.billing_routes import billing_blueprint
+from core.compute_budget import configure_process_threads
+from core.easyocr_detector import warm_ocr_server
+from core.gemini_clients import warm_gemini_clients
+from core.ingest import UPLOAD_MAX_MB
 # --------------------------------------------------------------------
 
 # ---- Logging --------------------------------------------------------
@@ -38,8 +42,9 @@ def create_app():
     app.logger.handlers = []
     app.logger.propagate = False
 
-    # Max upload size: 100 MB
-    app.config["MAX_CONTENT_LENGTH"] = 100 * 1024 * 1024
+    # Max request size: the upload limit (UPLOAD_MAX_MB, 100 MB by default), so
+    # werkzeug answers 413 before a larger body is read
+    app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_MB * 1024 * 1024
 
     # ---- CORS (only your allowed origins) ---------------------------
     CORS(
@@ -156,6 +161,15 @@ def create_app():
     app.register_blueprint(billing_blueprint)
     # ----------------------------------------------------------------
 
+    # Cap OpenCV's thread pool to one compute-budget allotment for this worker
+    configure_process_threads()
+
+    # Load the EasyOCR model in the node's OCR server before the first request
+    warm_ocr_server()
+
+    # Discover Gemini credentials and build the shared clients before the first request
+    warm_gemini_clients()
+
     # ---- Global error handlers with CORS ---------------------------
     from werkzeug.exceptions import HTTPException
     
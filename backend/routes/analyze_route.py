@@ -17,13 +17,17 @@ This file handles the /video/analyze/ endpoint independently.
 import os
 import re
 import shutil
-import mimetypes
 from flask import Blueprint, request, jsonify, g
 from bson import ObjectId
-from google import genai
 from google.genai import types
-from google.auth import default as google_auth_default
+from core.analysis_proxy import ANALYSIS_MEDIA_RESOLUTION, analysis_proxy, expected_variant, input_variant
+from core.disk_lru import release_pin
+from core.gemini_clients import get_client
 from core.gemini_funny_comment_generator import generate_meme_captions
+from core.gemini_media import video_part
+from core.ingest import UploadRejected, check_upload_size, ingest, preflight
+from core.render_cache import file_fingerprint
+from core.summary_store import cached_summary
 from auth.dependencies import login_required
 from database import db
 
@@ -36,6 +40,13 @@ analyze_blueprint = Blueprint("analyze", __name__, url_prefix="/video")
 @analyze_blueprint.route("/analyze/", methods=["POST"])
 @login_required
 def analyze_video():
+    # Pre-flight: refuse oversized requests from Content-Length, before the body is parsed
+    try:
+        check_upload_size(request.content_length)
+    except UploadRejected as e:
+        sentry_sdk.capture_message(f"Analyze: Upload rejected: {e}", level="warning")  # --- Sentry ---
+        return jsonify({"error": str(e)}), e.status_code
+
     if "file" not in request.files:
         sentry_sdk.capture_message("Analyze: Missing video!", level="warning")  # --- Sentry ---
         return jsonify({"error": "Missing video!"}), 400
@@ -99,12 +110,29 @@ def analyze_video():
 
     temp_path = f"temp/temp_{reel_id}{ext}"
     original_path = f"uploads/reel_{reel_id}_original{ext}"
-    with open(temp_path, "wb") as f_out:
-        shutil.copyfileobj(file, f_out)
+
+    # Pre-flight: validate the upload from its headers before Gemini or the transcoder sees it
+    try:
+        with open(temp_path, "wb") as f_out:
+            shutil.copyfileobj(file, f_out)
+        upload_info = preflight(temp_path)
+    except UploadRejected as e:
+        sentry_sdk.capture_message(f"Analyze: Upload rejected: {e}", level="warning")  # --- Sentry ---
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return jsonify({"error": str(e)}), e.status_code
     shutil.copy(temp_path, original_path)
 
+    # Gemini gets the normalized mezzanine (H.264, <=1080x1920), not e.g. a 4K HEVC upload
+    try:
+        source = ingest(temp_path, info=upload_info)
+        analysis_path, source_fp = source["path"], source["source_fp"]
+    except Exception as e:
+        sentry_sdk.capture_exception(e)
+        analysis_path, source_fp = temp_path, None
+
     try:
-        video_summary, audio_summary = summarize_video_and_audio(temp_path)
+        video_summary, audio_summary = summarize_video_and_audio(analysis_path, source_fp=source_fp)
         meme_options = generate_meme_captions(
             video_summary=video_summary,
             audio_summary=audio_summary,
@@ -114,6 +142,7 @@ def analyze_video():
         )
 
         # --- CLEANUP STEP ---
+        release_pin(analysis_path)
         for fpath in [temp_path, original_path]:
             try:
                 if os.path.exists(fpath):
@@ -133,6 +162,7 @@ def analyze_video():
         # --- Sentry: Capture unexpected errors with context ---
         sentry_sdk.capture_exception(e)
         # --- CLEANUP EVEN ON ERROR ---
+        release_pin(analysis_path)
         for fpath in [temp_path, original_path]:
             try:
                 if os.path.exists(fpath):
@@ -146,27 +176,7 @@ def analyze_video():
 # ==============================
 #  ^=^t  Summarize Video + Audio
 # ==============================
-def summarize_video_and_audio(video_path: str):
-    credentials, project_id = google_auth_default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
-    
-    gemini_project = os.getenv("GEMINI_PROJECT", "publefy-484406")
-    gemini_location = os.getenv("GEMINI_LOCATION_VIDEO", "us-central1")
-    gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-001")
-
-    client = genai.Client(
-        vertexai=True,
-        project=project_id or gemini_project,
-        location=gemini_location,
-        credentials=credentials
-    )
-
-    mime_type = mimetypes.guess_type(video_path)[0]
-    with open(video_path, "rb") as f:
-        video_data = f.read()
-
-    video_part = types.Part.from_bytes(data=video_data, mime_type=mime_type)
-
-    prompt_text = """
+_SUMMARY_PROMPT = """
 You are a professional video summarizer.
 
 Please describe the uploaded video in **two clear sections**, each limited to **2 ^`^s3 lines only**:
@@ -181,14 +191,45 @@ Use the following format exactly:
 
 **Audio:** [Your short 2 ^`^s3 line summary here]
 """
-    prompt_part = types.Part.from_text(text=prompt_text)
 
-    contents = [types.Content(role="user", parts=[video_part, prompt_part])]
+def summarize_video_and_audio(video_path: str, source_fp: str | None = None):
+    """
+    (video_summary, audio_summary) for the clip at `video_path`. Summaries are
+    kept in the summary store under `source_fp` (default: the file's own
+    fingerprint), so re-analyzing the same upload skips Gemini.
+    """
+    gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-001")
+    source_fp = source_fp or file_fingerprint(video_path)
+
+    def summarize():
+        # 360p / 1 fps / mono proxy instead of the full clip (see core.analysis_proxy)
+        proxy = analysis_proxy(video_path, source_fp=source_fp)
+        try:
+            summaries = _summarize_video_and_audio_gemini(video_path, proxy)
+        finally:
+            release_pin(proxy)
+        return dict(zip(("video", "audio"), summaries)), input_variant(proxy)
+
+    summary = cached_summary(source_fp, _SUMMARY_PROMPT, gemini_model, summarize, variant=expected_variant())
+    return summary.get("video", ""), summary.get("audio", "")
+
+
+def _summarize_video_and_audio_gemini(video_path: str, proxy: str | None = None):
+    """Gemini call behind summarize_video_and_audio; sends `proxy` (an analysis proxy) instead of the clip when given."""
+    gemini_project = os.getenv("GEMINI_PROJECT", "publefy-484406")
+    gemini_location = os.getenv("GEMINI_LOCATION_VIDEO", "us-central1")
+    gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-001")
+
+    client = get_client(gemini_project, gemini_location)
+
+    prompt_part = types.Part.from_text(text=_SUMMARY_PROMPT)
+
     config = types.GenerateContentConfig(
         temperature=1,
         top_p=0.95,
         max_output_tokens=8192,
         response_modalities=["TEXT"],
+        media_resolution=ANALYSIS_MEDIA_RESOLUTION if proxy else None,
         safety_settings=[
             types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
             types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
@@ -198,10 +239,13 @@ Use the following format exactly:
     )
 
     result = ""
-    for chunk in client.models.generate_content_stream(
-        model=gemini_model, contents=contents, config=config
-    ):
-        result += chunk.text
+    # small clips inline, larger ones by gs:// URI (streamed upload, see core.gemini_media)
+    with video_part(proxy or video_path) as part:
+        contents = [types.Content(role="user", parts=[part, prompt_part])]
+        for chunk in client.models.generate_content_stream(
+            model=gemini_model, contents=contents, config=config
+        ):
+            result += chunk.text
 
     result = result.replace("**", "")
     audio_match = re.search(r"Audio:\s*(.*)", result, re.DOTALL)
@@ -15,9 +15,22 @@ import threading
 from contextlib import contextmanager
 from database import db
 from bson import ObjectId
-from flask import Blueprint, request, jsonify, Response, redirect, url_for, g, abort
+from flask import Blueprint, request, jsonify, Response, redirect, url_for, g, abort, copy_current_request_context
+from core.analysis_proxy import ANALYSIS_MEDIA_RESOLUTION, analysis_proxy, expected_variant, input_variant
 from core.data.gcloud_repo import GCloudRepository
 from core.data.video_service import upload_video_to_gcloud  # noqa: F401 (kept for parity)
+from core.detection_store import detection_store
+from core.disk_lru import release_pin
+from core.ffmpeg_io import RENDER_EXT, RENDER_MIME, probe_video
+from core.frame_sampler import sample_frames
+from core.gemini_clients import get_client
+from core.gemini_media import gcs_uri, video_part
+from core.ocr_engine import image_to_data
+from core.overlay_layer import get_overlay_layer
+from core.pipeline import run_pipeline
+from core.render_cache import render_cache, render_cache_key
+from core.render_engine import RENDER_POOL_WORKERS, render_layer, render_layer_pooled
+from core.summary_store import cached_summary
 from services.reel_service import create_reel, create_reel_for_mem, sanitize_filename
 from auth.dependencies import login_required
 import sentry_sdk
@@ -27,11 +40,8 @@ from email.utils import formatdate
 import tempfile
 import subprocess
 import shlex
-import pytesseract
 # Gemini SDK (same style as analyze_route.py)
-from google import genai
 from google.genai import types
-from google.auth import default as google_auth_default
 
 
 def _now_iso():
@@ -64,6 +74,12 @@ PROMPT_BANK = [
     "#caption", "#quote", "#shorts", "#edit", "#aesthetic",
 ]
 
+# Concurrency per stage of /generate-memes (see core.pipeline); render is bounded by the render pool
+BANK_DOWNLOAD_WORKERS = int(os.getenv("BANK_DOWNLOAD_WORKERS", "4"))
+BANK_CAPTION_WORKERS = int(os.getenv("BANK_CAPTION_WORKERS", "4"))
+BANK_RENDER_WORKERS = int(os.getenv("BANK_RENDER_WORKERS", str(max(1, RENDER_POOL_WORKERS))))
+BANK_PUBLISH_WORKERS = int(os.getenv("BANK_PUBLISH_WORKERS", "4"))
+
 AI_GEN_NICHE_THUMBS = False
 BANK_ONLY = True
 PLACEHOLDER_THUMB = os.getenv("PLACEHOLDER_THUMB", "static/placeholders/thumb.jpg")
@@ -76,17 +92,8 @@ GEMINI_LOCATION = os.getenv("GEMINI_LOCATION_TEXT", "us-central1")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-001")
 
 def _gemini_client(project: str = GEMINI_PROJECT, location: str = GEMINI_LOCATION):
-    credentials, detected_project = google_auth_default(
-        scopes=["https://www.googleapis.com/auth/cloud-platform"]
-    )
-    # Prefer the detected project from ADC; fall back to provided/default
-    effective_project = detected_project or project
-    return genai.Client(
-        vertexai=True,
-        project=effective_project,
-        location=location,
-        credentials=credentials,
-    )
+    # Shared per-process client; prefers the detected project from ADC, falls back to provided/default
+    return get_client(project, location)
 
 # ---------------- helpers ----------------
 _USER_LOGO_CACHE = {}
@@ -316,27 +323,33 @@ def _overlay_text_on_frame(
         )
     return overlay
 
-def _get_top_overlay_area(frame, percent_min=0.20, percent_max=0.25):
-    h, w, _ = frame.shape
+def _get_top_overlay_area(frame_size, percent_min=0.20, percent_max=0.25):
+    w, h = frame_size
     y0 = 0
     y1 = int(h * percent_max)
     return (0, y0, w, y1 - y0)
 
 
-def _detect_text_area(frame):
+def _detect_text_area(frame, source_size=None):
     """Detect text area using OCR on a single frame, returns (x, y, w, h) or None.
 
     Returns FULL WIDTH overlay (x=0, w=frame_width) starting from TOP (y=0).
     Only considers text in the TOP 50% of the frame and limits max height to 40%.
     Also detects bright (white) backgrounds that might extend below the text.
+    Pass `source_size` = (width, height) when the frame was downscaled; the
+    result is in source pixels.
     """
     try:
-        frame_height, frame_width = frame.shape[:2]
+        sample_height, sample_width = frame.shape[:2]
+        frame_width, frame_height = source_size or (sample_width, sample_height)
+        scale = sample_height / frame_height
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        d = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+        # OCR only the upper part of the frame; words starting below the
+        # halfway line are skipped anyway, the margin keeps those that cross it whole
+        d = image_to_data(gray, roi=(0, 0, sample_width, int(sample_height * 0.65)))
 
         # Only consider text in top 50% of frame
-        max_y_threshold = frame_height * 0.5
+        max_y_threshold = sample_height * 0.5
         y_max = 0
         has_text = False
 
@@ -356,19 +369,20 @@ def _detect_text_area(frame):
             return None
 
         # Extend down to cover any bright background below the text
+        # (pixel amounts are in source pixels, the scan runs on the sampled frame)
         text_bottom = int(y_max)
-        expand_bottom = 30  # Base expansion
+        expand_bottom = 30 * scale  # Base expansion
 
         # Check for bright rows below text (white/light backgrounds)
-        scan_limit = min(text_bottom + 100, int(frame_height * 0.5))
+        scan_limit = min(text_bottom + int(100 * scale), int(sample_height * 0.5))
         for row_y in range(text_bottom, scan_limit):
             row_brightness = np.mean(gray[row_y, :])
             if row_brightness > 200:  # Bright row (likely white background)
-                expand_bottom = row_y - text_bottom + 20
+                expand_bottom = row_y - text_bottom + 20 * scale
             elif row_brightness < 150:  # Dark row - stop expanding
                 break
 
-        detected_bottom = text_bottom + expand_bottom
+        detected_bottom = int((text_bottom + expand_bottom) / scale)
 
         # Limit max height to 40% of frame to avoid covering too much content
         max_height = int(frame_height * 0.40)
@@ -384,15 +398,6 @@ def _detect_text_area(frame):
         return None
 
 
-def _make_thumbnail_from_video_path(video_path: str, out_path: str, at_seconds: float = 0.5):
-    clip = VideoFileClip(video_path)
-    t = max(0.0, min(at_seconds, max(0.0, (clip.duration or 1.0) - 0.05)))
-    frame = clip.get_frame(t)
-    clip.close()
-    bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-    cv2.imwrite(out_path, bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-
-
 def _download_blob_to_temp(bucket, client, blob_name: str, suffix: str = ".mp4") -> str | None:
     try:
         src = bucket.blob(blob_name)
@@ -405,86 +410,108 @@ def _download_blob_to_temp(bucket, client, blob_name: str, suffix: str = ".mp4")
         sentry_sdk.capture_exception(e)
         return None
 
-def _render_with_caption(src_path: str, caption: str, user_logo_img=None) -> tuple[str, tuple]:
+def _render_with_caption(src_path: str, caption: str, user_logo_img=None, source_fp: str | None = None,
+                         renderer=render_layer) -> tuple[str, tuple, dict]:
     """
-    Returns (final_video_path, text_area)
+    Returns (final_video_path, text_area, thumbnails)
+    thumbnails = {"jpeg": bytes, ...} captured at 0.5s during the render (may be empty).
+    `source_fp` (the bank blob fingerprint) lets a source detected before skip OCR.
+    `renderer` is render_layer or render_layer_pooled (batch requests render in the process pool).
     """
-    # detect overlay area from first frame (same as finalize)
-    clip_for_overlay = VideoFileClip(src_path)
-    first_frame = next(clip_for_overlay.iter_frames())
-    clip_for_overlay.reader.close()
-    clip_for_overlay.close()
-
-    # Try OCR detection first, fallback to default area (25% from top)
-    bgr_frame = cv2.cvtColor(first_frame, cv2.COLOR_RGB2BGR)
-    detected = _detect_text_area(bgr_frame)
-    if detected:
-        x, y, w, h = detected
+    info = probe_video(src_path)
+    source_size = (info["width"], info["height"])
+
+    stored = detection_store.get(source_fp, "bank")
+    if stored and stored["text_area"] and stored["frame_size"] == source_size:
+        x, y, w, h = stored["text_area"]
     else:
-        x, y, w, h = _get_top_overlay_area(first_frame, percent_min=0.20, percent_max=0.25)
+        # detect overlay area from first frame (same as finalize); ffmpeg decodes
+        # just that frame, downscaled, straight to BGR
+        frames, _ = sample_frames(src_path, [0.0], info=info)
+        if not frames:
+            raise RuntimeError("Could not decode the first frame")
+
+        # Try OCR detection first, fallback to default area (25% from top)
+        detected = _detect_text_area(frames[0], source_size=source_size)
+        if detected:
+            x, y, w, h = detected
+        else:
+            x, y, w, h = _get_top_overlay_area(source_size, percent_min=0.20, percent_max=0.25)
+        detection_store.put(source_fp, "bank", (x, y, w, h), frame_size=source_size)
 
     background_color = (0, 0, 0)
     text_color = (255, 255, 255)
     text_area = (x, y, w, h)
 
-    # process frames
-    clip = VideoFileClip(src_path)
-    fps = clip.fps
-    width, height = clip.w, clip.h
-
-    output_temp = NamedTemporaryFile(delete=False, suffix=".mp4").name
-    writer = cv2.VideoWriter(
-        output_temp, cv2.VideoWriter_fourcc(*"mp4v"), fps, (int(width), int(height))
-    )
-
-    for frame in clip.iter_frames():
-        bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    def _overlay(bgr):
         cv2.rectangle(bgr, (x, y), (x + w, y + h), background_color, -1)
         overlayed = _overlay_text_on_frame(bgr, caption, text_area, color=text_color)
         if user_logo_img is not None:
             overlayed = _add_user_logo_watermark(overlayed, user_logo_img, opacity=0.5)
-        overlayed = _add_copyright_watermark(overlayed)
-        writer.write(overlayed)
+        return _add_copyright_watermark(overlayed)
 
-    writer.release()
-    clip.reader.close()
-    clip.close()
-
-    # reattach original audio
+    # single pass: decode once, overlay, encode with the original audio
     final_path = NamedTemporaryFile(delete=False, suffix=".mp4").name
     try:
-        final = VideoFileClip(output_temp).with_audio(VideoFileClip(src_path).audio)
-        final.write_videofile(final_path, codec="libx264", audio_codec="aac")
-        final.close()
-    finally:
+        layer = get_overlay_layer(
+            info["width"], info["height"], _overlay,
+            caption=caption, text_area=text_area, logo=user_logo_img, watermark=True,
+        )
+        stats = renderer(src_path, final_path, layer, info=info, thumbnail_at=0.5)
+    except Exception:
         try:
-            os.remove(output_temp)
+            os.remove(final_path)
         except Exception:
             pass
+        raise
 
-    return final_path, text_area
+    return final_path, text_area, stats.get("thumbnails", {})
 
 # ============ Gemini steps ============
-def _summarize_video_local(video_path: str) -> tuple[str, str]:
-    """Two short sections: Video: ...  Audio: ... (<=2 lines each)."""
+_SUMMARY_PROMPT = (
+    "You are a professional video summarizer.\n"
+    "Describe in TWO short sections (<=2 lines each):\n"
+    "Video: visuals/actions/mood\n"
+    "Audio: speech/music/tone\n"
+    "Use exactly this format:\n"
+    "Video: <2 lines>\n"
+    "Audio: <2 lines>\n"
+)
+
+def _summarize_video_local(video_path: str, source_fp: str | None = None, source_blob: str | None = None) -> tuple[str, str]:
+    """
+    Two short sections: Video: ...  Audio: ... (<=2 lines each).
+    `source_fp` (the bank blob fingerprint) serves bank videos summarized before from the summary store.
+    `source_blob` (the bank blob name) lets Gemini read the clip from GCS instead of inline bytes.
+    """
+    if not source_fp:
+        proxy = analysis_proxy(video_path)
+        try:
+            return _summarize_video_gemini(video_path, source_blob, proxy)
+        finally:
+            release_pin(proxy)
+
+    def summarize():
+        proxy = analysis_proxy(video_path, source_fp=source_fp)
+        try:
+            summaries = _summarize_video_gemini(video_path, source_blob, proxy)
+        finally:
+            release_pin(proxy)
+        return dict(zip(("video", "audio"), summaries)), input_variant(proxy)
+
+    summary = cached_summary(source_fp, _SUMMARY_PROMPT, GEMINI_MODEL, summarize, variant=expected_variant())
+    return summary.get("video", ""), summary.get("audio", "")
+
+def _summarize_video_gemini(video_path: str, source_blob: str | None = None,
+                            proxy: str | None = None) -> tuple[str, str]:
+    """Gemini call behind _summarize_video_local; sends `proxy` (an analysis proxy) instead of the clip when given."""
     # Use GEMINI_LOCATION_VIDEO if present, otherwise default to GEMINI_LOCATION
     video_location = os.getenv("GEMINI_LOCATION_VIDEO", GEMINI_LOCATION)
     client = _gemini_client(project=GEMINI_PROJECT, location=video_location)
     mime = mimetypes.guess_type(video_path)[0] or "video/mp4"
-    with open(video_path, "rb") as f:
-        data = f.read()
-    video_part = types.Part.from_bytes(data=data, mime_type=mime)
-    prompt = (
-        "You are a professional video summarizer.\n"
-        "Describe in TWO short sections (<=2 lines each):\n"
-        "Video: visuals/actions/mood\n"
-        "Audio: speech/music/tone\n"
-        "Use exactly this format:\n"
-        "Video: <2 lines>\n"
-        "Audio: <2 lines>\n"
-    )
     cfg = types.GenerateContentConfig(
         temperature=1, top_p=0.95, max_output_tokens=8192, response_modalities=["TEXT"],
+        media_resolution=ANALYSIS_MEDIA_RESOLUTION if proxy else None,
         safety_settings=[
             types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
             types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
@@ -493,12 +520,18 @@ def _summarize_video_local(video_path: str) -> tuple[str, str]:
         ],
     )
     out = ""
-    for ch in client.models.generate_content_stream(
-        model=GEMINI_MODEL,
-        contents=[types.Content(role="user", parts=[video_part, types.Part.from_text(text=prompt)])],
-        config=cfg,
-    ):
-        out += ch.text or ""
+    # small local proxy (sent inline) beats the full clip by URI; the blob URI is the fallback
+    if proxy:
+        media = video_part(proxy, mime_type="video/mp4")
+    else:
+        media = video_part(video_path, uri=gcs_uri(source_blob) if source_blob else None, mime_type=mime)
+    with media as part:
+        for ch in client.models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=[types.Content(role="user", parts=[part, types.Part.from_text(text=_SUMMARY_PROMPT)])],
+            config=cfg,
+        ):
+            out += ch.text or ""
     out = out.replace("**", "")
     audio = re.search(r"Audio:\s*(.*)", out, re.DOTALL)
     video = re.search(r"(Video:|Content:)\s*(.*?)\n\s*Audio:", out, re.DOTALL)
@@ -1416,130 +1449,194 @@ def generate_memes_from_bank():
     items = []
     applied_prompts = []
     temp_paths = []
-    prompt_source = "gemini"
+    prompt_sources = []
+
+    # Per-item stages; an item that raises is dropped, the others carry on
+    def _download(job):
+        b, fp, in_request = job
+        src_blob = b.name
+        _, ext = os.path.splitext(src_blob.lower())
+        local_src = _download_blob_to_temp(bucket, client, src_blob, suffix=ext or ".mp4")
+        if not local_src:
+            raise RuntimeError(f"could not download {src_blob}")
+        temp_paths.append(local_src)
+        return {"blob": b, "fp": fp, "src_blob": src_blob, "ext": ext, "local_src": local_src, "in_request": in_request}
+
+    def _caption(item):
+        # summarize
+        try:
+            video_summary, audio_summary = _summarize_video_local(
+                item["local_src"], source_fp=item["fp"], source_blob=item["src_blob"]
+            )
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+            video_summary, audio_summary = "", ""
 
-    try:
-        for b, fp in picked:
-            src_blob = b.name
-            # Use user's prompt/keyword, not industry
-            _, ext = os.path.splitext(src_blob.lower())
-            local_src = _download_blob_to_temp(bucket, client, src_blob, suffix=ext or ".mp4")
-            if not local_src:
-                continue
-            temp_paths.append(local_src)
+        # 20 options from Gemini; use user's prompt/keyword, not industry
+        try:
+            opts = _gemini_options_for(video_summary, audio_summary, prompt_hint or "", intensity)
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+            prompt_sources.append("fallback")
+            opts = _fallback_prompts_for(prompt_hint or "general")
 
-            # summarize
-            try:
-                video_summary, audio_summary = _summarize_video_local(local_src)
-            except Exception as e:
-                sentry_sdk.capture_exception(e)
-                video_summary, audio_summary = "", ""
+        # pick BEST (with tiny variety among top 5)
+        item["chosen"] = _pick_best_prompt(opts, prompt_hint or "")
+        return item
 
-            # 20 options from Gemini
+    def _render(item):
+        reel_id = uuid4().hex
+        item.update(
+            reel_id=reel_id,
+            # renders are always MP4, whatever the source container
+            dst_blob=f"instagram_reels/{reel_id}{RENDER_EXT}",
+            dst_thumb=f"instagram_reels/{reel_id}.jpg",
+            local_final=None,
+        )
+
+        # same source + caption + logo rendered before: reuse it, no render/upload
+        item["cache_key"] = render_cache_key(item["fp"], item["chosen"], logo=user_logo_img, watermark=True, variant="bank")
+        cached = render_cache.get(item["cache_key"])
+        if cached:
             try:
-                opts = _gemini_options_for(video_summary, audio_summary, prompt_hint or "", intensity)
+                render_cache.materialize(cached, item["dst_blob"], item["dst_thumb"])
+                item["text_area"] = cached["text_area"]
+                return item
             except Exception as e:
                 sentry_sdk.capture_exception(e)
-                prompt_source = "fallback"
-                opts = _fallback_prompts_for(prompt_hint or "general")
 
-            # pick BEST (with tiny variety among top 5)
-            chosen = _pick_best_prompt(opts, prompt_hint or "")
+        # render overlay (in the render process pool)
+        try:
+            local_final, text_area, thumbs = _render_with_caption(
+                item["local_src"], item["chosen"], user_logo_img=user_logo_img, source_fp=item["fp"],
+                renderer=render_layer_pooled,
+            )
+            temp_paths.append(local_final)
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+            raise
+        item.update(local_final=local_final, text_area=text_area, thumbs=thumbs)
+        return item
+
+    def _publish(item):
+        # url_for (media URLs) needs a request context; each item pushes its own copy
+        return item["in_request"](_publish_item, item)
 
-            # render overlay
-            try:
-                local_final, text_area = _render_with_caption(local_src, chosen, user_logo_img=user_logo_img)
-                temp_paths.append(local_final)
-            except Exception as e:
-                sentry_sdk.capture_exception(e)
-                continue
+    def _publish_item(item):
+        src_blob, dst_blob, dst_thumb = item["src_blob"], item["dst_blob"], item["dst_thumb"]
+        reel_id, chosen, text_area = item["reel_id"], item["chosen"], item["text_area"]
+        local_final = item["local_final"]
 
-            # thumb
+        if local_final:
+            # thumb: captured during the render; re-decode only if it is missing
             thumb_local = NamedTemporaryFile(delete=False, suffix=".jpg").name
             temp_paths.append(thumb_local)
             try:
-                _make_thumb_from_video(local_final, thumb_local, at_seconds=0.5)
+                if item["thumbs"].get("jpeg"):
+                    with open(thumb_local, "wb") as f:
+                        f.write(item["thumbs"]["jpeg"])
+                else:
+                    _make_thumb_from_video(local_final, thumb_local, at_seconds=0.5)
             except Exception as e:
                 sentry_sdk.capture_exception(e)
                 thumb_local = None
 
             # upload to instagram_reels/
-            reel_id = uuid4().hex
-            out_ext = ext if ext in {".mp4", ".mov", ".m4v", ".webm"} else ".mp4"
-            dst_blob = f"instagram_reels/{reel_id}{out_ext}"
-            dst_thumb = f"instagram_reels/{reel_id}.jpg"
             try:
                 vblob = bucket.blob(dst_blob)
-                vblob.upload_from_filename(local_final, content_type=b.content_type or "video/mp4", client=client)
+                vblob.upload_from_filename(local_final, content_type=RENDER_MIME, client=client)
                 if thumb_local:
                     tblob = bucket.blob(dst_thumb)
                     tblob.upload_from_filename(thumb_local, content_type="image/jpeg", client=client)
             except Exception as e:
                 sentry_sdk.capture_exception(e)
-                continue
+                raise
 
-            # never repeat (disabled - meme_usage removed)
+            render_cache.put(
+                item["cache_key"], text_area,
+                video_path=local_final, thumb_path=thumb_local,
+                blob=dst_blob, thumb_blob=dst_thumb if thumb_local else None,
+            )
 
-            # summary/tag just like upload flow
-            try:
-                summary_tag = _autopick_text(os.path.basename(src_blob), _tokens_from_keyword(os.path.basename(src_blob)))
-            except Exception:
-                summary_tag = "#meme"
+        # never repeat (disabled - meme_usage removed)
 
-            # DB insert
-            try:
-                create_reel_for_mem(
-                    reel_id=reel_id,
-                    text_color="#ffffff",
-                    text_area=[int(text_area[0]), int(text_area[1]), int(text_area[2]), int(text_area[3])],
-                    meme_options=[chosen],
-                    summary=summary_tag,
-                    original_path=src_blob,
-                    status="draft",
-                    user_id=user_id,
-                    profile_id=profile_id_str,
-                    ig_id=ig_id,
-                    final_video_path=dst_blob,
-                    error="",
-                    watermark=watermark,
-                    schedule_ready=True
-                )
-            except Exception as e:
-                sentry_sdk.capture_exception(e)
+        # summary/tag just like upload flow
+        try:
+            summary_tag = _autopick_text(os.path.basename(src_blob), _tokens_from_keyword(os.path.basename(src_blob)))
+        except Exception:
+            summary_tag = "#meme"
 
-            # response item
-            api_url = _api_media_url(dst_blob, absolute=True, bucket=bucket)
-            thumb_url = None
-            thumb_is_video = False
-            try:
-                if bucket.blob(dst_thumb).exists(client):
-                    thumb_url = _api_media_url(dst_thumb, absolute=api_abs, bucket=bucket)
-                    thumb_is_video = False
-            except Exception:
-                pass
-            if not thumb_url:
-                poster_blob = _poster_blob_for(src_blob, base_prefix)
-                thumb_url, thumb_is_video = _thumb_or_fallback(
-                    bucket=bucket, client=client,
-                    video_blob=dst_blob, poster_blob=poster_blob,
-                    api_abs=api_abs
-                )
-
-            items.append({
-                "reelId": reel_id,
-                "sourceBlob": src_blob,
-                "generatedBlob": dst_blob,
-                "apiUrl": api_url,
-                "thumb": thumb_url,
-                "thumbIsVideo": thumb_is_video,
-                "appliedPrompt": chosen,
-                "promptKeyword": prompt_hint or None,
-                "summary": summary_tag,
-                "fingerprint": fp,
-                "watermarkApplied": watermark,
-                "scheduleReady": True,
-            })
-            applied_prompts.append(chosen)
+        # DB insert
+        try:
+            create_reel_for_mem(
+                reel_id=reel_id,
+                text_color="#ffffff",
+                text_area=[int(text_area[0]), int(text_area[1]), int(text_area[2]), int(text_area[3])],
+                meme_options=[chosen],
+                summary=summary_tag,
+                original_path=src_blob,
+                status="draft",
+                user_id=user_id,
+                profile_id=profile_id_str,
+                ig_id=ig_id,
+                final_video_path=dst_blob,
+                error="",
+                watermark=watermark,
+                schedule_ready=True
+            )
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+
+        # response item
+        api_url = _api_media_url(dst_blob, absolute=True, bucket=bucket)
+        thumb_url = None
+        thumb_is_video = False
+        try:
+            if bucket.blob(dst_thumb).exists(client):
+                thumb_url = _api_media_url(dst_thumb, absolute=api_abs, bucket=bucket)
+                thumb_is_video = False
+        except Exception:
+            pass
+        if not thumb_url:
+            poster_blob = _poster_blob_for(src_blob, base_prefix)
+            thumb_url, thumb_is_video = _thumb_or_fallback(
+                bucket=bucket, client=client,
+                video_blob=dst_blob, poster_blob=poster_blob,
+                api_abs=api_abs
+            )
+
+        return {
+            "reelId": reel_id,
+            "sourceBlob": src_blob,
+            "generatedBlob": dst_blob,
+            "apiUrl": api_url,
+            "thumb": thumb_url,
+            "thumbIsVideo": thumb_is_video,
+            "appliedPrompt": chosen,
+            "promptKeyword": prompt_hint or None,
+            "summary": summary_tag,
+            "fingerprint": item["fp"],
+            "watermarkApplied": watermark,
+            "scheduleReady": True,
+        }
+
+    def _call(fn, *args):
+        return fn(*args)
+
+    jobs = [(b, fp, copy_current_request_context(_call)) for b, fp in picked]
+
+    try:
+        results = run_pipeline(jobs, [
+            ("download", _download, BANK_DOWNLOAD_WORKERS),
+            ("caption", _caption, BANK_CAPTION_WORKERS),
+            ("render", _render, BANK_RENDER_WORKERS),
+            ("publish", _publish, BANK_PUBLISH_WORKERS),
+        ], name="bank-generate")
+        for result in results:
+            if result["ok"]:
+                items.append(result["value"])
+                applied_prompts.append(result["value"]["appliedPrompt"])
+        prompt_source = "fallback" if prompt_sources else "gemini"
 
         # --- Points System: Deduct Balance (skip for unlimited plan) ---
         if items and not _is_unlimited_plan(user_id):
@@ -4,7 +4,6 @@ import os
 import cv2
 import numpy as np
 import shutil
-import pytesseract
 import json
 from urllib.parse import quote, urlparse
 
@@ -14,29 +13,23 @@ from moviepy import VideoFileClip, ImageSequenceClip
 from tempfile import NamedTemporaryFile
 from database import db
 from core.data.video_service import upload_video_to_gcloud
+from core.detection_store import detection_store
+from core.disk_lru import release_pin
+from core.easyocr_detector import detect_text_boxes
+from core.edge_density import EDGE_DENSITY_FRAMES, edge_text_bottom
+from core.ffmpeg_io import RENDER_EXT
+from core.frame_sampler import detection_sample_times, sample_frames
+from core.ingest import UploadRejected, check_upload_size, ingest, preflight
+from core.ocr_engine import image_to_data
+from core.overlay_layer import get_overlay_layer
+from core.render_cache import file_fingerprint, render_cache, render_cache_key
+from core.render_engine import render_layer
 from services.reel_service import create_reel
 from auth.dependencies import login_required
 import sentry_sdk
 
 finalize_blueprint = Blueprint("finalize_direct", __name__, url_prefix="/video")
 
-# Initialize EasyOCR detector (lazy load, optional)
-_EASYOCR_READER = None
-_EASYOCR_AVAILABLE = None
-
-def _get_easyocr_reader():
-    """Lazy load EasyOCR reader instance for detection. Returns None if not available."""
-    global _EASYOCR_READER, _EASYOCR_AVAILABLE
-    if _EASYOCR_AVAILABLE is None:
-        try:
-            import easyocr
-            _EASYOCR_READER = easyocr.Reader(['en'], gpu=False, verbose=False)
-            _EASYOCR_AVAILABLE = True
-        except ImportError:
-            _EASYOCR_AVAILABLE = False
-            print("[INFO] EasyOCR not available, falling back to pytesseract")
-    return _EASYOCR_READER if _EASYOCR_AVAILABLE else None
-
 # --- helpers -----------------------------------------------------------------
 
 def _get_profile_by_ig_id(user_id: str, ig_id: str):
@@ -202,6 +195,7 @@ def _resolve_thumb_url(reel: dict, host: str, force_host: bool = False) -> str:
 def finalize_video():
     temp_files = []
     final_path = None
+    source_path = None
     try:
         sentry_sdk.add_breadcrumb(
             category="video_finalize",
@@ -209,6 +203,13 @@ def finalize_video():
             level="info"
         )
 
+        # Pre-flight: refuse oversized requests from Content-Length, before the body is parsed
+        try:
+            check_upload_size(request.content_length)
+        except UploadRejected as e:
+            sentry_sdk.capture_message(f"Finalize: Upload rejected: {e}", level="warning")
+            return jsonify({"error": str(e)}), e.status_code
+
         # Basic presence checks
         if "file" not in request.files or "caption" not in request.form:
             sentry_sdk.capture_message("Finalize: Missing video file or caption", level="warning")
@@ -264,153 +265,178 @@ def finalize_video():
         # File paths for temp usage
         original_path = NamedTemporaryFile(delete=False, suffix=ext).name
         temp_files.append(original_path)
-        cleaned_path = NamedTemporaryFile(delete=False, suffix=ext).name
-        temp_files.append(cleaned_path)
-        output_temp = NamedTemporaryFile(delete=False, suffix=".mp4").name
-        temp_files.append(output_temp)
-        final_path = f"outputs/processed_{os.path.basename(cleaned_path)}"
-
-        with open(original_path, "wb") as f_out:
-            shutil.copyfileobj(file, f_out)
+        final_path = f"outputs/processed_{os.path.splitext(os.path.basename(original_path))[0]}{RENDER_EXT}"
 
+        # Pre-flight: validate the written upload from its headers (ms) before any decoding starts
         try:
-            # FIX 1 & 2: Extract multiple frames from first 2 seconds
-            # VideoFileClip handles rotation metadata automatically
-            clip_for_detection = VideoFileClip(original_path)
-            fps = clip_for_detection.fps
-
-            # Sample up to 10 frames from first 2 seconds to catch fade-in captions
-            frames_for_detection = []
-            max_frames_for_detection = 10
-            frames_in_2_seconds = int(fps * 2)
-            sample_every = max(1, frames_in_2_seconds // max_frames_for_detection)
-
-            for i, frame in enumerate(clip_for_detection.iter_frames()):
-                if len(frames_for_detection) >= max_frames_for_detection:
-                    break
-                if i % sample_every == 0:
-                    frames_for_detection.append(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
-
-            clip_for_detection.reader.close()
-            clip_for_detection.close()
-
-        except Exception as e:
-            sentry_sdk.capture_exception(e)
-            sentry_sdk.capture_message("Finalize: Failed to read frames for detection", level="error")
-            return jsonify({"error": "Failed to read frames for detection: " + str(e)}), 500
+            with open(original_path, "wb") as f_out:
+                shutil.copyfileobj(file, f_out)
+            upload_info = preflight(original_path)
+        except UploadRejected as e:
+            sentry_sdk.capture_message(f"Finalize: Upload rejected: {e}", level="warning")
+            return jsonify({"error": str(e)}), e.status_code
 
-        # FIX 5: Add debug output path
-        import tempfile as tmp
-        debug_path = os.path.join(tmp.gettempdir(), f"finalize_debug_{os.path.basename(original_path)}.png")
+        background_color = (0, 0, 0)
+        text_color = (255, 255, 255)
 
-        # Use edge-density detection with all fixes applied
-        detected_area = detect_text_area(frames_for_detection, debug_output_path=debug_path)
+        # Load user's custom logo for watermarking (once, before frame loop; also part of the cache key)
+        user_logo_img = _load_user_logo_from_gcs(user_id)
 
-        frame_h, frame_w = frames_for_detection[0].shape[:2] if frames_for_detection else (0, 0)
+        # Prepare blob names
+        reel_id = str(ObjectId())
+        blob_name = f"instagram_reels/reel_{reel_id}_option_1{RENDER_EXT}"  # the render is MP4
+        blob_original = f"instagram_reels/reel_{reel_id}_original{ext}"
+        blob_thumb = f"instagram_reels/reel_{reel_id}.jpg"  # thumbnail sits next to videos
 
-        if detected_area:
-            # detect_text_area now returns the complete coverage area
-            text_area = detected_area
-            x, y, w, h = text_area
-            print(f"[DEBUG] Text detection result: x={x}, y={y}, w={w}, h={h}")
-            print(f"[DEBUG] Frame size: {frame_w}x{frame_h}")
-            print(f"[DEBUG] Coverage: {y} to {y+h} ({(h/frame_h)*100:.1f}% of frame)")
-            sentry_sdk.add_breadcrumb(
-                category="text_detection",
-                message=f"Detected area: y={y} h={h} coverage={(h/frame_h)*100:.1f}%",
-                level="info"
-            )
-        else:
-            # Fallback: cover top 40% if no text detected
-            text_area = (0, 0, frame_w, int(frame_h * 0.40))
-            print(f"[DEBUG] No text detected, using fallback: top 40%")
-            sentry_sdk.add_breadcrumb(
-                category="text_detection",
-                message="No text detected, using fallback coverage",
-                level="warning"
+        # Same upload + caption + logo finalized before: reuse that render and skip
+        # detection, overlay, encode and the video upload entirely
+        cache_key = source_fp = None
+        try:
+            source_fp = file_fingerprint(original_path)
+            cache_key = render_cache_key(
+                source_fp, caption,
+                logo=user_logo_img, watermark=True, variant="finalize",
             )
+        except Exception as e:
+            sentry_sdk.capture_exception(e)
+        cached = render_cache.get(cache_key)
+        has_thumb = False
+        if cached:
+            try:
+                has_thumb = render_cache.materialize(cached, blob_name, blob_thumb)
+                upload_video_to_gcloud(original_path, blob_original)
+                text_area = cached["text_area"]
+                sentry_sdk.add_breadcrumb(category="render_cache", message="Finalize render cache hit", level="info")
+            except Exception as e:
+                sentry_sdk.capture_exception(e)
+                sentry_sdk.capture_message("Finalize: Render cache hit could not be reused", level="warning")
+                cached = None
 
-        # Unpack coordinates for black box covering
-        x, y, w, h = text_area
-
-        background_color = (0, 0, 0)
-        text_color = (255, 255, 255)
+        if not cached:
+            # Probe once and normalize once (H.264, <=1080x1920, capped fps, rotation
+            # applied); detection and render both read the cached mezzanine. The
+            # original upload is still what gets archived as blob_original.
+            try:
+                mezzanine = ingest(original_path, source_fp=source_fp, info=upload_info)
+            except Exception as e:
+                sentry_sdk.capture_exception(e)
+                sentry_sdk.capture_message("Finalize: Failed to read frames for detection", level="error")
+                return jsonify({"error": "Failed to read frames for detection: " + str(e)}), 500
+            source_path, info = mezzanine["path"], mezzanine["info"]
+            frame_h, frame_w = info["height"], info["width"]
+
+            # Source detected before (another caption/logo): reuse its text area, no OCR
+            stored = detection_store.get(source_fp, "finalize")
+            if stored and stored["text_area"] and stored["frame_size"] == (frame_w, frame_h):
+                text_area = stored["text_area"]
+                print(f"[DEBUG] Reusing stored text area {text_area}")
+                sentry_sdk.add_breadcrumb(category="text_detection", message="Stored text area reused", level="info")
+            else:
+                try:
+                    # OCR only the frames where the top of the picture changes (a cheap
+                    # low-res scan of the clip picks them), so late captions are caught.
+                    # ffmpeg hands back downscaled BGR frames in display orientation.
+                    frames_for_detection, _ = sample_frames(source_path, detection_sample_times(source_path, info), info=info)
+                except Exception as e:
+                    sentry_sdk.capture_exception(e)
+                    sentry_sdk.capture_message("Finalize: Failed to read frames for detection", level="error")
+                    return jsonify({"error": "Failed to read frames for detection: " + str(e)}), 500
+
+                # FIX 5: Add debug output path
+                import tempfile as tmp
+                debug_path = os.path.join(tmp.gettempdir(), f"finalize_debug_{os.path.basename(original_path)}.png")
+
+                # Use edge-density detection with all fixes applied
+                detected_area = detect_text_area(
+                    frames_for_detection, debug_output_path=debug_path, source_size=(info["width"], info["height"])
+                )
 
-        shutil.copyfile(original_path, cleaned_path)
+                if detected_area:
+                    # detect_text_area now returns the complete coverage area
+                    text_area = detected_area
+                    x, y, w, h = text_area
+                    print(f"[DEBUG] Text detection result: x={x}, y={y}, w={w}, h={h}")
+                    print(f"[DEBUG] Frame size: {frame_w}x{frame_h}")
+                    print(f"[DEBUG] Coverage: {y} to {y+h} ({(h/frame_h)*100:.1f}% of frame)")
+                    sentry_sdk.add_breadcrumb(
+                        category="text_detection",
+                        message=f"Detected area: y={y} h={h} coverage={(h/frame_h)*100:.1f}%",
+                        level="info"
+                    )
+                else:
+                    # Fallback: cover top 40% if no text detected
+                    text_area = (0, 0, frame_w, int(frame_h * 0.40))
+                    print(f"[DEBUG] No text detected, using fallback: top 40%")
+                    sentry_sdk.add_breadcrumb(
+                        category="text_detection",
+                        message="No text detected, using fallback coverage",
+                        level="warning"
+                    )
 
-        # Load user's custom logo for watermarking (once, before frame loop)
-        user_logo_img = _load_user_logo_from_gcs(user_id)
+                detection_store.put(source_fp, "finalize", text_area, frame_size=(frame_w, frame_h))
 
-        try:
-            clip = VideoFileClip(cleaned_path)
-            fps = clip.fps
-            width, height = clip.w, clip.h
-            writer = cv2.VideoWriter(
-                output_temp,
-                cv2.VideoWriter_fourcc(*"mp4v"),
-                fps,
-                (int(width), int(height)),
-            )
+            # Unpack coordinates for black box covering
+            x, y, w, h = text_area
 
-            for frame in clip.iter_frames():
-                bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            def _overlay(bgr):
                 # Draw black rectangle from TOP to BOTTOM-MOST text pixel + padding
                 cv2.rectangle(bgr, (x, y), (x + w, y + h), background_color, -1)
                 overlayed = overlay_text_on_frame(bgr, caption, text_area, color=text_color)
                 if user_logo_img is not None:
                     overlayed = add_user_logo_watermark(overlayed, user_logo_img, opacity=0.5)
-                overlayed = add_copyright_watermark(overlayed)
-                writer.write(overlayed)
+                return add_copyright_watermark(overlayed)
 
-            writer.release()
-            clip.reader.close()
-            clip.close()
-        except Exception as e:
-            sentry_sdk.capture_exception(e)
-            sentry_sdk.capture_message("Finalize: Error during video overlay", level="error")
-            return jsonify({"error": "Failed during video overlay: " + str(e)}), 500
-
-        try:
-            final = VideoFileClip(output_temp).with_audio(VideoFileClip(cleaned_path).audio)
-            final.write_videofile(final_path, codec="libx264", audio_codec="aac")
-            final.close()
-        except Exception as e:
-            sentry_sdk.capture_exception(e)
-            sentry_sdk.capture_message("Finalize: Error during audio muxing", level="error")
-            return jsonify({"error": "Failed during audio muxing: " + str(e)}), 500
+            try:
+                # Single pass: decode once, overlay, encode with the source audio.
+                # The overlay is static, so it is drawn once into a precomposed layer.
+                layer = get_overlay_layer(
+                    info["width"], info["height"], _overlay,
+                    caption=caption, text_area=text_area, logo=user_logo_img, watermark=True,
+                )
+                render_stats = render_layer(source_path, final_path, layer, info=info, thumbnail_at=0.5)
+            except Exception as e:
+                sentry_sdk.capture_exception(e)
+                sentry_sdk.capture_message("Finalize: Error during video render", level="error")
+                return jsonify({"error": "Failed during video render: " + str(e)}), 500
 
-        # --- NEW: make a thumbnail JPEG from the final video
-        thumb_temp = NamedTemporaryFile(delete=False, suffix=".jpg").name
-        temp_files.append(thumb_temp)
-        try:
-            _make_thumbnail_from_video(final_path, thumb_temp, at_seconds=0.5)
-        except Exception as e:
-            sentry_sdk.capture_exception(e)
-            sentry_sdk.capture_message("Finalize: Failed to create thumbnail", level="warning")
-            thumb_temp = None  # continue without a thumbnail
+            # Thumbnail JPEG: captured by the renderer; re-decode the final video only if it did not
+            thumb_temp = NamedTemporaryFile(delete=False, suffix=".jpg").name
+            temp_files.append(thumb_temp)
+            try:
+                thumb_jpeg = render_stats.get("thumbnails", {}).get("jpeg")
+                if thumb_jpeg:
+                    with open(thumb_temp, "wb") as f:
+                        f.write(thumb_jpeg)
+                else:
+                    _make_thumbnail_from_video(final_path, thumb_temp, at_seconds=0.5)
+            except Exception as e:
+                sentry_sdk.capture_exception(e)
+                sentry_sdk.capture_message("Finalize: Failed to create thumbnail", level="warning")
+                thumb_temp = None  # continue without a thumbnail
 
-        # Prepare blob names
-        reel_id = str(ObjectId())
-        blob_name = f"instagram_reels/reel_{reel_id}_option_1{ext}"
-        blob_original = f"instagram_reels/reel_{reel_id}_original{ext}"
-        blob_thumb = f"instagram_reels/reel_{reel_id}.jpg"  # thumbnail sits next to videos
+            # Upload to cloud
+            try:
+                upload_video_to_gcloud(final_path, blob_name)
+                upload_video_to_gcloud(original_path, blob_original)
+                if thumb_temp:
+                    upload_video_to_gcloud(thumb_temp, blob_thumb)
+            except Exception as e:
+                sentry_sdk.capture_exception(e)
+                sentry_sdk.capture_message("Finalize: Failed to upload video to GCloud", level="error")
+                return jsonify({"error": "Failed to upload video to cloud: " + str(e)}), 500
 
-        # Upload to cloud
-        try:
-            upload_video_to_gcloud(final_path, blob_name)
-            upload_video_to_gcloud(original_path, blob_original)
-            if thumb_temp:
-                upload_video_to_gcloud(thumb_temp, blob_thumb)
-        except Exception as e:
-            sentry_sdk.capture_exception(e)
-            sentry_sdk.capture_message("Finalize: Failed to upload video to GCloud", level="error")
-            return jsonify({"error": "Failed to upload video to cloud: " + str(e)}), 500
+            render_cache.put(
+                cache_key, text_area,
+                video_path=final_path, thumb_path=thumb_temp,
+                blob=blob_name, thumb_blob=blob_thumb if thumb_temp else None,
+            )
+            has_thumb = bool(thumb_temp)
 
         host = _canonical_host()
         # Resolve public URLs (prefer signed GCS; fall back to /memes/media)
         final_video_url = _best_public_url(blob_name, host)
         original_video_url = _best_public_url(blob_original, host)
-        thumbnail_url = _best_public_url(blob_thumb, host) if thumb_temp else None
+        thumbnail_url = _best_public_url(blob_thumb, host) if has_thumb else None
 
         # --- create reel with ig_id awareness + new URLs
         try:
@@ -500,6 +526,7 @@ def finalize_video():
         })
 
     finally:
+        release_pin(source_path)
         for path in temp_files:
             try:
                 if os.path.exists(path):
@@ -550,40 +577,31 @@ def process_video(input_path, output_path):
 
 
 
-def detect_text_area(frames, num_frames=10, debug_output_path=None):
+def detect_text_area(frames, num_frames=10, debug_output_path=None, source_size=None):
     """
     Text detector with EasyOCR (if available) or pytesseract fallback.
+    Pass `source_size` = (width, height) when the frames were downscaled
+    (see core.frame_sampler); the result is always in source pixels.
     Returns (x, y, w, h) for mask area.
     """
     if not frames:
         return None
 
-    frame_height, frame_width = frames[0].shape[:2]
+    sample_height, sample_width = frames[0].shape[:2]
+    frame_width, frame_height = source_size or (sample_width, sample_height)
+    scale = sample_height / frame_height
     boxes_detected = False  # Track if text was detected (for debug output)
 
-    # Try EasyOCR first if available
-    reader = _get_easyocr_reader()
-    if reader is not None:
-        # Use EasyOCR detection
-        num_frames_to_sample = min(12, len(frames))
-        sample_indices = list(range(min(num_frames_to_sample, len(frames))))
+    # Try EasyOCR first if available (one batched call to the node's OCR server)
+    easyocr_boxes = detect_text_boxes(frames[:12])
+    if easyocr_boxes is not None:
         y_max = 0
         boxes_detected = False
 
-        for frame_idx in sample_indices:
-            frame = frames[frame_idx]
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            try:
-                results = reader.detect(frame_rgb)
-                if results and results[0]:
-                    boxes_detected = True
-                    for box in results[0]:
-                        y_coords = [point[1] for point in box]
-                        bottom_y = max(y_coords)
-                        y_max = max(y_max, bottom_y)
-            except Exception as e:
-                print(f"[EasyOCR] Detection error on frame {frame_idx}: {e}")
-                continue
+        for boxes in easyocr_boxes:
+            for x0, y0, x1, y1 in boxes:
+                boxes_detected = True
+                y_max = max(y_max, y1 / scale)
 
         if boxes_detected:
             padding = 120
@@ -600,34 +618,20 @@ def detect_text_area(frames, num_frames=10, debug_output_path=None):
 
         for idx in sample_indices:
             gray = cv2.cvtColor(frames[int(idx)], cv2.COLOR_BGR2GRAY)
-            d = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+            d = image_to_data(gray)
             for j in range(len(d["text"])):
                 try:
                     if int(float(d["conf"][j])) > 10 and d["text"][j].strip():
                         x, y, w, h = d["left"][j], d["top"][j], d["width"][j], d["height"][j]
-                        y_max_ocr = max(y_max_ocr, y + h)
+                        y_max_ocr = max(y_max_ocr, (y + h) / scale)
                         ocr_detected_count += 1
                 except ValueError:
                     continue
 
         # Edge detection fallback
-        y_max_edges = 0
-        bottom_half_start = int(frame_height * 0.4)
-        gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        row_density = []
-        for y in range(bottom_half_start, frame_height):
-            density = np.sum(edges[y, :]) / frame_width
-            row_density.append((y, density))
-        if row_density:
-            row_density.sort(key=lambda x: x[1], reverse=True)
-            top_rows = row_density[:max(1, len(row_density) // 10)]
-            if top_rows and top_rows[0][1] > 10:
-                for y, density in top_rows:
-                    if density > 10:
-                        y_max_edges = max(y_max_edges, y)
-
-        y_max_detected = max(y_max_ocr, y_max_edges)
+        y_max_edges = edge_text_bottom(frames[:EDGE_DENSITY_FRAMES]) / scale
+
+        y_max_detected = int(max(y_max_ocr, y_max_edges))
         expand_bottom = 100
         weak_detection_threshold = 5
         minimum_safe_coverage = int(frame_height * 0.80)
@@ -646,12 +650,13 @@ def detect_text_area(frames, num_frames=10, debug_output_path=None):
     if debug_output_path and len(frames) > 0:
         debug_frame = frames[0].copy()
         # Draw bright green line at mask_end
-        cv2.line(debug_frame, (0, mask_end), (frame_width, mask_end), (0, 255, 0), 3)
+        line_y = int(mask_end * scale)
+        cv2.line(debug_frame, (0, line_y), (sample_width, line_y), (0, 255, 0), 3)
         # Draw text showing coverage
         coverage_pct = (mask_end / frame_height) * 100
         status = "Detected" if boxes_detected else "Fallback"
         cv2.putText(debug_frame, f"{status}: {mask_end}px ({coverage_pct:.1f}%)",
-                    (10, mask_end - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                    (10, line_y - 10), cv2.FONT_HERSHEY_SIMPLEX,
                     1.0, (0, 255, 0), 2, cv2.LINE_AA)
         cv2.imwrite(debug_output_path, debug_frame)
         print(f"[DEBUG] Saved debug frame to: {debug_output_path}")
@@ -1,7 +1,16 @@
 ﻿from flask import Blueprint, jsonify, request
 from werkzeug.exceptions import BadRequest
 
+from core.analysis_proxy import analysis_proxy_stats
+from core.compute_budget import compute_budget_stats
 from core.converting import convert_objectId_to_str
+from core.detection_store import detection_store_stats
+from core.easyocr_detector import ocr_server_stats
+from core.gemini_clients import gemini_client_stats
+from core.gemini_media import gemini_media_stats
+from core.ingest import ingest_stats
+from core.render_cache import render_cache_stats
+from core.summary_store import summary_store_stats
 from database import db
 from models.platform import PlatformCreate
 
@@ -35,4 +44,49 @@ def create_platform():
             }
         )
 
-    return BadRequest("Platform creation failed")
\ No newline at end of file
+    return BadRequest("Platform creation failed")
+
+@infrastructure_bp.route("/render-cache", methods=["GET"])
+def get_render_cache_stats():
+    # Counters are per worker process (see "pid")
+    return jsonify(render_cache_stats())
+
+@infrastructure_bp.route("/detection-store", methods=["GET"])
+def get_detection_store_stats():
+    # Counters are per worker process (see "pid")
+    return jsonify(detection_store_stats())
+
+@infrastructure_bp.route("/summary-store", methods=["GET"])
+def get_summary_store_stats():
+    # Counters are per worker process (see "pid")
+    return jsonify(summary_store_stats())
+
+@infrastructure_bp.route("/ocr-server", methods=["GET"])
+def get_ocr_server_stats():
+    # Batch counts and latencies of the node-wide EasyOCR server
+    return jsonify(ocr_server_stats())
+
+@infrastructure_bp.route("/ingest", methods=["GET"])
+def get_ingest_stats():
+    # Counters are per worker process (see "pid")
+    return jsonify(ingest_stats())
+
+@infrastructure_bp.route("/compute-budget", methods=["GET"])
+def get_compute_budget_stats():
+    # Slot usage is node-wide ("busy_slots_node"); counters are per worker process
+    return jsonify(compute_budget_stats())
+
+@infrastructure_bp.route("/gemini-clients", methods=["GET"])
+def get_gemini_client_stats():
+    # Clients and token refreshes are per worker process (see "pid")
+    return jsonify(gemini_client_stats())
+
+@infrastructure_bp.route("/gemini-media", methods=["GET"])
+def get_gemini_media_stats():
+    # How video parts were sent (URI / staged / inline); per worker process (see "pid")
+    return jsonify(gemini_media_stats())
+
+@infrastructure_bp.route("/analysis-proxy", methods=["GET"])
+def get_analysis_proxy_stats():
+    # Counters are per worker process (see "pid")
+    return jsonify(analysis_proxy_stats())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark the vectorized edge-density fallback against the original
+per-row loop and check that both give the same text bottom.
+Usage:
+    python bench_edge_density.py [video_path] [--frames N] [--repeat R] [--size WxH]
+
+With a video path the frames come from core.frame_sampler (as in detect_text_area);
+without one, synthetic frames with captions and noise are generated.
+Prints a JSON report; exits with status 1 if any result differs.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Add the parent directory to sys.path so we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.edge_density import edge_text_bottom
+
+
+def reference_bottom(frame) -> float:
+    """The loop detect_text_area used before core.edge_density (first frame only)."""
+    sample_height, sample_width = frame.shape[:2]
+    y_max_edges = 0
+    bottom_half_start = int(sample_height * 0.4)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 50, 150)
+    row_density = []
+    for y in range(bottom_half_start, sample_height):
+        density = np.sum(edges[y, :]) / sample_width
+        row_density.append((y, density))
+    if row_density:
+        row_density.sort(key=lambda x: x[1], reverse=True)
+        top_rows = row_density[:max(1, len(row_density) // 10)]
+        if top_rows and top_rows[0][1] > 10:
+            for y, density in top_rows:
+                if density > 10:
+                    y_max_edges = max(y_max_edges, y)
+    return y_max_edges
+
+
+def synthetic_frames(count: int, width: int, height: int) -> list:
+    rng = np.random.default_rng(7)
+    frames = []
+    for i in range(count):
+        frame = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+        cv2.GaussianBlur(frame, (9, 9), 0, dst=frame)
+        y = int(height * (0.45 + 0.05 * (i % 5)))
+        cv2.putText(frame, "SUBTITLE LINE %d" % i, (20, y), cv2.FONT_HERSHEY_SIMPLEX,
+                    width / 600, (255, 255, 255), 3, cv2.LINE_AA)
+        frames.append(frame)
+    return frames
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?")
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--size", default="720x1280")
+    args = parser.parse_args()
+
+    if args.video:
+        from core.ffmpeg_io import probe_video
+        from core.frame_sampler import leading_sample_times, sample_frames
+
+        info = probe_video(args.video)
+        frames, _ = sample_frames(args.video, leading_sample_times(info, args.frames), info=info)
+    else:
+        width, height = (int(v) for v in args.size.split("x"))
+        frames = synthetic_frames(args.frames, width, height)
+
+    mismatches = [
+        i for i, frame in enumerate(frames)
+        if reference_bottom(frame) != edge_text_bottom([frame], downscale=1)
+    ]
+    loop_s = timed(lambda: [reference_bottom(f) for f in frames], args.repeat)
+    vector_s = timed(lambda: edge_text_bottom(frames, downscale=1), args.repeat)
+
+    report = {
+        "frames": len(frames),
+        "size": f"{frames[0].shape[1]}x{frames[0].shape[0]}" if frames else None,
+        "loop_ms_per_frame": round(loop_s * 1000 / max(len(frames), 1), 3),
+        "vectorized_ms_per_frame": round(vector_s * 1000 / max(len(frames), 1), 3),
+        "speedup": round(loop_s / vector_s, 2) if vector_s else None,
+        "mismatched_frames": mismatches,
+        "ok": not mismatches,
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark the segment-parallel renderer against the single-pass one.
+Usage:
+    python bench_parallel_render.py [video_path] [--max-workers N] [--seconds S] [--size WxH]
+
+Without a video path a synthetic clip (test pattern + tone, 2s GOP) is generated.
+Prints one JSON line per worker count with wall time, fps and speedup over 1 worker.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import cv2
+
+# Add the parent directory to sys.path so we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ffmpeg_io import FFMPEG_BIN, probe_video
+from core.overlay_layer import OverlayLayer
+from core.parallel_render import render_video_parallel
+from core.render_engine import render_video
+
+
+def make_clip(path: str, seconds: float, size: str, fps: int = 30):
+    subprocess.run([
+        FFMPEG_BIN, "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "veryfast", "-g", str(fps * 2),
+        "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path,
+    ], check=True)
+
+
+def make_layer(width: int, height: int) -> OverlayLayer:
+    def _draw(bgr):
+        cv2.rectangle(bgr, (0, 0), (width, height // 5), (255, 255, 255), -1)
+        cv2.putText(bgr, "When the benchmark finally scales", (20, height // 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, width / 900, (0, 0, 0), 2, cv2.LINE_AA)
+        cv2.putText(bgr, "publefy", (width - 160, height - 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 1, cv2.LINE_AA)
+        return bgr
+    return OverlayLayer.from_draw_fn(width, height, _draw)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--size", default="1080x1920")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_parallel_")
+    src = args.video
+    if not src:
+        src = os.path.join(work_dir, "source.mp4")
+        print(f"Generating {args.seconds:.0f}s {args.size} test clip...", file=sys.stderr)
+        make_clip(src, args.seconds, args.size)
+
+    info = probe_video(src)
+    layer = make_layer(info["width"], info["height"])
+    out = os.path.join(work_dir, "out.mp4")
+
+    counts = sorted({1, args.max_workers} | {2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers})
+    baseline = None
+    for workers in counts:
+        if workers == 1:
+            stats = render_video(src, out, layer.apply, info=info)
+        else:
+            stats = render_video_parallel(src, out, layer, info=info, workers=workers)
+        baseline = baseline or stats["seconds"]
+        print(json.dumps({
+            "workers": workers,
+            "segments": stats.get("segments", 1),
+            "frames": stats["frames"],
+            "seconds": round(stats["seconds"], 3),
+            "fps": round(stats["fps"], 1),
+            "speedup": round(baseline / stats["seconds"], 2),
+            "output_mb": round(os.path.getsize(out) / (1024 * 1024), 2),
+        }))
+
+    os.remove(out)
+
+
+if __name__ == "__main__":
+    main()
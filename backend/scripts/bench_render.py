@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the finalize / bank render path on generated clips.
+Usage:
+    python bench_render.py [--path finalize|bank] [--sizes 720p,1080p,4k] [--durations 15,60,90]
+                           [--clips-dir DIR] [--no-isolate] [--keep-output]
+
+For every size x duration a test clip (moving test pattern, white caption band,
+sine audio) is generated once (cached in --clips-dir) and pushed through the
+same stage functions the route uses: probe, text detection, overlay layer,
+render (decode -> overlay -> encode -> mux, whichever backend render_layer
+picks, with the thumbnail captured in-stream) and thumbnail write. Mongo is replaced by an in-memory stub and nothing is
+uploaded to GCS; the detection store and render cache are disabled so every
+run does the full work.
+
+With isolation on (default) decode, encode and mux are also timed on their own:
+    decode  ffmpeg decode of the video stream to a null sink
+    encode  video-only transcode with the production x264 settings, minus decode
+    mux     remux of the encoded video with the source audio
+and the per-frame overlay cost is measured on decoded frames.
+
+Each configuration runs in its own process so peak RSS is per run: ours from
+getrusage, the ffmpeg children's (summed) sampled with psutil every 100 ms
+during the pipeline. Prints one JSON line per configuration.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+# Add the parent directory to sys.path so we can import from core
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+SIZES = {"720p": (720, 1280), "1080p": (1080, 1920), "4k": (2160, 3840)}
+CAPTION = "When the benchmark finally gives you a number to beat"
+
+
+# ---- clips ---------------------------------------------------------------------
+
+def make_clip(path: str, width: int, height: int, seconds: float, fps: int = 30):
+    from core.ffmpeg_io import FFMPEG_BIN
+
+    band = height // 6
+    subprocess.run([
+        FFMPEG_BIN, "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-vf", f"drawbox=x=0:y=0:w={width}:h={band}:color=white:t=fill,"
+               f"drawbox=x={width // 10}:y={band // 3}:w={width * 8 // 10}:h={band // 4}:color=black:t=fill",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-g", str(fps * 2),
+        "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "128k", "-shortest", path,
+    ], check=True)
+
+
+# ---- stubs ---------------------------------------------------------------------
+
+class _StubCollection:
+    def __getattr__(self, name):
+        def _noop(*args, **kwargs):
+            return None
+        return _noop
+
+    def find(self, *args, **kwargs):
+        return []
+
+
+class _StubDb:
+    def __getattr__(self, name):
+        return _StubCollection()
+
+    def __getitem__(self, name):
+        return _StubCollection()
+
+
+def _install_stubs():
+    """In-memory Mongo, no GCS, no caches: every run renders from scratch."""
+    database = types.ModuleType("database")
+    database.db = _StubDb()
+    database.client = None
+    sys.modules["database"] = database
+    os.environ["VIDEO_BUCKET_NAME"] = ""
+    os.environ["DETECTION_STORE_ENABLED"] = "false"
+    os.environ["RENDER_CACHE_ENABLED"] = "false"
+
+
+# ---- pipelines -----------------------------------------------------------------
+
+def _finalize_stages():
+    import cv2
+    from routes import finalize_route as route
+    from core.frame_sampler import detection_sample_times, sample_frames
+
+    def detect(src, info):
+        frames, _ = sample_frames(src, detection_sample_times(src, info), info=info)
+        area = route.detect_text_area(frames, source_size=(info["width"], info["height"]))
+        return area or (0, 0, info["width"], int(info["height"] * 0.40))
+
+    def draw_fn(text_area):
+        x, y, w, h = text_area
+
+        def _overlay(bgr):
+            cv2.rectangle(bgr, (x, y), (x + w, y + h), (0, 0, 0), -1)
+            overlayed = route.overlay_text_on_frame(bgr, CAPTION, text_area, color=(255, 255, 255))
+            return route.add_copyright_watermark(overlayed)
+        return _overlay
+
+    return detect, draw_fn, lambda video, out: route._make_thumbnail_from_video(video, out, at_seconds=0.5)
+
+
+def _bank_stages():
+    import cv2
+    from routes import bank_memes_route as route
+    from core.frame_sampler import sample_frames
+
+    def detect(src, info):
+        frames, _ = sample_frames(src, [0.0], info=info)
+        size = (info["width"], info["height"])
+        return route._detect_text_area(frames[0], source_size=size) or \
+            route._get_top_overlay_area(size, percent_min=0.20, percent_max=0.25)
+
+    def draw_fn(text_area):
+        x, y, w, h = text_area
+
+        def _overlay(bgr):
+            cv2.rectangle(bgr, (x, y), (x + w, y + h), (0, 0, 0), -1)
+            overlayed = route._overlay_text_on_frame(bgr, CAPTION, text_area, color=(255, 255, 255))
+            return route._add_copyright_watermark(overlayed)
+        return _overlay
+
+    return detect, draw_fn, lambda video, out: route._make_thumb_from_video(video, out, at_seconds=0.5)
+
+
+# ---- isolated stages -----------------------------------------------------------
+
+def _timed_ffmpeg(args: list) -> float:
+    from core.ffmpeg_io import FFMPEG_BIN
+
+    started = time.perf_counter()
+    subprocess.run([FFMPEG_BIN, "-y", "-v", "error", "-nostdin"] + args, check=True)
+    return time.perf_counter() - started
+
+
+def isolated_stages(src: str, info: dict, layer, work_dir: str) -> dict:
+    from core.ffmpeg_io import EVEN_PAD_FILTER, FrameReader, audio_args, x264_args
+
+    decode = _timed_ffmpeg(["-i", src, "-map", "0:v:0", "-f", "null", "-"])
+    video_only = os.path.join(work_dir, "video_only.mp4")
+    transcode = _timed_ffmpeg(["-i", src, "-map", "0:v:0", "-vf", EVEN_PAD_FILTER] + x264_args() + [video_only])
+    stages = {"decode": decode, "encode": max(0.0, transcode - decode)}
+
+    if info.get("has_audio"):
+        muxed = os.path.join(work_dir, "muxed.mp4")
+        stages["mux"] = _timed_ffmpeg([
+            "-i", video_only, "-i", src, "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy",
+        ] + audio_args(info.get("audio_codec")) + ["-movflags", "+faststart", muxed])
+        os.remove(muxed)
+    os.remove(video_only)
+
+    # Overlay cost per frame, measured on up to 90 decoded frames
+    applied, spent = 0, 0.0
+    with FrameReader(src, info["width"], info["height"], frames=90) as reader:
+        for frame in reader:
+            started = time.perf_counter()
+            layer.apply(frame)
+            spent += time.perf_counter() - started
+            applied += 1
+    per_frame = spent / applied if applied else 0.0
+    stages["overlay_ms_per_frame"] = per_frame * 1000
+    stages["overlay"] = per_frame * (info.get("nb_frames") or applied)
+    return stages
+
+
+class RssSampler:
+    """
+    Background sampler of peak child-process RSS (the ffmpeg decoders/encoders).
+    getrusage(RUSAGE_CHILDREN) is no use here: fork+exec carries our own
+    high-water mark into every child.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        import threading
+
+        self.interval = interval
+        self.peak_children_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            import psutil
+        except ImportError:
+            return
+        me = psutil.Process()
+        while not self._stop.is_set():
+            total = 0
+            for child in me.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.peak_children_mb = max(self.peak_children_mb, total / (1024 * 1024))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# ---- one configuration ---------------------------------------------------------
+
+def run_one(path: str, src: str, isolate: bool, keep_output: bool) -> dict:
+    _install_stubs()
+    from core.ffmpeg_io import probe_video
+    from core.overlay_layer import OverlayLayer
+    from core.render_engine import render_layer
+
+    detect, draw_fn, thumbnail = _finalize_stages() if path == "finalize" else _bank_stages()
+    work_dir = tempfile.mkdtemp(prefix="bench_render_")
+    out = os.path.join(work_dir, "final.mp4")
+    thumb = os.path.join(work_dir, "thumb.jpg")
+    stages = {}
+
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        t = time.perf_counter()
+        info = probe_video(src)
+        stages["probe"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        text_area = detect(src, info)
+        stages["detect"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        layer = OverlayLayer.from_draw_fn(info["width"], info["height"], draw_fn(text_area))
+        stages["overlay_build"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        render_stats = render_layer(src, out, layer, info=info, thumbnail_at=0.5)
+        stages["render"] = time.perf_counter() - t
+
+        # same as the routes: captured JPEG, or re-decode the output when missing
+        t = time.perf_counter()
+        thumb_jpeg = render_stats.get("thumbnails", {}).get("jpeg")
+        if thumb_jpeg:
+            with open(thumb, "wb") as f:
+                f.write(thumb_jpeg)
+        else:
+            thumbnail(out, thumb)
+        stages["thumbnail"] = time.perf_counter() - t
+        total = time.perf_counter() - started
+
+    if isolate:
+        stages.update(isolated_stages(src, info, layer, work_dir))
+
+    frames = info.get("nb_frames") or render_stats.get("frames") or 0
+    result = {
+        "path": path,
+        "size": f"{info['width']}x{info['height']}",
+        "duration_s": round(info.get("duration") or 0.0, 2),
+        "frames": frames,
+        "total_s": round(total, 3),
+        "render_fps": round(frames / stages["render"], 1) if stages["render"] else 0.0,
+        "end_to_end_fps": round(frames / total, 1) if total else 0.0,
+        "stages_s": {k: round(v, 3) for k, v in stages.items()},
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_ffmpeg_rss_mb": round(sampler.peak_children_mb, 1),
+        "output_mb": round(os.path.getsize(out) / (1024 * 1024), 2),
+        "thumbnail_captured": bool(thumb_jpeg),
+        "text_area": [int(v) for v in text_area],
+    }
+    if keep_output:
+        result["output"] = out
+    else:
+        for p in (out, thumb):
+            if os.path.exists(p):
+                os.remove(p)
+        os.rmdir(work_dir)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", choices=["finalize", "bank"], default="finalize")
+    parser.add_argument("--sizes", default="720p,1080p,4k")
+    parser.add_argument("--durations", default="15,60,90")
+    parser.add_argument("--clips-dir", default=os.path.join(tempfile.gettempdir(), "publefy_bench_clips"))
+    parser.add_argument("--no-isolate", action="store_true", help="skip the isolated decode/encode/mux/overlay timings")
+    parser.add_argument("--keep-output", action="store_true")
+    parser.add_argument("--run", help=argparse.SUPPRESS)  # internal: one configuration, in a child process
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_one(args.path, args.run, not args.no_isolate, args.keep_output)))
+        return
+
+    os.makedirs(args.clips_dir, exist_ok=True)
+    for size in [s.strip().lower() for s in args.sizes.split(",") if s.strip()]:
+        width, height = SIZES[size]
+        for seconds in [float(d) for d in args.durations.split(",") if d.strip()]:
+            clip = os.path.join(args.clips_dir, f"clip_{size}_{seconds:g}s.mp4")
+            if not os.path.exists(clip):
+                print(f"Generating {size} {seconds:g}s clip...", file=sys.stderr)
+                make_clip(clip + ".part.mp4", width, height, seconds)
+                os.replace(clip + ".part.mp4", clip)
+
+            cmd = [sys.executable, os.path.abspath(__file__), "--path", args.path, "--run", clip]
+            if args.no_isolate:
+                cmd.append("--no-isolate")
+            if args.keep_output:
+                cmd.append("--keep-output")
+            proc = subprocess.run(cmd, stdout=subprocess.PIPE, cwd=BACKEND_DIR)
+            lines = proc.stdout.decode(errors="ignore").strip().splitlines()
+            if proc.returncode != 0 or not lines:
+                print(json.dumps({"path": args.path, "size": size, "duration_s": seconds, "error": f"exit {proc.returncode}"}))
+                continue
+            print(lines[-1], flush=True)
+
+
+if __name__ == "__main__":
+    main()
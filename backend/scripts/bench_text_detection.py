@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Accuracy/speed benchmark for the text-area detectors on labeled synthetic reels.
+Usage:
+    python bench_text_detection.py [--count N] [--size WxH] [--seed S] [--keep DIR] [--details]
+
+Generates short reels (solid, gradient or noise backgrounds with captions burned
+in at known positions, drawn with core/fonts/arial.ttf), decodes them the way
+production does (core.frame_sampler) and runs every detector backend:
+
+    tesseract        core.ocr_engine (tesserocr in-process or pytesseract)
+    easyocr          core.easyocr_detector (skipped when EasyOCR is not installed)
+    edge_density     core.edge_density
+    detect_text_area the full finalize/process detector (core.video_processor)
+    bank             the single-frame bank detector (routes.bank_memes_route)
+
+Each backend is scored by the full-width area from the top of the frame down to
+the bottom it reports: IoU against the ground-truth caption area, and whether
+that area covers the caption at all. Prints one JSON document; compare runs by
+diffing the "backends" section.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Add the parent directory to sys.path so we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ffmpeg_io import FFMPEG_BIN
+from core.frame_sampler import detection_sample_times, sample_frames
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "core", "fonts", "arial.ttf")
+
+WORDS = (
+    "when the monday meeting could have been an email me explaining my code "
+    "to the rubber duck nobody pov you finally fixed the bug at 3am that one "
+    "friend who always says five more minutes my brain during the exam"
+).split()
+
+
+# ---- fixtures ------------------------------------------------------------------
+
+def _background(rng: random.Random, width: int, height: int) -> tuple[np.ndarray, str]:
+    kind = rng.choice(["solid", "gradient", "noise"])
+    if kind == "solid":
+        color = [rng.randint(0, 255) for _ in range(3)]
+        return np.full((height, width, 3), color, np.uint8), kind
+    if kind == "gradient":
+        top = np.array([rng.randint(0, 255) for _ in range(3)], np.float32)
+        bottom = np.array([rng.randint(0, 255) for _ in range(3)], np.float32)
+        ramp = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+        return np.broadcast_to(top + (bottom - top) * ramp, (height, width, 3)).astype(np.uint8), kind
+    noise = np.random.default_rng(rng.randint(0, 2**31)).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), 3), kind
+
+
+def make_fixture(rng: random.Random, width: int, height: int) -> tuple[np.ndarray, dict]:
+    """One labeled frame: a caption band or bare caption text in the top half."""
+    frame, background = _background(rng, width, height)
+    style = rng.choice(["band", "text"])
+    lines = [" ".join(rng.sample(WORDS, rng.randint(2, 4))).upper() for _ in range(rng.randint(1, 3))]
+    font = ImageFont.truetype(FONT_PATH, max(12, int(width * rng.uniform(0.045, 0.07))))
+
+    image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(image)
+    line_boxes = [draw.textbbox((0, 0), line, font=font) for line in lines]
+    line_height = max(b[3] - b[1] for b in line_boxes)
+    spacing = int(line_height * 0.35)
+    text_height = len(lines) * line_height + (len(lines) - 1) * spacing
+
+    top = rng.randint(int(height * 0.04), int(height * 0.30))
+    if style == "band":
+        pad = int(line_height * 0.6)
+        draw.rectangle([0, 0, width, top + text_height + pad], fill=(255, 255, 255))
+        fill, stroke = (0, 0, 0), 0
+    else:
+        fill, stroke = (255, 255, 255), max(1, line_height // 12)
+
+    text_bottom = 0
+    y = top
+    for line, box in zip(lines, line_boxes):
+        x = (width - (box[2] - box[0])) // 2
+        draw.text((x, y - box[1]), line, font=font, fill=fill, stroke_width=stroke, stroke_fill=(0, 0, 0))
+        text_bottom = max(text_bottom, draw.textbbox((x, y - box[1]), line, font=font, stroke_width=stroke)[3])
+        y += line_height + spacing
+
+    label = {
+        "background": background,
+        "style": style,
+        "lines": lines,
+        "text_top": top,
+        "text_bottom": int(text_bottom),
+        # ground truth: full-width area from the top of the frame to the caption bottom
+        "area": [0, 0, width, int(text_bottom)],
+    }
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR), label
+
+
+def write_reel(frame: np.ndarray, path: str, seconds: float = 2.0, fps: int = 30) -> dict:
+    """Encode `frame` as a still reel; returns the probe_video()-style info of what was written."""
+    png = path[:-4] + ".png"
+    cv2.imwrite(png, frame)
+    subprocess.run([
+        FFMPEG_BIN, "-y", "-v", "error", "-loop", "1", "-framerate", str(fps), "-i", png,
+        "-t", f"{seconds}", "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", path,
+    ], check=True)
+    height, width = frame.shape[:2]
+    return {
+        "width": width, "height": height, "fps": float(fps), "duration": seconds,
+        "start_time": 0.0, "nb_frames": int(seconds * fps), "rotation": 0,
+        "video_codec": "h264", "audio_codec": None, "has_audio": False,
+    }
+
+
+# ---- scoring -------------------------------------------------------------------
+
+def iou_from_bottoms(pred_bottom: float | None, true_bottom: float) -> float:
+    """IoU of two full-width, top-anchored areas, reduced to their heights."""
+    if not pred_bottom or pred_bottom <= 0:
+        return 0.0
+    return min(pred_bottom, true_bottom) / max(pred_bottom, true_bottom)
+
+
+# ---- backends ------------------------------------------------------------------
+# Each returns the detected text bottom in source pixels (or None) for one reel.
+
+def _tesseract(sample):
+    from core.ocr_engine import image_to_data
+
+    gray = cv2.cvtColor(sample["frames"][0], cv2.COLOR_BGR2GRAY)
+    d = image_to_data(gray)
+    bottom = 0
+    for j in range(len(d["text"])):
+        try:
+            if int(float(d["conf"][j])) > 10 and d["text"][j].strip():
+                bottom = max(bottom, d["top"][j] + d["height"][j])
+        except ValueError:
+            continue
+    return bottom / sample["scale"] if bottom else None
+
+
+def _easyocr(sample):
+    from core.easyocr_detector import detect_text_boxes
+
+    boxes = detect_text_boxes(sample["frames"][:1])
+    if boxes is None:
+        raise RuntimeError("EasyOCR not installed")
+    bottom = max((y1 for x0, y0, x1, y1 in boxes[0]), default=0)
+    return bottom / sample["scale"] if bottom else None
+
+
+def _edge_density(sample):
+    from core.edge_density import edge_text_bottom
+
+    bottom = edge_text_bottom(sample["frames"][:1])
+    return bottom / sample["scale"] if bottom else None
+
+
+def _detect_text_area(sample):
+    from core.video_processor import detect_text_area
+
+    frames, _ = sample_frames(sample["path"], detection_sample_times(sample["path"], sample["info"]), info=sample["info"])
+    area = detect_text_area(frames, source_size=(sample["info"]["width"], sample["info"]["height"]))
+    return area[1] + area[3] if area else None
+
+
+def _bank(sample):
+    from routes.bank_memes_route import _detect_text_area as bank_detect
+
+    area = bank_detect(sample["frames"][0], source_size=(sample["info"]["width"], sample["info"]["height"]))
+    return area[1] + area[3] if area else None
+
+
+BACKENDS = {
+    "tesseract": _tesseract,
+    "easyocr": _easyocr,
+    "edge_density": _edge_density,
+    "detect_text_area": _detect_text_area,
+    "bank": _bank,
+}
+
+
+def run_backend(name: str, fn, samples: list, details: bool) -> dict:
+    latencies, ious, covered, per_fixture = [], [], 0, []
+    try:
+        fn(samples[0])  # untimed warm-up: engine/model loading is not per-frame cost
+    except Exception as e:  # missing optional dependency, import failure, ...
+        return {"available": False, "error": f"{type(e).__name__}: {e}"}
+
+    for sample in samples:
+        started = time.perf_counter()
+        try:
+            bottom = fn(sample)
+        except Exception as e:
+            return {"available": False, "error": f"{type(e).__name__}: {e}"}
+        elapsed = time.perf_counter() - started
+        true_bottom = sample["label"]["text_bottom"]
+        iou = iou_from_bottoms(bottom, true_bottom)
+        latencies.append(elapsed)
+        ious.append(iou)
+        covered += bool(bottom and bottom >= true_bottom)
+        if details:
+            per_fixture.append({
+                "fixture": sample["name"],
+                "pred_bottom": round(bottom, 1) if bottom else None,
+                "true_bottom": true_bottom,
+                "iou": round(iou, 3),
+                "ms": round(elapsed * 1000, 2),
+            })
+
+    ms = np.array(latencies) * 1000
+    report = {
+        "available": True,
+        "fixtures": len(samples),
+        "total_ms": round(float(ms.sum()), 1),
+        "per_frame_ms_mean": round(float(ms.mean()), 2),
+        "per_frame_ms_p95": round(float(np.percentile(ms, 95)), 2),
+        "mean_iou": round(float(np.mean(ious)), 4),
+        "covered_rate": round(covered / len(samples), 4),
+    }
+    if details:
+        report["per_fixture"] = per_fixture
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--size", default="720x1280")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated subset of " + ", ".join(BACKENDS))
+    parser.add_argument("--keep", help="write the reels and labels.json to this directory")
+    parser.add_argument("--details", action="store_true", help="include per-fixture results")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    rng = random.Random(args.seed)
+    work_dir = args.keep or tempfile.mkdtemp(prefix="bench_text_detection_")
+    os.makedirs(work_dir, exist_ok=True)
+
+    samples, labels = [], {}
+    for i in range(args.count):
+        frame, label = make_fixture(rng, width, height)
+        name = f"reel_{i:03d}"
+        path = os.path.join(work_dir, name + ".mp4")
+        info = write_reel(frame, path)
+        frames, scale = sample_frames(path, [0.0], info=info)
+        samples.append({"name": name, "path": path, "info": info, "frames": frames, "scale": scale, "label": label})
+        labels[name] = label
+
+    if args.keep:
+        with open(os.path.join(work_dir, "labels.json"), "w") as f:
+            json.dump(labels, f, indent=2)
+
+    results = {}
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = run_backend(name, BACKENDS[name], samples, args.details)
+
+    print(json.dumps({
+        "config": {"count": args.count, "size": args.size, "seed": args.seed},
+        "backends": results,
+    }, indent=2))
+
+    if not args.keep:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
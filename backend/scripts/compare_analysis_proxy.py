@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Summarize a sample set with Gemini twice, from the original clip and from its
+analysis proxy, and report upload size, input tokens, latency and the two
+summaries side by side.
+Usage:
+    python compare_analysis_proxy.py <video> [<video> ...] [--model NAME] [--out report.jsonl]
+
+Uses the /video/analyze prompt and generation settings; the proxy run also
+requests ANALYSIS_MEDIA_RESOLUTION, like the summarizers do. Needs Gemini
+credentials (ADC). Mongo is not touched and the summary store is bypassed, so
+every clip costs two real Gemini calls.
+
+Prints one JSON line per clip and a totals line. "similarity" is the word
+overlap (Jaccard) of the two summaries: a coarse flag for clips worth reading
+by hand, not a quality score.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import types
+
+# Add the parent directory to sys.path so we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _install_stubs():
+    """The analyze route imports the database module; nothing here writes to it."""
+    database = types.ModuleType("database")
+    database.db = None
+    database.client = None
+    sys.modules.setdefault("database", database)
+
+
+def _summarize(client, model: str, path: str, *, media_resolution=None) -> dict:
+    from google.genai import types as gtypes
+    from core.gemini_media import video_part
+    from routes.analyze_route import _SUMMARY_PROMPT
+
+    config = gtypes.GenerateContentConfig(
+        temperature=1,
+        top_p=0.95,
+        max_output_tokens=8192,
+        response_modalities=["TEXT"],
+        media_resolution=media_resolution,
+    )
+    started = time.perf_counter()
+    with video_part(path) as part:
+        response = client.models.generate_content(
+            model=model,
+            contents=[gtypes.Content(role="user", parts=[part, gtypes.Part.from_text(text=_SUMMARY_PROMPT)])],
+            config=config,
+        )
+    usage = response.usage_metadata
+    return {
+        "seconds": round(time.perf_counter() - started, 2),
+        "bytes": os.path.getsize(path),
+        "prompt_tokens": usage.prompt_token_count if usage else None,
+        "text": (response.text or "").replace("**", "").strip(),
+    }
+
+
+def _similarity(a: str, b: str) -> float:
+    words_a, words_b = set(re.findall(r"[a-z']+", a.lower())), set(re.findall(r"[a-z']+", b.lower()))
+    return round(len(words_a & words_b) / len(words_a | words_b), 3) if words_a | words_b else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--model", default=os.getenv("GEMINI_MODEL", "gemini-2.0-flash-001"))
+    parser.add_argument("--out", help="also append the JSON lines to this file")
+    args = parser.parse_args()
+
+    _install_stubs()
+    from core.analysis_proxy import ANALYSIS_MEDIA_RESOLUTION, analysis_proxy
+    from core.disk_lru import release_pin
+    from core.gemini_clients import get_client
+
+    client = get_client(os.getenv("GEMINI_PROJECT", "publefy-484406"), os.getenv("GEMINI_LOCATION_VIDEO", "us-central1"))
+    totals = {"clips": 0, "original_bytes": 0, "proxy_bytes": 0, "original_tokens": 0, "proxy_tokens": 0}
+    out = open(args.out, "a") if args.out else None
+
+    for path in args.videos:
+        started = time.perf_counter()
+        proxy = analysis_proxy(path)
+        proxy_seconds = round(time.perf_counter() - started, 2)
+        if not proxy:
+            print(json.dumps({"video": path, "error": "proxy could not be made"}))
+            continue
+
+        try:
+            original = _summarize(client, args.model, path)
+            reduced = _summarize(client, args.model, proxy, media_resolution=ANALYSIS_MEDIA_RESOLUTION)
+        finally:
+            release_pin(proxy)
+        line = {
+            "video": path,
+            "proxy_build_seconds": proxy_seconds,
+            "original": original,
+            "proxy": reduced,
+            "byte_ratio": round(reduced["bytes"] / original["bytes"], 4) if original["bytes"] else None,
+            "token_ratio": (
+                round(reduced["prompt_tokens"] / original["prompt_tokens"], 3)
+                if original["prompt_tokens"] and reduced["prompt_tokens"] else None
+            ),
+            "similarity": _similarity(original["text"], reduced["text"]),
+        }
+        print(json.dumps(line))
+        if out:
+            out.write(json.dumps(line) + "\n")
+
+        totals["clips"] += 1
+        totals["original_bytes"] += original["bytes"]
+        totals["proxy_bytes"] += reduced["bytes"]
+        totals["original_tokens"] += original["prompt_tokens"] or 0
+        totals["proxy_tokens"] += reduced["prompt_tokens"] or 0
+
+    if out:
+        out.close()
+    print(json.dumps({"totals": totals}))
+
+
+if __name__ == "__main__":
+    main()
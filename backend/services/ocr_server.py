@@ -0,0 +1,106 @@
+"""
+Node-wide EasyOCR model server.
+
+One process per node holds the EasyOCR model; gunicorn workers send it
+batches of RGB frames over a Unix socket (multiprocessing.connection) and get
+text boxes back, so the model is loaded once instead of once per worker.
+Started on demand by core.easyocr_detector.start_ocr_server(); an exclusive
+lock on <socket>.lock keeps a second copy from starting.
+
+Run manually with:
+    python -m services.ocr_server
+"""
+
+import fcntl
+import os
+import sys
+import threading
+import time
+from multiprocessing.connection import Listener
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.easyocr_detector import OCR_SERVER_SOCKET, _get_easyocr_reader, detect_batch, ocr_authkey
+
+_detect_lock = threading.Lock()  # one forward pass at a time; torch already uses every core
+_stats_lock = threading.Lock()
+_stats = {"batches": 0, "frames": 0, "errors": 0, "total_seconds": 0.0, "last_batch_seconds": 0.0}
+
+
+def _stats_snapshot() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_batch_seconds"] = round(stats["total_seconds"] / stats["batches"], 4) if stats["batches"] else 0.0
+    stats["total_seconds"] = round(stats["total_seconds"], 3)
+    stats["pid"] = os.getpid()
+    stats["ok"] = True
+    return stats
+
+
+def _handle(conn, reader):
+    try:
+        message = conn.recv()
+        op = message.get("op")
+        if op == "ping":
+            conn.send({"ok": True})
+        elif op == "stats":
+            conn.send(_stats_snapshot())
+        elif op == "detect":
+            frames = message.get("frames") or []
+            started = time.perf_counter()
+            try:
+                with _detect_lock:
+                    boxes = detect_batch(reader, frames)
+            except Exception as e:
+                with _stats_lock:
+                    _stats["errors"] += 1
+                conn.send({"ok": False, "error": str(e)})
+                return
+            elapsed = time.perf_counter() - started
+            with _stats_lock:
+                _stats["batches"] += 1
+                _stats["frames"] += len(frames)
+                _stats["total_seconds"] += elapsed
+                _stats["last_batch_seconds"] = elapsed
+            print(f"[ocr_server] batch of {len(frames)} frames in {elapsed * 1000:.0f}ms")
+            conn.send({"ok": True, "boxes": boxes, "seconds": elapsed})
+        else:
+            conn.send({"ok": False, "error": f"unknown op {op!r}"})
+    except (EOFError, OSError) as e:
+        print(f"[ocr_server] connection dropped: {e}")
+    finally:
+        conn.close()
+
+
+def main():
+    lock_file = open(OCR_SERVER_SOCKET + ".lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        print("[ocr_server] already running on this node")
+        return
+
+    started = time.perf_counter()
+    reader = _get_easyocr_reader()
+    if reader is None:
+        print("[ocr_server] EasyOCR not installed, exiting")
+        return
+    print(f"[ocr_server] model loaded in {time.perf_counter() - started:.1f}s")
+
+    # We hold the lock, so any existing socket file is left over from a dead server
+    if os.path.exists(OCR_SERVER_SOCKET):
+        os.remove(OCR_SERVER_SOCKET)
+    with Listener(OCR_SERVER_SOCKET, family="AF_UNIX", authkey=ocr_authkey()) as listener:
+        os.chmod(OCR_SERVER_SOCKET, 0o600)
+        print(f"[ocr_server] listening on {OCR_SERVER_SOCKET} (pid {os.getpid()})")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:  # failed auth handshake etc.
+                print(f"[ocr_server] accept failed: {e}")
+                continue
+            threading.Thread(target=_handle, args=(conn, reader), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,38 @@
 import os
-import threading
 
 from bson import ObjectId
 
 from core.data.video_service import upload_video_to_gcloud
+from core.disk_lru import release_pin
 from core.gemini_video_analyzer import summarize_video
+from core.ingest import ingest
 from core.video_processor import (
-    add_text_to_video,
+    add_texts_to_video,
     get_text_color_by_contrast,
     process_video,
 )
 from services.reel_service import create_reel
 
-final_video_paths = []
-
-
-def render_option(i, comment, reel_id, cleaned_path, text_area, text_color, ext):
-    global final_video_paths
-    option_path = f"outputs/reel_{reel_id}_option_{i+1}{ext}"
-    add_text_to_video(cleaned_path, option_path, text_area, comment, text_color)
-    final_video_paths.append(option_path)
-
 
 def remove_temp_file(path):
     if os.path.exists(path):
         os.remove(path)
 
 def process_reel_task(ext, reel_id):
-    global final_video_paths
     os.makedirs("uploads", exist_ok=True)
     os.makedirs("outputs", exist_ok=True)
 
     original_path = f"uploads/reel_{reel_id}_original{ext}"
-    cleaned_path = f"outputs/reel_{reel_id}_cleaned{ext}"
+    cleaned_path = f"outputs/reel_{reel_id}_cleaned.mp4"  # process_video writes MP4
 
-    text_area, background_color = process_video(original_path, cleaned_path)
+    # Every stage below reads the normalized mezzanine; the upload itself stays untouched
+    source = ingest(original_path)
+    try:
+        text_area, background_color = process_video(
+            source["path"], cleaned_path, info=source["info"], source_fp=source["source_fp"]
+        )
+    finally:
+        release_pin(source["path"])
     if text_area is None:
         create_reel(
             reel_id,
@@ -50,7 +48,8 @@ def process_reel_task(ext, reel_id):
         return
 
     text_color = get_text_color_by_contrast(background_color)
-    summary = summarize_video(cleaned_path)
+    # The cleaned clip is derived from the source, so its summary is stored under the source fingerprint
+    summary = summarize_video(cleaned_path, source_fp=f"cleaned:{source['source_fp']}")
     from core.gemini_funny_comment_generator import generate_meme_captions
     meme_options = generate_meme_captions(summary=summary, num_options=5, temperature=0.2)
 
@@ -68,22 +67,23 @@ def process_reel_task(ext, reel_id):
         )
         return
 
-    threads = []
-    for i, comment in enumerate(meme_options):
-        t = threading.Thread(
-            target=render_option,
-            args=(i, comment, reel_id, cleaned_path, text_area, text_color, ext),
-        )
-        threads.append(t)
-        t.start()
-
-    for t in threads:
-        t.join()
+    # One decode of the cleaned video feeds one encoder per meme option (always MP4)
+    outputs = [
+        (f"outputs/reel_{reel_id}_option_{i+1}.mp4", comment)
+        for i, comment in enumerate(meme_options)
+    ]
+    results = add_texts_to_video(cleaned_path, outputs, text_area, text_color)
+    final_video_paths = [r["path"] for r in results if r["ok"]]
 
     from database import db
-    for i, item_path in enumerate(final_video_paths):
+    for i, result in enumerate(results):
+        if not result["ok"]:
+            print(f"[ERROR] Rendering option {i+1} for reel {reel_id} failed: {result['error']}")
+            remove_temp_file(result["path"])
+            continue
 
-        blob_name = f"reel_{reel_id}_option_{i+1}{ext}"
+        item_path = result["path"]
+        blob_name = f"reel_{reel_id}_option_{i+1}.mp4"
 
         upload_video_to_gcloud(item_path, blob_name)
         create_reel(
@@ -100,7 +100,4 @@ def process_reel_task(ext, reel_id):
 
         remove_temp_file(item_path)
 
-
-    final_video_paths = []
-
-    return
\ No newline at end of file
+    return
@@ -0,0 +1,66 @@
+import pytest
+
+from core import analysis_proxy
+from core.analysis_proxy import (
+    AnalysisProxyCache,
+    _cache_key,
+    expected_variant,
+    input_variant,
+    proxy_size,
+    proxy_variant,
+)
+from core.summary_store import ORIGINAL_INPUT
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_ENABLED", True)
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_SHORT_SIDE", 360)
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_FPS", 1.0)
+
+
+def test_proxy_size_scales_the_short_side():
+    assert proxy_size({"width": 1080, "height": 1920}) == (360, 640)
+    assert proxy_size({"width": 1920, "height": 1080}) == (640, 360)
+
+
+def test_proxy_size_never_upscales_and_stays_even():
+    assert proxy_size({"width": 320, "height": 240}) == (320, 240)
+    width, height = proxy_size({"width": 1001, "height": 1999})
+    assert width % 2 == 0 and height % 2 == 0
+
+
+def test_cache_key_follows_source_and_settings(monkeypatch):
+    key = _cache_key("md5:a")
+    assert key == _cache_key("md5:a")
+    assert key != _cache_key("md5:b")
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_FPS", 2.0)
+    assert key != _cache_key("md5:a")
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_FPS", 1.0)
+    monkeypatch.setattr(analysis_proxy, "PROXY_VERSION", "next")
+    assert key != _cache_key("md5:a")
+
+
+def test_disabled_proxies_send_the_original(monkeypatch, tmp_path):
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_ENABLED", False)
+    assert AnalysisProxyCache(str(tmp_path)).get(str(tmp_path / "clip.mp4"), source_fp="md5:a") is None
+
+
+def test_input_variant_names_what_was_sent():
+    assert input_variant(None) == ORIGINAL_INPUT
+    assert input_variant("/tmp/pins/proxy.mp4") == proxy_variant() != ORIGINAL_INPUT
+    assert expected_variant() == proxy_variant()
+
+
+def test_proxy_variant_follows_settings_and_media_resolution(monkeypatch):
+    variant = proxy_variant()
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_SHORT_SIDE", 480)
+    assert proxy_variant() != variant
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_SHORT_SIDE", 360)
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_MEDIA_RESOLUTION", None)
+    assert proxy_variant() != variant
+
+
+def test_disabled_proxies_expect_the_original(monkeypatch):
+    monkeypatch.setattr(analysis_proxy, "ANALYSIS_PROXY_ENABLED", False)
+    assert expected_variant() == ORIGINAL_INPUT
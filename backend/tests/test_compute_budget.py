@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from core import compute_budget
+from core.compute_budget import budgeted, compute_slot, current_threads, extra_slots
+
+
+@pytest.fixture(autouse=True)
+def lock_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(compute_budget, "COMPUTE_BUDGET_ENABLED", True)
+    monkeypatch.setattr(compute_budget, "COMPUTE_LOCK_DIR", str(tmp_path))
+    monkeypatch.setattr(compute_budget, "COMPUTE_SLOTS", 1)
+    monkeypatch.setattr(compute_budget, "COMPUTE_JOB_THREADS", 2)
+    return tmp_path
+
+
+def test_nested_slots_reuse_the_outer_one():
+    with compute_slot("outer") as outer:
+        assert outer == 2
+        assert compute_budget.busy_slots() == 1
+        # with a single slot, taking a second one would queue until the timeout
+        with compute_slot("inner") as inner:
+            assert inner == 2
+            assert current_threads() == 2
+        assert current_threads() == 2
+    assert current_threads() is None
+    assert compute_budget.busy_slots() == 0
+
+
+def test_budgeted_functions_nest():
+    @budgeted("inner")
+    def inner():
+        return current_threads()
+
+    @budgeted("outer")
+    def outer():
+        return inner()
+
+    assert outer() == 2
+    assert current_threads() is None
+
+
+def test_other_threads_wait_for_the_slot(monkeypatch):
+    monkeypatch.setattr(compute_budget, "_POLL_SECONDS", 0.01)
+    order = []
+
+    def other():
+        with compute_slot("other"):
+            order.append("other")
+
+    with compute_slot("first"):
+        t = threading.Thread(target=other)
+        t.start()
+        t.join(timeout=0.2)
+        order.append("first")
+    t.join(timeout=5)
+    assert order == ["first", "other"]
+
+
+def test_disabled_budget_yields_none(monkeypatch):
+    monkeypatch.setattr(compute_budget, "COMPUTE_BUDGET_ENABLED", False)
+    with compute_slot() as threads:
+        assert threads is None
+
+
+def test_extra_slots_widen_with_the_free_slots_only(monkeypatch):
+    monkeypatch.setattr(compute_budget, "COMPUTE_SLOTS", 3)
+    with compute_slot("wide"):
+        with extra_slots(5) as threads:
+            assert threads == 6
+            assert current_threads() == 6
+            assert compute_budget.busy_slots() == 3
+        assert current_threads() == 2
+        assert compute_budget.busy_slots() == 1
+
+
+def test_extra_slots_never_wait(monkeypatch):
+    monkeypatch.setattr(compute_budget, "COMPUTE_SLOTS", 2)
+    taken = threading.Event()
+    done = threading.Event()
+
+    def other():
+        with compute_slot("other"):
+            taken.set()
+            done.wait(timeout=5)
+
+    t = threading.Thread(target=other)
+    t.start()
+    taken.wait(timeout=5)
+    try:
+        with compute_slot("wide"), extra_slots(3) as threads:
+            assert threads == 2
+    finally:
+        done.set()
+        t.join(timeout=5)
+
+
+def test_extra_slots_outside_a_job_change_nothing():
+    with extra_slots(2) as threads:
+        assert threads is None
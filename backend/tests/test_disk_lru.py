@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from core.disk_lru import DiskLRU, pin_file, release_pin
+
+
+def test_pin_keeps_the_data_after_eviction(tmp_path):
+    entry = tmp_path / "abc.mp4"
+    entry.write_bytes(b"mezzanine")
+    pin = pin_file(str(entry), str(tmp_path))
+    assert pin != str(entry)
+    entry.unlink()
+    with open(pin, "rb") as f:
+        assert f.read() == b"mezzanine"
+    release_pin(pin)
+    assert not os.path.exists(pin)
+
+
+def test_pin_of_an_evicted_entry(tmp_path):
+    assert pin_file(str(tmp_path / "gone.mp4"), str(tmp_path)) is None
+
+
+def test_release_leaves_other_paths_alone(tmp_path):
+    upload = tmp_path / "upload.mp4"
+    upload.write_bytes(b"original")
+    release_pin(str(upload))
+    release_pin(None)
+    assert upload.exists()
+
+
+def _entry(lru, key, size, mtime, suffixes=(".mp4", ".json")):
+    for suffix in suffixes:
+        path = lru.path(key, suffix)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        os.utime(path, (mtime, mtime))
+
+
+def test_eviction_drops_whole_entries_least_recently_used_first(tmp_path):
+    lru = DiskLRU(str(tmp_path), 0, suffixes=(".mp4", ".json"))
+    lru.max_bytes = 2000
+    _entry(lru, "old", 500, 100)
+    _entry(lru, "mid", 500, 200)
+    _entry(lru, "new", 500, 300)
+    assert lru.evict() == 1
+    assert sorted(os.listdir(tmp_path)) == ["mid.json", "mid.mp4", "new.json", "new.mp4"]
+
+
+def test_pinning_marks_the_entry_as_used(tmp_path):
+    lru = DiskLRU(str(tmp_path), 0, suffixes=(".mp4", ".json"))
+    lru.max_bytes = 2000
+    _entry(lru, "old", 500, 100)
+    _entry(lru, "new", 500, 200)
+    pin = lru.pin("old")
+    _entry(lru, "newer", 500, 300)
+    lru.evict()
+    assert sorted(os.listdir(tmp_path)) == [".pins", "newer.json", "newer.mp4", "old.json", "old.mp4"]
+    release_pin(pin)
+
+
+def test_build_moves_the_file_into_place_and_pins_it(tmp_path):
+    lru = DiskLRU(str(tmp_path), 10)
+
+    def make(part):
+        with open(part, "wb") as f:
+            f.write(b"proxy")
+
+    pin = lru.build("abc", make)
+    assert os.path.dirname(pin) == str(tmp_path / ".pins")
+    with open(lru.path("abc"), "rb") as f:
+        assert f.read() == b"proxy"
+    assert lru.pin("abc") is not None
+
+
+def test_failed_build_leaves_nothing_behind(tmp_path):
+    lru = DiskLRU(str(tmp_path), 10)
+
+    def make(part):
+        raise OSError("ffmpeg failed")
+
+    with pytest.raises(OSError):
+        lru.build("abc", make)
+    assert os.listdir(tmp_path) == []
+    assert lru.pin("abc") is None
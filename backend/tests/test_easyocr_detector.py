@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from core import easyocr_detector
+from core.easyocr_detector import detect_text_boxes
+
+
+@pytest.fixture
+def server(monkeypatch):
+    started = []
+    monkeypatch.setattr(easyocr_detector, "OCR_SERVER_ENABLED", True)
+    monkeypatch.setattr(easyocr_detector, "easyocr_installed", lambda: True)
+    monkeypatch.setattr(easyocr_detector, "start_ocr_server", lambda wait=True: started.append(wait))
+    monkeypatch.setattr(easyocr_detector, "_get_easyocr_reader", lambda: pytest.fail("loaded a reader in-process"))
+    return started
+
+
+def _frames():
+    return [np.zeros((8, 8, 3), dtype=np.uint8)]
+
+
+def test_server_boxes_are_returned(monkeypatch, server):
+    monkeypatch.setattr(easyocr_detector, "_request", lambda message, timeout: {"ok": True, "seconds": 0.1, "boxes": [[(1, 2, 3, 4)]]})
+    assert detect_text_boxes(_frames()) == [[(1, 2, 3, 4)]]
+    assert server == []
+
+
+def test_unreachable_server_falls_back_to_tesseract(monkeypatch, server):
+    def refuse(message, timeout):
+        raise ConnectionRefusedError("no socket")
+
+    monkeypatch.setattr(easyocr_detector, "_request", refuse)
+    assert detect_text_boxes(_frames()) is None
+    assert server == [False]
+
+
+def test_server_error_falls_back_to_tesseract(monkeypatch, server):
+    monkeypatch.setattr(easyocr_detector, "_request", lambda message, timeout: {"ok": False, "error": "model not loaded"})
+    assert detect_text_boxes(_frames()) is None
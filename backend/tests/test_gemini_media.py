@@ -0,0 +1,90 @@
+import pytest
+
+from core import gemini_media
+from core.gemini_media import video_part
+
+
+class _Blob:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.uploaded = None
+        self.deleted = False
+
+    def upload_from_filename(self, path, content_type=None, client=None):
+        if self.fail:
+            raise OSError("upload refused")
+        self.uploaded = (path, content_type)
+
+    def delete(self, client=None):
+        self.deleted = True
+
+
+class _Bucket:
+    name = "videos"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.blobs = []
+
+    def blob(self, name):
+        self.blobs.append(_Blob(name, self.fail))
+        return self.blobs[-1]
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"x" * 2048)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setattr(gemini_media, "GEMINI_STAGING_PREFIX", "gemini_staging/")
+    monkeypatch.setattr(gemini_media, "GEMINI_INLINE_MAX_MB", 1)
+
+
+def _no_bucket():
+    pytest.fail("looked up the staging bucket")
+
+
+def test_known_uri_is_sent_as_is(monkeypatch, clip):
+    monkeypatch.setattr(gemini_media, "_bucket", _no_bucket)
+    with video_part(clip, uri="gs://videos/bank/clip.mp4") as part:
+        assert part.file_data.file_uri == "gs://videos/bank/clip.mp4"
+        assert part.file_data.mime_type == "video/mp4"
+
+
+def test_small_clip_goes_inline(monkeypatch, clip):
+    monkeypatch.setattr(gemini_media, "_bucket", _no_bucket)
+    with video_part(clip) as part:
+        assert part.inline_data.data == b"x" * 2048
+        assert part.inline_data.mime_type == "video/mp4"
+
+
+def test_large_clip_is_staged_and_deleted_afterwards(monkeypatch, clip):
+    bucket = _Bucket()
+    monkeypatch.setattr(gemini_media, "GEMINI_INLINE_MAX_MB", 0)
+    monkeypatch.setattr(gemini_media, "_bucket", lambda: (None, bucket))
+    with video_part(clip) as part:
+        (blob,) = bucket.blobs
+        assert blob.uploaded == (clip, "video/mp4")
+        assert part.file_data.file_uri == f"gs://videos/{blob.name}"
+        assert blob.name.startswith("gemini_staging/") and blob.name.endswith(".mp4")
+        assert not blob.deleted
+    assert blob.deleted
+
+
+def test_large_clip_goes_inline_without_a_bucket(monkeypatch, clip):
+    monkeypatch.setattr(gemini_media, "GEMINI_INLINE_MAX_MB", 0)
+    monkeypatch.setattr(gemini_media, "_bucket", lambda: (None, None))
+    with video_part(clip) as part:
+        assert part.inline_data.data == b"x" * 2048
+
+
+def test_failed_staging_falls_back_to_inline(monkeypatch, clip):
+    monkeypatch.setattr(gemini_media, "GEMINI_INLINE_MAX_MB", 0)
+    monkeypatch.setattr(gemini_media, "_bucket", lambda: (None, _Bucket(fail=True)))
+    with video_part(clip) as part:
+        assert part.inline_data.data == b"x" * 2048
@@ -0,0 +1,124 @@
+import pytest
+
+from core import ingest
+from core.ffmpeg_io import FfmpegError
+from core.ingest import (
+    UploadRejected,
+    check_upload_size,
+    is_canonical,
+    preflight,
+    target_size,
+)
+
+
+@pytest.fixture(autouse=True)
+def bounds(monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_MAX_LONG_SIDE", 1920)
+    monkeypatch.setattr(ingest, "INGEST_MAX_SHORT_SIDE", 1080)
+    monkeypatch.setattr(ingest, "INGEST_MAX_FPS", 30.0)
+    monkeypatch.setattr(ingest, "UPLOAD_MAX_MB", 100)
+    monkeypatch.setattr(ingest, "UPLOAD_MIN_DURATION_SECONDS", 0.5)
+    monkeypatch.setattr(ingest, "UPLOAD_MAX_DURATION_SECONDS", 600.0)
+    monkeypatch.setattr(ingest, "UPLOAD_MAX_LONG_SIDE", 4096)
+
+
+def _info(**changes):
+    info = {
+        "width": 1080, "height": 1920, "fps": 30.0, "duration": 10.0,
+        "video_codec": "h264", "pix_fmt": "yuv420p", "rotation": 0,
+        "has_audio": True, "audio_codec": "aac",
+    }
+    info.update(changes)
+    return info
+
+
+def test_target_size_never_upscales():
+    assert target_size(_info(width=640, height=360)) == (640, 360)
+
+
+def test_target_size_fits_both_bounds():
+    assert target_size(_info(width=3840, height=2160)) == (1920, 1080)
+    assert target_size(_info(width=2160, height=3840)) == (1080, 1920)
+
+
+def test_target_size_is_even():
+    width, height = target_size(_info(width=2001, height=1001))
+    assert width % 2 == 0 and height % 2 == 0
+    assert width <= 1920 and height <= 1080
+
+
+def test_canonical_upload_is_passed_through():
+    assert is_canonical(_info())
+    assert is_canonical(_info(has_audio=False, audio_codec=None))
+
+
+@pytest.mark.parametrize("changes", [
+    {"video_codec": "hevc"},
+    {"pix_fmt": "yuv444p"},
+    {"rotation": 90},
+    {"width": 2160, "height": 3840},
+    {"fps": 60.0},
+    {"audio_codec": "opus"},
+])
+def test_anything_else_is_transcoded(changes):
+    assert not is_canonical(_info(**changes))
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / "upload.mp4"
+    path.write_bytes(b"\0" * 1024)
+    return str(path)
+
+
+def _probe_returning(info):
+    def probe(path, timeout=None):
+        return info
+    return probe
+
+
+def test_size_limit():
+    check_upload_size(None)
+    check_upload_size(100 * 1024 * 1024)
+    with pytest.raises(UploadRejected) as e:
+        check_upload_size(100 * 1024 * 1024 + 1)
+    assert e.value.status_code == 413
+
+
+def test_preflight_returns_the_probe(monkeypatch, upload):
+    info = _info()
+    monkeypatch.setattr(ingest, "probe_video", _probe_returning(info))
+    assert preflight(upload) is info
+
+
+@pytest.mark.parametrize("changes, status", [
+    ({"width": 0}, 400),
+    ({"video_codec": None}, 400),
+    ({"duration": 0.2}, 400),
+    ({"duration": 601.0}, 413),
+    ({"width": 2160, "height": 4320}, 413),
+])
+def test_preflight_limits(monkeypatch, upload, changes, status):
+    monkeypatch.setattr(ingest, "probe_video", _probe_returning(_info(**changes)))
+    with pytest.raises(UploadRejected) as e:
+        preflight(upload)
+    assert e.value.status_code == status
+
+
+def test_preflight_rejects_unreadable_files(monkeypatch, upload):
+    def probe(path, timeout=None):
+        raise FfmpegError("moov atom not found")
+
+    monkeypatch.setattr(ingest, "probe_video", probe)
+    with pytest.raises(UploadRejected) as e:
+        preflight(upload)
+    assert e.value.status_code == 400
+
+
+def test_preflight_checks_the_size_before_probing(monkeypatch, upload):
+    monkeypatch.setattr(ingest, "UPLOAD_MAX_MB", 0)
+    monkeypatch.setattr(ingest, "probe_video", lambda *a, **k: pytest.fail("probed an oversized upload"))
+    with pytest.raises(UploadRejected) as e:
+        preflight(upload)
+    assert e.value.status_code == 413
+
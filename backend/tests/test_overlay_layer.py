@@ -0,0 +1,50 @@
+import numpy as np
+
+from core.overlay_layer import OverlayLayer
+
+
+def _reference(frame, on_black, inv_alpha):
+    return np.rint(on_black + frame.astype(np.float64) * inv_alpha / 255).astype(np.uint8)
+
+
+def test_apply_matches_premultiplied_blend():
+    rng = np.random.default_rng(0)
+    h, w = 12, 16
+    on_black = np.zeros((h, w, 3), dtype=np.uint8)
+    inv_alpha = np.full((h, w, 3), 255, dtype=np.uint8)
+    # rows 2-4 opaque box, rows 6-9 half-transparent in a few columns
+    on_black[2:5] = 40
+    inv_alpha[2:5] = 0
+    inv_alpha[6:10, 3:9] = rng.integers(0, 256, (4, 6, 3), dtype=np.uint8)
+    on_black[6:10, 3:9] = ((255 - inv_alpha[6:10, 3:9].astype(np.int32)) * 0.5).astype(np.uint8)
+
+    layer = OverlayLayer(w, h, on_black, inv_alpha)
+    frame = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    expected = _reference(frame, on_black, inv_alpha)
+
+    out = layer.apply(frame.copy())
+    assert np.abs(out.astype(int) - expected.astype(int)).max() <= 1
+    assert (out[2:5] == 40).all()
+    assert (out[:2] == frame[:2]).all()
+
+
+def test_from_draw_fn_recovers_a_solid_box():
+    def draw(bgr):
+        bgr[1:3, 2:5] = (10, 20, 30)
+        return bgr
+
+    layer = OverlayLayer.from_draw_fn(8, 6, draw)
+    frame = np.full((6, 8, 3), 200, dtype=np.uint8)
+    out = layer.apply(frame.copy())
+    assert (out[1:3, 2:5] == (10, 20, 30)).all()
+    untouched = np.ones((6, 8), dtype=bool)
+    untouched[1:3, 2:5] = False
+    assert (out[untouched] == 200).all()
+    assert layer.rows == 2
+
+
+def test_layer_without_overlay_leaves_the_frame_alone():
+    layer = OverlayLayer.from_draw_fn(4, 4, lambda bgr: bgr)
+    frame = np.arange(48, dtype=np.uint8).reshape(4, 4, 3)
+    assert layer.bands == []
+    assert (layer.apply(frame.copy()) == frame).all()
@@ -0,0 +1,29 @@
+from core.parallel_render import plan_segments
+
+
+def _info(duration, fps=25.0, **extra):
+    return {"duration": duration, "fps": fps, **extra}
+
+
+def test_single_worker_is_one_segment():
+    assert plan_segments([0, 2, 4, 6], _info(8), 1) == [(0.0, None)]
+
+
+def test_cuts_at_keyframes_with_frame_counts():
+    keyframes = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+    segments = plan_segments(keyframes, _info(12), 3, min_seconds=2)
+    assert segments == [(0.0, 100), (4.0, 100), (8.0, None)]
+
+
+def test_short_tail_is_not_split_off():
+    # 11.5s is too close to the end for its own segment
+    segments = plan_segments([0.0, 6.0, 11.5], _info(12), 3, min_seconds=2)
+    assert segments == [(0.0, 150), (6.0, None)]
+
+
+def test_variable_frame_rate_is_not_segmented():
+    assert plan_segments([0.0, 4.0, 8.0], _info(12, vfr=True), 3) == [(0.0, None)]
+
+
+def test_missing_duration_is_not_segmented():
+    assert plan_segments([0.0, 4.0], _info(0), 4) == [(0.0, None)]
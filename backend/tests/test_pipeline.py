@@ -0,0 +1,54 @@
+import threading
+import time
+
+from core.pipeline import run_pipeline
+
+
+def test_results_come_back_in_input_order():
+    def slow_for_even(x):
+        time.sleep(0.02 if x % 2 == 0 else 0)
+        return x
+
+    results = run_pipeline(
+        list(range(8)),
+        [("first", slow_for_even, 3), ("second", lambda x: x * 10, 2)],
+        queue_size=1,
+    )
+    assert [r["value"] for r in results] == [x * 10 for x in range(8)]
+    assert all(r["ok"] and r["error"] is None and r["stage"] is None for r in results)
+
+
+def test_failing_item_is_recorded_and_skips_later_stages():
+    seen = []
+
+    def explode_on_two(x):
+        if x == 2:
+            raise ValueError("boom")
+        return x
+
+    results = run_pipeline([1, 2, 3], [("check", explode_on_two, 1), ("record", seen.append, 1)])
+    assert sorted(seen) == [1, 3]
+    assert results[1]["ok"] is False
+    assert results[1]["stage"] == "check"
+    assert isinstance(results[1]["error"], ValueError)
+    assert results[0]["ok"] and results[2]["ok"]
+
+
+def test_stages_overlap():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def busy(x):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return x
+
+    run_pipeline(list(range(4)), [("a", busy, 1), ("b", busy, 1)])
+    assert peak[0] == 2
+
+
+def test_empty_input():
+    assert run_pipeline([], [("a", lambda x: x, 1)]) == []
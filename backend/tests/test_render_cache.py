@@ -0,0 +1,30 @@
+import numpy as np
+
+from core.render_cache import render_cache_key
+
+
+def test_key_is_stable_and_covers_every_input():
+    base = render_cache_key("md5:abc", "caption", variant="finalize")
+    assert base == render_cache_key("md5:abc", "caption", variant="finalize")
+    others = {
+        render_cache_key("md5:abd", "caption", variant="finalize"),
+        render_cache_key("md5:abc", "caption!", variant="finalize"),
+        render_cache_key("md5:abc", "caption", variant="bank"),
+        render_cache_key("md5:abc", "caption", watermark=False, variant="finalize"),
+        render_cache_key("md5:abc", "caption", logo=np.zeros((2, 2, 4), np.uint8), variant="finalize"),
+    }
+    assert base not in others
+    assert len(others) == 5
+
+
+def test_logo_content_matters():
+    a = np.zeros((2, 2, 4), np.uint8)
+    b = a.copy()
+    b[0, 0, 0] = 1
+    assert render_cache_key("md5:x", "c", logo=a) == render_cache_key("md5:x", "c", logo=a.copy())
+    assert render_cache_key("md5:x", "c", logo=a) != render_cache_key("md5:x", "c", logo=b)
+
+
+def test_unidentified_sources_are_not_cached():
+    assert render_cache_key("path:/tmp/x.mp4", "caption") is None
+    assert render_cache_key("", "caption") is None
@@ -0,0 +1,35 @@
+import pytest
+
+from core import compute_budget, render_engine
+from core.render_engine import render_fanout
+
+
+@pytest.fixture
+def passes(tmp_path, monkeypatch):
+    monkeypatch.setattr(compute_budget, "COMPUTE_BUDGET_ENABLED", True)
+    monkeypatch.setattr(compute_budget, "COMPUTE_LOCK_DIR", str(tmp_path))
+    monkeypatch.setattr(compute_budget, "COMPUTE_JOB_THREADS", 2)
+    monkeypatch.setattr(render_engine, "COMPUTE_JOB_THREADS", 2)
+    monkeypatch.setattr(render_engine.os, "cpu_count", lambda: 16)
+    calls = []
+
+    def fake_pass(src_path, targets, info, budget):
+        calls.append((len(targets), budget))
+        return [{"path": path, "ok": True} for path, _ in targets]
+
+    monkeypatch.setattr(render_engine, "_fanout_pass", fake_pass)
+    return calls
+
+
+def test_fanout_takes_free_slots_for_its_encoders(monkeypatch, passes):
+    monkeypatch.setattr(compute_budget, "COMPUTE_SLOTS", 3)
+    results = render_fanout("in.mp4", [(f"{i}.mp4", None) for i in range(5)], info={"width": 8, "height": 8})
+    assert [r["path"] for r in results] == [f"{i}.mp4" for i in range(5)]
+    assert passes == [(5, 6)]
+
+
+def test_fanout_never_runs_more_encoders_than_threads(monkeypatch, passes):
+    monkeypatch.setattr(compute_budget, "COMPUTE_SLOTS", 1)
+    results = render_fanout("in.mp4", [(f"{i}.mp4", None) for i in range(5)], info={"width": 8, "height": 8})
+    assert len(results) == 5
+    assert passes == [(2, 2), (2, 2), (1, 2)]
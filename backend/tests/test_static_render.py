@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from core import static_render
+from core.frame_sampler import _changed_fraction
+from core.static_render import static_fast_path_applies
+
+
+@pytest.fixture(autouse=True)
+def fast_path(monkeypatch):
+    monkeypatch.setattr(static_render, "STATIC_FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(static_render, "STATIC_MIN_SECONDS", 3.0)
+
+
+def test_compression_noise_is_not_a_change():
+    first = np.full((64, 36), 100, dtype=np.int16)
+    assert _changed_fraction(first + 5, first) == 0.0
+
+
+def test_changed_fraction_counts_changed_pixels():
+    first = np.full((64, 36), 100, dtype=np.int16)
+    moved = first.copy()
+    moved[:8] += 100
+    assert _changed_fraction(moved, first) == pytest.approx(8 / 64)
+
+
+def test_still_clip_takes_the_fast_path(monkeypatch):
+    calls = []
+    monkeypatch.setattr(static_render, "is_static", lambda path, info, **kw: calls.append(path) or True)
+    assert static_fast_path_applies("still.mp4", {"duration": 10.0})
+    assert calls == ["still.mp4"]
+
+
+def test_short_clips_and_disabled_path_skip_the_scan(monkeypatch):
+    monkeypatch.setattr(static_render, "is_static", lambda *a, **k: pytest.fail("scanned"))
+    assert not static_fast_path_applies("short.mp4", {"duration": 2.0})
+    monkeypatch.setattr(static_render, "STATIC_FAST_PATH_ENABLED", False)
+    assert not static_fast_path_applies("long.mp4", {"duration": 10.0})
+
+
+def test_moving_or_unreadable_clips_use_the_regular_renderers(monkeypatch):
+    monkeypatch.setattr(static_render, "is_static", lambda *a, **k: False)
+    assert not static_fast_path_applies("moving.mp4", {"duration": 10.0})
+
+    def broken(*a, **k):
+        raise RuntimeError("decoder died")
+
+    monkeypatch.setattr(static_render, "is_static", broken)
+    assert not static_fast_path_applies("broken.mp4", {"duration": 10.0})
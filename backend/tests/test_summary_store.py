@@ -0,0 +1,94 @@
+import sys
+import types
+
+import pytest
+
+from core import summary_store as store_module
+from core.summary_store import ORIGINAL_INPUT, SummaryStore, cached_summary, prompt_version
+
+
+class _Collection:
+    def __init__(self):
+        self.docs = {}
+
+    def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {}).update(update["$set"])
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = _Collection()
+    database = types.ModuleType("database")
+    database.db = {store_module.SUMMARY_STORE_COLLECTION: collection}
+    monkeypatch.setitem(sys.modules, "database", database)
+    monkeypatch.setattr(store_module, "SUMMARY_STORE_ENABLED", True)
+    monkeypatch.setattr(store_module, "summary_store", SummaryStore())
+    return collection
+
+
+PROXY = "proxy1-360p"
+
+
+def test_key_covers_source_prompt_model_and_variant():
+    key = SummaryStore.key("md5:a", "prompt", "model", PROXY)
+    assert key == SummaryStore.key("md5:a", "prompt", "model", PROXY)
+    assert key != SummaryStore.key("md5:b", "prompt", "model", PROXY)
+    assert key != SummaryStore.key("md5:a", "prompt 2", "model", PROXY)
+    assert key != SummaryStore.key("md5:a", "prompt", "model 2", PROXY)
+    assert key != SummaryStore.key("md5:a", "prompt", "model", ORIGINAL_INPUT)
+    assert prompt_version("prompt") != prompt_version("prompt 2")
+
+
+def test_unidentified_sources_have_no_key():
+    assert SummaryStore.key("path:/tmp/x.mp4", "prompt", "model", PROXY) is None
+    assert SummaryStore.key("", "prompt", "model", PROXY) is None
+
+
+def test_summary_is_made_once_and_shared_through_mongo(monkeypatch, collection):
+    calls = []
+
+    def summarize():
+        calls.append(1)
+        return {"video": "a cat", "audio": "music"}, PROXY
+
+    summary = {"video": "a cat", "audio": "music"}
+    assert cached_summary("md5:a", "prompt", "model", summarize, variant=PROXY) == summary
+    assert cached_summary("md5:a", "prompt", "model", summarize, variant=PROXY) == summary
+    # another worker: empty LRU, same collection
+    monkeypatch.setattr(store_module, "summary_store", SummaryStore())
+    assert cached_summary("md5:a", "prompt", "model", summarize, variant=PROXY)["video"] == "a cat"
+    assert len(calls) == 1
+    assert len(collection.docs) == 1
+
+
+def test_empty_summaries_are_not_stored(collection):
+    empty = {"video": "", "audio": " "}
+    assert cached_summary("md5:a", "prompt", "model", lambda: (empty, PROXY), variant=PROXY) == empty
+    assert collection.docs == {}
+
+
+def test_unidentified_sources_are_not_stored(collection):
+    cached_summary("path:/tmp/x.mp4", "prompt", "model", lambda: ({"video": "v", "audio": "a"}, PROXY), variant=PROXY)
+    assert collection.docs == {}
+
+
+def test_summary_is_stored_under_the_input_actually_sent(collection):
+    # the proxy could not be made, so the original went to Gemini
+    cached_summary("md5:a", "prompt", "model", lambda: ({"video": "v"}, ORIGINAL_INPUT), variant=PROXY)
+    assert list(collection.docs) == [SummaryStore.key("md5:a", "prompt", "model", ORIGINAL_INPUT)]
+    assert collection.docs[SummaryStore.key("md5:a", "prompt", "model", ORIGINAL_INPUT)]["variant"] == ORIGINAL_INPUT
+
+
+def test_summary_of_the_original_answers_a_proxy_lookup(collection):
+    cached_summary("md5:a", "prompt", "model", lambda: ({"video": "original"}, ORIGINAL_INPUT))
+    summary = cached_summary("md5:a", "prompt", "model", lambda: pytest.fail("summarized again"), variant=PROXY)
+    assert summary == {"video": "original"}
+
+
+def test_summary_of_a_proxy_does_not_answer_for_the_original(collection):
+    cached_summary("md5:a", "prompt", "model", lambda: ({"video": "proxy"}, PROXY), variant=PROXY)
+    other = cached_summary("md5:a", "prompt", "model", lambda: ({"video": "original"}, ORIGINAL_INPUT))
+    assert other == {"video": "original"}
@@ -0,0 +1,20 @@
+from core.thumbnails import thumbnail_frame_index
+
+
+def test_index_at_timestamp():
+    assert thumbnail_frame_index({"fps": 30.0, "duration": 10.0}, 0.5) == 15
+
+
+def test_clamped_before_the_end():
+    info = {"fps": 25.0, "duration": 2.0}
+    # never past duration - 0.05s
+    assert thumbnail_frame_index(info, 5.0) == round(1.95 * 25)
+
+
+def test_clamped_to_the_frame_count():
+    assert thumbnail_frame_index({"fps": 30.0, "duration": 10.0, "nb_frames": 12}, 5.0) == 11
+
+
+def test_negative_time_and_unknown_fps():
+    assert thumbnail_frame_index({"fps": 30.0, "duration": 10.0}, -1.0) == 0
+    assert thumbnail_frame_index({"fps": 0.0, "duration": 10.0}, 3.0) == 0